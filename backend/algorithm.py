@@ -1,11 +1,17 @@
 import numpy as np
 import heapq
-import matplotlib.pyplot as plt
-import rasterio
-from rasterio.enums import Resampling
+import bisect
 import math
-import pandas as pd
+import operator
 import csv
+import hashlib
+import io
+import json
+import os
+
+import artifact_cache
+import envpack
+import heuristics
 
 # ---------------------- Constants and Parameters ---------------------- #
 
@@ -156,32 +162,54 @@ def valid_move(x, y, binary_map):
     """
     return 0 <= x < binary_map.shape[0] and 0 <= y < binary_map.shape[1] and binary_map[x, y] == 0
 
+def ray_cells(start, ends):
+    """
+    Cells visited by the Bresenham walks used by line_of_sight from start to each cell in ends.
+
+    The walk takes one row or column step at a time; a row step comes first when its
+    crossing falls strictly before the next column crossing. The a-th row step is therefore
+    preceded by a closed-form number of column steps, which places every row step of every
+    walk without a Python loop.
+
+    Returns:
+    - xs, ys: the cells after start of all walks, concatenated in walk order
+    - counts: number of cells in each walk (its row plus column distance)
+    """
+    x0, y0 = start
+    ends = np.asarray(ends, dtype=np.int64).reshape(-1, 2)
+    dx = np.abs(ends[:, 0] - x0)
+    dy = np.abs(ends[:, 1] - y0)
+    counts = dx + dy
+    first_step = np.cumsum(counts) - counts
+
+    # Place the row steps of each walk; every other step is a column step
+    walk = np.repeat(np.arange(len(ends)), dx)
+    a = np.arange(dx.sum()) - np.repeat(np.cumsum(dx) - dx, dx)
+    row_step = np.zeros(counts.sum(), dtype=bool)
+    row_step[first_step[walk] + a + np.minimum(((2 * a + 1) * dy[walk] + dx[walk]) // (2 * dx[walk]), dy[walk])] = True
+
+    # Signed unit steps, accumulated within each walk
+    walk = np.repeat(np.arange(len(ends)), counts)
+    row_moves = np.cumsum(row_step * np.sign(ends[walk, 0] - x0))
+    col_moves = np.cumsum(~row_step * np.sign(ends[walk, 1] - y0))
+    before = np.concatenate(([0], row_moves))[first_step], np.concatenate(([0], col_moves))[first_step]
+    xs = x0 + row_moves - np.repeat(before[0], counts)
+    ys = y0 + col_moves - np.repeat(before[1], counts)
+    return xs, ys, counts
+
+def line_cells(start, end):
+    """
+    Cells visited by the Bresenham walk from start to end used by line_of_sight, as index arrays.
+    """
+    xs, ys, _ = ray_cells(start, [end])
+    return np.concatenate(([start[0]], xs)), np.concatenate(([start[1]], ys))
+
 def line_of_sight(map_array, start, end):
     """
     Check if there is a clear line of sight between start and end using Bresenham's Line Algorithm.
     """
-    x0, y0 = start
-    x1, y1 = end
-    dx = abs(x1 - x0)
-    dy = abs(y1 - y0)
-    x, y = x0, y0
-    n = 1 + dx + dy
-    x_inc = 1 if x1 > x0 else -1
-    y_inc = 1 if y1 > y0 else -1
-    error = dx - dy
-    dx *= 2
-    dy *= 2
-    
-    for _ in range(n):
-        if map_array[x, y] == 1:
-            return False
-        if error > 0:
-            x += x_inc
-            error -= dy
-        else:
-            y += y_inc
-            error += dx
-    return True
+    xs, ys = line_cells(start, end)
+    return not (map_array[xs, ys] == 1).any()
 
 # ---------------------- Risk Calculation Functions ---------------------- #
 
@@ -217,976 +245,2031 @@ def calculate_risk_values(F, wind_dir_rad, h, usurf, vsurf, theta_ship, pirate_r
     
     return combined_risk
 
-# ---------------------- Modified Theta* Algorithm Implementations (No line-of-sight shortcuts) ---------------------- #
+# ---------------------- Precomputed Edge Cost Layers ---------------------- #
 
-def theta_star_shortest_path(start, goal, binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
-                             usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size):
+# 8-connected moves as (row offset, col offset), in the order the searches expand them
+NEIGHBOR_OFFSETS = (
+    (-1, 0),   # North
+    (1, 0),    # South
+    (0, -1),   # West
+    (0, 1),    # East
+    (-1, -1),  # Northwest
+    (-1, 1),   # Northeast
+    (1, -1),   # Southwest
+    (1, 1),    # Southeast
+)
+
+INF = float('inf')
+
+def grid_coordinates(shape, lat_min, lon_min, lat_res, lon_res, grid_size):
     """
-    Theta* pathfinding algorithm to find the shortest path (minimum travel time) ignoring risks.
-    Modified to avoid line-of-sight shortcutting.
+    Latitude of every grid row and longitude of every grid column (same convention as index_to_latlon).
     """
-    global MAXT_time
-    open_list = []
-    heapq.heappush(open_list, (0, start))
-    came_from = {start: start}
-    g_score = {start: 0}
-    
-    # Heuristic based on Haversine distance
-    start_lat, start_lon = index_to_latlon(*start, lat_min, lon_min, lat_res, lon_res, grid_size)
-    goal_lat, goal_lon = index_to_latlon(*goal, lat_min, lon_min, lat_res, lon_res, grid_size)
-    f_score = {start: haversine(start_lat, start_lon, goal_lat, goal_lon)}
-    
-    while open_list:
-        current_f, current = heapq.heappop(open_list)
-        
-        if current == goal:
-            # Reconstruct path
-            path = []
-            while current != came_from[current]:
-                path.append(current)
-                current = came_from[current]
-            path.append(start)
-            path.reverse()
-            return path, g_score[goal]
-        
-        # Define possible movements
-        neighbors = [
-            (current[0] - 1, current[1]),     # North
-            (current[0] + 1, current[1]),     # South
-            (current[0], current[1] - 1),     # West
-            (current[0], current[1] + 1),     # East
-            (current[0] - 1, current[1] - 1), # Northwest
-            (current[0] - 1, current[1] + 1), # Northeast
-            (current[0] + 1, current[1] - 1), # Southwest
-            (current[0] + 1, current[1] + 1), # Southeast
-        ]
-        
-        for neighbor in neighbors:
-            if not valid_move(neighbor[0], neighbor[1], binary_map):
-                continue
-            
-            lat1, lon1 = index_to_latlon(*current, lat_min, lon_min, lat_res, lon_res, grid_size)
-            lat2, lon2 = index_to_latlon(*neighbor, lat_min, lon_min, lat_res, lon_res, grid_size)
-            
-            distance = haversine(lat1, lon1, lat2, lon2)
-            
-            # Get environmental data at neighbor
-            F = wind_speed_map[neighbor[0], neighbor[1]]
-            wind_dir = wind_angle_map_rad[neighbor[0], neighbor[1]]
-            h = wave_height_map[neighbor[0], neighbor[1]]
-            usurf = usurf_map[neighbor[0], neighbor[1]]
-            vsurf = vsurf_map[neighbor[0], neighbor[1]]
-            
-            # Assume wave direction is the direction of water current
-            wave_dir = math.atan2(vsurf, usurf) if usurf != 0 or vsurf != 0 else 0.0
-            
-            # Compute ship's heading direction from current to neighbor
-            dx = neighbor[1] - current[1]
-            dy = neighbor[0] - current[0]
-            theta_ship = math.atan2(dy, dx)
-            
-            # Relative angles
-            q = angle_difference(theta_ship, wave_dir)
-            alpha = angle_difference(theta_ship, wind_dir)
-            
-            Va = calculate_actual_speed(ship_speed, h, q, alpha, F, wind_dir, usurf, vsurf, theta_ship)
-            
-            # Time cost (hours)
-            time_cost = distance / Va if Va > 0 else float('inf')
-            MAXT_time = max(MAXT_time, time_cost)
-            
-            tentative_g = g_score[current] + time_cost
-            
-            if neighbor not in g_score or tentative_g < g_score[neighbor]:
-                came_from[neighbor] = current
-                g_score[neighbor] = tentative_g
-                neighbor_lat, neighbor_lon = index_to_latlon(neighbor[0], neighbor[1], lat_min, lon_min, lat_res, lon_res, grid_size)
-                heuristic = haversine(neighbor_lat, neighbor_lon, goal_lat, goal_lon) / ship_speed
-                f = tentative_g + heuristic
-                heapq.heappush(open_list, (f, neighbor))
+    rows, cols = shape
+    lats = lat_min + (grid_size - 1 - np.arange(rows)) * lat_res
+    lons = lon_min + np.arange(cols) * lon_res
+    return lats, lons
 
-def theta_star_weighted_path(
-    start, goal, binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
-    usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size,
-    pirate_risk_map,
-    weight_shortest=0.5, weight_safest=0.3, weight_fuel=0.2,
-    a=0.1, b=0.05,
-    eta_h=1.0, eta_s=1.0, eta_e=1.0, c_sfoc=180
-):
-    global MAXT_time, MAXT_fuel, MAXT_safe
-    
+def distance_to_goal_field(goal, shape, lat_min, lon_min, lat_res, lon_res, grid_size):
     """
-    Optimized Theta* pathfinding algorithm to find a path based on user-defined weights for
-    shortest path, safest path, and fuel consumption.
-
-    Returns:
-    - path: List of grid indices representing the path.
-    - total_weighted_cost: Combined cost based on the weights.
-    - normalized_total_time: Total travel time for the path, normalized.
-    - normalized_total_fuel: Total fuel consumption for the path, normalized.
-    - normalized_total_risk: Total cumulative risk for the path, normalized.
+    Haversine distance (km) from every grid cell to the goal cell.
     """
-
-    # Initialize open list, cost tracking and came_from dictionary
-    open_list = []
-    heapq.heappush(open_list, (0, start))
-    came_from = {start: start}
-    g_score = {start: 0}
-    total_time = {start: 0}
-    total_fuel = {start: 0}
-    total_risk = {start: 0}
-    
-    # Precompute start and goal lat-lon for heuristic
-    start_lat, start_lon = index_to_latlon(*start, lat_min, lon_min, lat_res, lon_res, grid_size)
+    lats, lons = grid_coordinates(shape, lat_min, lon_min, lat_res, lon_res, grid_size)
     goal_lat, goal_lon = index_to_latlon(*goal, lat_min, lon_min, lat_res, lon_res, grid_size)
-    
-    # Precompute heuristic based on Haversine distance
-    heuristic = haversine(start_lat, start_lon, goal_lat, goal_lon) / ship_speed / MAXT_time
-    f_score = {start: heuristic}
-
-    c = 0  # Debugging counter
-    
-    while open_list:
-        current_f, current = heapq.heappop(open_list)
-        
-        if current == goal:
-            # Reconstruct path
-            path = []
-            while current != came_from[current]:
-                path.append(current)
-                current = came_from[current]
-            path.append(start)
-            path.reverse()
-
-            # Normalize costs
-            normalized_total_fuel = total_fuel[goal] / MAXT_fuel if MAXT_fuel !=0 else 0
-            normalized_total_risk = total_risk[goal] / MAXT_safe if MAXT_safe !=0 else 0
-            normalized_total_time = total_time[goal] / MAXT_time if MAXT_time !=0 else 0
-
-            return path, g_score[goal], normalized_total_time, normalized_total_fuel, normalized_total_risk
-        
-        # Define possible movements (8-connected grid)
-        neighbors = [
-            (current[0] - 1, current[1]),     # North
-            (current[0] + 1, current[1]),     # South
-            (current[0], current[1] - 1),     # West
-            (current[0], current[1] + 1),     # East
-            (current[0] - 1, current[1] - 1), # Northwest
-            (current[0] - 1, current[1] + 1), # Northeast
-            (current[0] + 1, current[1] - 1), # Southwest
-            (current[0] + 1, current[1] + 1), # Southeast
-        ]
-        
-        for neighbor in neighbors:
-            if not valid_move(neighbor[0], neighbor[1], binary_map):
-                continue
-            
-            pirate_risk = pirate_risk_map[neighbor[0], neighbor[1]]
-            
-            lat1, lon1 = index_to_latlon(*current, lat_min, lon_min, lat_res, lon_res, grid_size)
-            lat2, lon2 = index_to_latlon(*neighbor, lat_min, lon_min, lat_res, lon_res, grid_size)
-            
-            distance = haversine(lat1, lon1, lat2, lon2)
-            
-            # Get wind speed and wave height once per neighbor
-            F = max(wind_speed_map[neighbor[0], neighbor[1]], 0.1)  # Ensure F > 0
-            wind_dir = wind_angle_map_rad[neighbor[0], neighbor[1]]
-            h = max(wave_height_map[neighbor[0], neighbor[1]], 0.1)  # Ensure h > 0
-            usurf = usurf_map[neighbor[0], neighbor[1]]
-            vsurf = vsurf_map[neighbor[0], neighbor[1]]
-            
-            wave_dir = math.atan2(vsurf, usurf) if usurf != 0 or vsurf != 0 else 0.0
-            dx = neighbor[1] - current[1]
-            dy = neighbor[0] - current[0]
-            theta_ship = math.atan2(dy, dx)
-            
-            q = angle_difference(theta_ship, wave_dir)
-            alpha = angle_difference(theta_ship, wind_dir)
-            
-            Va = calculate_actual_speed(ship_speed, h, q, alpha, F, wind_dir, usurf, vsurf, theta_ship)
-            if Va <= 0:
-                Va = 0.1  # Assign a minimal speed to avoid division by zero
-            
-            # Resistance and fuel cost calculations
-            R_t = holtrop_mennen(R=0, V=Va, D=1.0)
-            R_aw = calculate_added_resistance_waves(h)
-            R_aa = calculate_added_resistance_wind(F, Cp, Af)
-            R_tot = max(R_t + R_aw + R_aa, 1e-3)
-            
-            p_b = (R_tot * Va) / (eta_e * eta_h * eta_s)
-            p_b = max(p_b, 1e-3)  # Ensure p_b > 0
-            fuel_consumption = p_b * c_sfoc
-            fuel_cost = fuel_consumption * (distance / Va)
-            
-            # Risk calculations
-            alpha_angle = angle_difference(theta_ship, wind_dir)
-            ucross = F * math.sin(alpha_angle)
-            u10max = calculate_u10max(Cp, Af, Z)
-            risk_wind = calculate_risk_wind(ucross, u10max)
-            g = 9.81  # Acceleration due to gravity
-            T_theta = math.sqrt(h / g) if h > 0 else 0.0
-            risk_wave = calculate_risk_wave(T_theta, TE)
-            risk_i = calculate_risk(risk_wind, risk_wave, a, b)
-            pirate_risk_factor = 0.3
-            combined_risk = min(risk_i + pirate_risk_factor * pirate_risk, 1.0)
-            
-            # Combined cost calculations
-            cost_shortest = distance / Va
-            cost_fuel = fuel_cost
-            cost_safest = combined_risk * WEIGHTING_FACTOR
-            
-            # Debugging print statements
-            if c < 5:
-                print(f"norm_cost_shortest: {cost_shortest}, norm_cost_fuel: {cost_fuel}, norm_cost_safest: {cost_safest}")
-            
-            # Normalize costs
-            norm_cost_shortest = cost_shortest / MAXT_time if MAXT_time !=0 else 0
-            norm_cost_fuel = (cost_fuel / MAXT_fuel) * 10 if MAXT_fuel !=0 else 0
-            norm_cost_safest = (cost_safest / MAXT_safe) * 10 if MAXT_safe !=0 else 0
-            
-            # Compute weighted cost
-            weighted_cost = (weight_shortest * norm_cost_shortest) + \
-                            (weight_fuel * norm_cost_fuel) + \
-                            (weight_safest * norm_cost_safest)
-            
-            # Tentative g-score based on weighted cost
-            tentative_g = g_score[current] + weighted_cost
-            
-            # Debugging print
-            if c < 5:
-                print(f"weighted_cost: {weighted_cost}, tentative_g: {tentative_g}")
-            c += 1
-            new_total_time = total_time[current] + cost_shortest
-            new_total_fuel = total_fuel[current] + cost_fuel
-            new_total_risk = max(total_risk[current], cost_safest)
-            
-            # Update if this path yields a lower weighted cost
-            if neighbor not in g_score or tentative_g < g_score.get(neighbor, float('inf')):
-                came_from[neighbor] = current
-                g_score[neighbor] = tentative_g
-                total_time[neighbor] = new_total_time
-                total_fuel[neighbor] = new_total_fuel
-                total_risk[neighbor] = new_total_risk
-                heapq.heappush(open_list, (tentative_g + (heuristic) / MAXT_time if MAXT_time !=0 else tentative_g, neighbor))
+    return haversine(lats[:, None], lons[None, :], goal_lat, goal_lon)
 
-def theta_star_safest_path(start, goal, binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
-                           usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size, pirate_risk_map):
+def _wrap_angle(angle):
     """
-    Theta* pathfinding algorithm to find the safest path (minimize max risk) ensuring no segment exceeds RISK_THRESHOLD.
-    Modified to avoid line-of-sight shortcutting.
+    Wrap angles into [-pi, pi).
     """
-    global MAXT_safe
-    open_list = []
-    heapq.heappush(open_list, (0, start))
-    came_from = {start: start}
-    g_score = {start: 0}
-    total_risk = {start: 0}
-    
-    # Heuristic based on Haversine distance
-    start_lat, start_lon = index_to_latlon(*start, lat_min, lon_min, lat_res, lon_res, grid_size)
-    goal_lat, goal_lon = index_to_latlon(*goal, lat_min, lon_min, lat_res, lon_res, grid_size)
-    f_score = {start: haversine(start_lat, start_lon, goal_lat, goal_lon)}
-    
-    while open_list:
-        current_f, current = heapq.heappop(open_list)
-        
-        if current == goal:
-            # Reconstruct path
-            path = []
-            while current != came_from[current]:
-                path.append(current)
-                current = came_from[current]
-            path.append(start)
-            path.reverse()
-            return path, g_score[goal], total_risk[goal]
-        
-        neighbors = [
-            (current[0] - 1, current[1]),     # North
-            (current[0] + 1, current[1]),     # South
-            (current[0], current[1] - 1),     # West
-            (current[0], current[1] + 1),     # East
-            (current[0] - 1, current[1] - 1), # Northwest
-            (current[0] - 1, current[1] + 1), # Northeast
-            (current[0] + 1, current[1] - 1), # Southwest
-            (current[0] + 1, current[1] + 1), # Southeast
-        ]
-        
-        for neighbor in neighbors:
-            if not valid_move(neighbor[0], neighbor[1], binary_map):
-                continue
-            
-            pirate_risk = pirate_risk_map[neighbor[0], neighbor[1]]
-            lat1, lon1 = index_to_latlon(*current, lat_min, lon_min, lat_res, lon_res, grid_size)
-            lat2, lon2 = index_to_latlon(*neighbor, lat_min, lon_min, lat_res, lon_res, grid_size)
-            
-            distance = haversine(lat1, lon1, lat2, lon2)
-            
-            F = wind_speed_map[neighbor[0], neighbor[1]]
-            wind_dir = wind_angle_map_rad[neighbor[0], neighbor[1]]
-            h = wave_height_map[neighbor[0], neighbor[1]]
-            usurf = usurf_map[neighbor[0], neighbor[1]]
-            vsurf = vsurf_map[neighbor[0], neighbor[1]]
-            
-            wave_dir = math.atan2(vsurf, usurf) if usurf != 0 or vsurf != 0 else 0.0
-            dx = neighbor[1] - current[1]
-            dy = neighbor[0] - current[0]
-            theta_ship = math.atan2(dy, dx)
-            
-            q = angle_difference(theta_ship, wave_dir)
-            alpha = angle_difference(theta_ship, wind_dir)
-            
-            Va = calculate_actual_speed(ship_speed, h, q, alpha, F, wind_dir, usurf, vsurf, theta_ship)
-            time_cost = distance / Va if Va > 0 else float('inf')
-            
-            risk_i = calculate_risk_values(F, wind_dir, h, usurf, vsurf, theta_ship, pirate_risk)
-            if risk_i > RISK_THRESHOLD:
-                continue  # Discard this route due to high risk
-            
-            combined_cost = time_cost + WEIGHTING_FACTOR * risk_i
-            MAXT_safe = max(MAXT_safe, combined_cost)
-            # print(time_cost, WEIGHTING_FACTOR * risk_i)
-            new_max_risk = max(total_risk[current], risk_i)
-            
-            tentative_g = g_score[current] + combined_cost
-            
-            # Update if this path yields a lower maximum risk or lower cost
-            if neighbor not in g_score or new_max_risk < total_risk.get(neighbor, float('inf')):
-                came_from[neighbor] = current
-                g_score[neighbor] = tentative_g
-                total_risk[neighbor] = new_max_risk
-                neighbor_lat, neighbor_lon = index_to_latlon(neighbor[0], neighbor[1], lat_min, lon_min, lat_res, lon_res, grid_size)
-                heuristic = haversine(neighbor_lat, neighbor_lon, goal_lat, goal_lon) / ship_speed
-                f = tentative_g + heuristic
-                heapq.heappush(open_list, (f, neighbor))
+    return (angle + np.pi) % (2 * np.pi) - np.pi
 
-def theta_star_min_fuel_path(
-    start, goal, binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
-    usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size,
-    pirate_risk_map,
-    a=0.1, b=0.05,
-    eta_h=n_h, eta_s=n_s, eta_e=n_e, c_sfoc=csfoc
-):
+def _angle_difference(diff):
     """
-    Theta* pathfinding algorithm to find the path with minimum fuel consumption.
-    Modified to avoid line-of-sight shortcutting.
-    Also returns the total time of the path.
+    Vectorized angle_difference, which gives pi (not -pi) for positive half-turns.
     """
-    global MAXT_fuel
-    open_list = []
-    heapq.heappush(open_list, (0, start))
-    came_from = {start: start}
-    fuel_score = {start: 0}
-    total_time = {start: 0}  # Dictionary to track the total time taken for each point
-    
-    # Heuristic based on minimal possible fuel consumption
-    start_lat, start_lon = index_to_latlon(*start, lat_min, lon_min, lat_res, lon_res, grid_size)
-    goal_lat, goal_lon = index_to_latlon(*goal, lat_min, lon_min, lat_res, lon_res, grid_size)
-    heuristic_fuel = a * math.exp(b * ship_speed) * haversine(start_lat, start_lon, goal_lat, goal_lon) / ship_speed
-    f_score = {start: heuristic_fuel}
-    
-    while open_list:
-        current_f, current = heapq.heappop(open_list)
-        
-        if current == goal:
-            # Reconstruct path
-            path = []
-            total_time_taken = total_time[goal]  # Capture the total time when goal is reached
-            while current != came_from[current]:
-                path.append(current)
-                current = came_from[current]
-            path.append(start)
-            path.reverse()
-            return path, fuel_score[goal], total_time_taken  # Return path, fuel score, and total time
-        
-        neighbors = [
-            (current[0] - 1, current[1]),     # North
-            (current[0] + 1, current[1]),     # South
-            (current[0], current[1] - 1),     # West
-            (current[0], current[1] + 1),     # East
-            (current[0] - 1, current[1] - 1), # Northwest
-            (current[0] - 1, current[1] + 1), # Northeast
-            (current[0] + 1, current[1] - 1), # Southwest
-            (current[0] + 1, current[1] + 1), # Southeast
-        ]
-        
-        for neighbor in neighbors:
-            if not valid_move(neighbor[0], neighbor[1], binary_map):
-                continue
-            
-            pirate_risk = pirate_risk_map[neighbor[0], neighbor[1]]
-            lat1, lon1 = index_to_latlon(*current, lat_min, lon_min, lat_res, lon_res, grid_size)
-            lat2, lon2 = index_to_latlon(*neighbor, lat_min, lon_min, lat_res, lon_res, grid_size)
-            
-            distance = haversine(lat1, lon1, lat2, lon2)
-            
-            F = max(wind_speed_map[neighbor[0], neighbor[1]], 0.1)  # Ensure F > 0
-            wind_dir = wind_angle_map_rad[neighbor[0], neighbor[1]]
-            h = max(wave_height_map[neighbor[0], neighbor[1]], 0.1)  # Ensure h > 0
-            usurf = usurf_map[neighbor[0], neighbor[1]]
-            vsurf = vsurf_map[neighbor[0], neighbor[1]]
-            
-            wave_dir = math.atan2(vsurf, usurf) if usurf != 0 or vsurf != 0 else 0.0
-            dx = neighbor[1] - current[1]
-            dy = neighbor[0] - current[0]
-            theta_ship = math.atan2(dy, dx)
-            
-            q = angle_difference(theta_ship, wave_dir)
-            alpha = angle_difference(theta_ship, wind_dir)
-            
-            Va = calculate_actual_speed(ship_speed, h, q, alpha, F, wind_dir, usurf, vsurf, theta_ship)
-            if Va <= 0:
-                Va = 0.1  # Assign a minimal speed to avoid division by zero
-            
-            # ------------------ Resistance Calculations ------------------ #
-            
-            # Calculate R_t using Holtrop-Mennen method
-            # Placeholder: Replace with actual Holtrop-Mennen calculation or model integration
-            R_t = holtrop_mennen(R=0, V=Va, D=D)  # You need to implement this function
-            
-            # Calculate Added Resistance due to Waves (Raw)
-            # Placeholder formula; replace with actual calculation based on wave height
-            R_aw = calculate_added_resistance_waves(h)
-            
-            # Calculate Added Resistance due to Wind (Raa)
-            R_aa = calculate_added_resistance_wind(F, Cp, Af)
-            
-            # Total Resistance
-            R_tot = R_t + R_aw + R_aa
-            R_tot = max(R_tot, 1e-3)  # Ensure R_tot > 0
-            
-            # ------------------ Fuel Consumption Calculations ------------------ #
-            
-            # Calculate p_b
-            p_b = (R_tot * Va) / (n_e * n_h * n_s)
-            p_b = max(p_b, 1e-3)  # Ensure p_b > 0
-            
-            # Fuel Consumption Estimate
-            fuel_consumption = p_b * csfoc  # Units depend on csfoc
-            
-            # Fuel Cost (Fuel consumption over the distance segment)
-            fuel_cost = fuel_consumption * (distance / Va)
-            MAXT_fuel = max(fuel_cost, MAXT_fuel)
-            
-            # Incorporate pirate risk into fuel consumption
-            # fuel_cost *= (1 + pirate_risk)
-            
-            tentative_fuel = fuel_score[current] + fuel_cost
-            tentative_time = total_time[current] + (distance / Va)  # Calculate time for this segment
-            
-            if neighbor not in fuel_score or tentative_fuel < fuel_score[neighbor]:
-                came_from[neighbor] = current
-                fuel_score[neighbor] = tentative_fuel
-                total_time[neighbor] = tentative_time  # Update the total time for the neighbor
-                neighbor_lat, neighbor_lon = index_to_latlon(neighbor[0], neighbor[1], lat_min, lon_min, lat_res, lon_res, grid_size)
-                heuristic = a * math.exp(b * ship_speed) * haversine(neighbor_lat, neighbor_lon, goal_lat, goal_lon) / ship_speed
-                f = tentative_fuel + heuristic
-                heapq.heappush(open_list, (f, neighbor))
+    wrapped = _wrap_angle(diff)
+    return np.where((wrapped == -np.pi) & (diff > 0), np.pi, wrapped)
 
-# ---------------------- Placeholder Functions ---------------------- #
-
-def holtrop_mennen(R, V, D):
+def _effective_speed(V0, F, wind_dir_rad, h, usurf, vsurf, theta_ship):
     """
-    Placeholder for the Holtrop-Mennen method to calculate calm water resistance (R_t).
-    Implement the actual Holtrop-Mennen method or integrate with a hydrodynamic model.
+    Vectorized calculate_actual_speed over arrays of cells; theta_ship is one heading or one per cell.
     """
-    # For demonstration, we'll use a simple empirical formula
-    # Replace with actual Holtrop-Mennen implementation
-    # R_t = a * V^2 + b * V + c
-    a = 0.02
-    b = 1.5
-    c = 100
-    return a * V**2 + b * V + c   
-
-def calculate_added_resistance_waves(h):
+    wave_dir = np.arctan2(vsurf, usurf)
+    q = _angle_difference(theta_ship - wave_dir)
+    alpha = _angle_difference(theta_ship - wind_dir_rad)
+    Va = V0 - (1.08 * h - 0.126 * q * h + 2.77e-3 * F * np.cos(alpha)) * (1 - 2.33e-7 * D * V0)
+    water_current_speed = usurf * np.cos(theta_ship) + vsurf * np.sin(theta_ship)
+    return np.maximum(0.1, Va + water_current_speed)
+
+def _fuel_per_km(V0, F, wind_dir_rad, h, usurf, vsurf, theta_ship):
     """
-    Calculate the added resistance due to waves (R_aw).
-    Implement based on relevant hydrodynamic formulas or standards.
+    Vectorized fuel burned per km of travel over arrays of cells (headings as in _effective_speed).
     """
-    # Placeholder formula; replace with actual calculation
-    return 50 * h  # Example: linear relation with wave height
-
-def calculate_added_resistance_wind(F, Cp, Af):
+    # Fuel model clamps wind and waves away from zero, as the fuel search always has
+    F = np.maximum(F, 0.1)
+    h = np.maximum(h, 0.1)
+    Va = _effective_speed(V0, F, wind_dir_rad, h, usurf, vsurf, theta_ship)
+    R_tot = holtrop_mennen(R=0, V=Va, D=D) + calculate_added_resistance_waves(h) + \
+        calculate_added_resistance_wind(F, Cp, Af)
+    p_b = np.maximum(np.maximum(R_tot, 1e-3) * Va / (n_e * n_h * n_s), 1e-3)
+    return p_b * csfoc / Va
+
+def _max_effective_speed(V0, F, h, usurf, vsurf):
     """
-    Calculate the added resistance due to wind (R_aa) based on ISO 15016:2015(E).
+    Upper bound of _effective_speed over every heading: the wave angle term is at most pi*|h|
+    in size, the wind term at most |F| and the current at most its full speed.
     """
-    # ISO 15016:2015(E) formula implementation
-    # R_aa = 0.5 * rho * Cp * Af * F^2
-    return 0.5 * rho * Cp * Af * F**2
+    k = 1 - 2.33e-7 * D * V0
+    bound = V0 - k * 1.08 * h + abs(k) * (0.126 * np.pi * np.abs(h) + 2.77e-3 * np.abs(F)) + np.hypot(usurf, vsurf)
+    return np.maximum(0.1, bound)
 
-# ---------------------- Data Loading and Preparation ---------------------- #
-
-def load_data():
+def _min_fuel_per_km(F, h):
     """
-    Load and prepare all necessary data for pathfinding.
-    weighted
-    Returns:
-    - binary_map: 2D numpy array representing obstacles
-    - wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map: Environmental data
-    - lat_min, lon_min, lat_res, lon_res: Map parameters
-    - grid_size: Size of the grid (assumed square)
+    Lower bound of _fuel_per_km over every heading: the fuel model burns at least the total
+    resistance times csfoc over the drive efficiency per km, and the resistance terms all
+    grow with speed, wave height and wind, so they are bounded below at speed 0.1.
     """
-    # Load and resize binary map
-    binary_file = "indian_ocean_binary.tif"
-    with rasterio.open(binary_file) as src:
-        original_shape = src.shape
-        binary_map_original = src.read(1)
-        
-        # Define target shape
-        target_shape = (900, 900)
-        grid_size = target_shape[0]  # Assuming square grid
-        
-        # Resample using nearest neighbor to preserve binary values
-        binary_map = src.read(
-            1,
-            out_shape=target_shape,
-            resampling=Resampling.nearest
-        )
-        
-        # Update transform to match the new shape
-        transform = src.transform * src.transform.scale(
-            (original_shape[1] / target_shape[1]),
-            (original_shape[0] / target_shape[0])
-        )
-    
-    # Define map bounds
-    lat_min, lat_max = -60, 30
-    lon_min, lon_max = 20, 120
-    lat_res = (lat_max - lat_min) / target_shape[0]
-    lon_res = (lon_max - lon_min) / target_shape[1]
-    
-    # Load additional data
-    wind_speed_map = np.load('wind_speed_data.npy')       # Wind speed (F) in m/s
-    wind_angle_map_deg = np.load('wind_dir_data.npy')    # Wind direction in degrees
-    wave_height_map = np.load('wave_height_data.npy')    # Wave height (h) in meters
-    usurf_map = np.load('usurf_data.npy')                # Water current east-west component (m/s)
-    vsurf_map = np.load('vsurf_data.npy')                # Water current north-south component (m/s)
-    
-    # Convert wind angles from degrees to radians
-    wind_angle_map_rad = np.radians(wind_angle_map_deg)
-    
-    # Ensure all loaded maps have the correct shape
-    assert wind_speed_map.shape == target_shape, "Wind speed map shape mismatch."
-    assert wind_angle_map_rad.shape == target_shape, "Wind angle map shape mismatch."
-    assert wave_height_map.shape == target_shape, "Wave height map shape mismatch."
-    assert usurf_map.shape == target_shape, "usurf map shape mismatch."
-    assert vsurf_map.shape == target_shape, "vsurf map shape mismatch."
-    
-    return binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map, lat_min, lon_min, lat_res, lon_res, grid_size
-
-# ---------------------- Pirate Attack Processing ---------------------- #
+    R_tot = holtrop_mennen(R=0, V=0.1, D=D) + calculate_added_resistance_waves(np.maximum(h, 0.1)) + \
+        calculate_added_resistance_wind(np.maximum(F, 0.1), Cp, Af)
+    return np.maximum(R_tot, 1e-3) * csfoc / (n_e * n_h * n_s)
 
-def load_pirate_attacks(csv_file, lat_min, lon_min, lat_res, lon_res, grid_size, buffer_degree=0.5):
+def _combined_risk(F, wind_dir_rad, h, theta_ship, pirate_risk):
     """
-    Load pirate attack coordinates and mark buffer zones on the risk map.
+    Vectorized calculate_risk_values for a fixed heading over arrays of cells.
     """
-    pirate_risk_map = np.zeros((grid_size, grid_size))
-    
-    # Load pirate attack coordinates
-    attacks = pd.read_csv(csv_file)
-    
-    for index, row in attacks.iterrows():
-        attack_lat = row['latitude']
-        attack_lon = row['longitude']
-        
-        # Determine grid indices within the buffer zone
-        lat_start = attack_lat - buffer_degree
-        lat_end = attack_lat + buffer_degree
-        lon_start = attack_lon - buffer_degree
-        lon_end = attack_lon + buffer_degree
-        
-        # Convert lat/lon to grid indices
-        i_start, j_start = latlon_to_index(lat_start, lon_start, lat_min, lon_min, lat_res, lon_res, grid_size)
-        i_end, j_end = latlon_to_index(lat_end, lon_end, lat_min, lon_min, lat_res, lon_res, grid_size)
-        
-        # Ensure indices are within bounds
-        i_start = max(i_start, 0)
-        j_start = max(j_start, 0)
-        i_end = min(i_end, grid_size - 1)
-        j_end = min(j_end, grid_size - 1)
-        
-        # Increase risk in the buffer zone
-        pirate_risk_map[i_start:i_end+1, j_start:j_end+1] += 1  # Increment risk by 1
-    
-    # Normalize pirate risk map to 0-1
-    if np.max(pirate_risk_map) > 0:
-        pirate_risk_map = pirate_risk_map / np.max(pirate_risk_map)
-    
-    return pirate_risk_map
+    alpha = _angle_difference(theta_ship - wind_dir_rad)
+    ucross = F * np.sin(alpha)
+    u10max = calculate_u10max(Cp, Af, Z)
+    risk_wind = np.where(ucross < u10max, ucross / u10max, 1.0)
 
-# ---------------------- Visualization Functions ---------------------- #
+    T_theta = np.sqrt(np.maximum(h, 0.0) / 9.81)
+    ratio = T_theta / TE
+    risk_wave = np.where((ratio >= 0) & (ratio < 1), ratio,
+                         np.where((ratio >= 1) & (ratio < 2), 2 - ratio, 0.0))
 
-def plot_paths(binary_map, path_shortest, path_safest, path_fuel, path_weighted, lat_min, lon_min, lat_res, lon_res, grid_size, new_position=None):
+    risk_i = calculate_risk(risk_wind, risk_wave, a1, a2)
+    return np.minimum(risk_i + 0.3 * pirate_risk, 1.0)
+
+def _shift_slices(dr, dc, shape):
     """
-    Plot the shortest, safest, fuel-efficient, and weighted paths on the map.
-    Optionally, plot the new ship position.
+    Slices selecting source cells whose (dr, dc) neighbor is on the grid, and those neighbors.
     """
-    plt.figure(figsize=(12, 10))
-    plt.imshow(binary_map, cmap='gray', origin='upper')
-    
-    if path_shortest:
-        path_x_short, path_y_short = zip(*path_shortest)
-        plt.plot(path_y_short, path_x_short, color='red', linewidth=2, label='Route 1: Shortest Path')
-    
-    if path_safest:
-        path_x_saf, path_y_saf = zip(*path_safest)
-        plt.plot(path_y_saf, path_x_saf, color='blue', linewidth=2, label='Route 2: Safest Path')
-    
-    if path_fuel:
-        path_x_fuel, path_y_fuel = zip(*path_fuel)
-        plt.plot(path_y_fuel, path_x_fuel, color='green', linewidth=2, label='Route 3: Fuel-Efficient Path')
-    
-    if path_weighted:
-        path_x_weighted, path_y_weighted = zip(*path_weighted)
-        plt.plot(path_y_weighted, path_x_weighted, color='pink', linewidth=2, label='Route 4: Weighted Path')
-    
-    # Mark start and goal
-    if path_shortest:
-        plt.scatter([path_shortest[0][1], path_shortest[-1][1]],
-                    [path_shortest[0][0], path_shortest[-1][0]],
-                    c=['green', 'yellow'], marker='o', label='Start/Goal')
-    
-    # Plot new ship position if provided
-    if new_position:
-        new_lat, new_lon = new_position
-        new_x, new_y = latlon_to_index(new_lat, new_lon, lat_min, lon_min, lat_res, lon_res, grid_size)
-        plt.scatter(new_y, new_x, c='cyan', marker='x', s=100, label='New Position (After 3 Hours)')
-    
-    plt.legend()
-    plt.title("Theta* Pathfinding: Routes 1-4")
-    plt.xlabel("Longitude Index")
-    plt.ylabel("Latitude Index")
-    plt.grid(False)
-    plt.show()
+    rows, cols = shape
+    src = (slice(max(0, -dr), rows - max(0, dr)), slice(max(0, -dc), cols - max(0, dc)))
+    dst = (slice(max(0, dr), rows - max(0, -dr)), slice(max(0, dc), cols - max(0, -dc)))
+    return src, dst
+
+def build_cost_layers(binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
+                      usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size,
+                      pirate_risk_map=None, region=None):
+    """
+    Price every 8-connected move on the grid once with NumPy.
 
-# ---------------------- CSV Saving Function ---------------------- #
+    Each layer has shape (8, rows, cols); entry [d, i, j] is the cost of the move from
+    (i, j) to (i, j) + NEIGHBOR_OFFSETS[d], using the environment at the destination cell
+    exactly as the per-edge scalar code did. Moves that leave the grid or end on an
+    obstacle are inf, so a lookup doubles as the valid_move check.
 
-def save_path_as_latlon_csv(path, lat_min, lon_min, lat_res, lon_res, grid_size, csv_file):
-    """
-    Convert a path of grid indices to latitude and longitude and save it directly to a CSV file.
+    Parameters:
+    - region: optional (rows, cols) bool mask; only moves out of these cells are priced and
+      every other move stays inf, so a search on the layers cannot leave the region
+
+    Returns:
+    - dict with 'distance' (km), 'speed' (km/h), 'time' (hours), 'fuel' and 'risk' layers
     """
-    def index_to_latlon_inner(x, y, lat_min, lon_min, lat_res, lon_res, grid_size):
-        lat = lat_min + (grid_size - 1 - x) * lat_res
-        lon = lon_min + y * lon_res
-        return (lat, lon)
+    shape = binary_map.shape
+    lats, lons = grid_coordinates(shape, lat_min, lon_min, lat_res, lon_res, grid_size)
+    if pirate_risk_map is None:
+        pirate_risk_map = np.zeros(shape)
 
-    with open(csv_file, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(['Latitude', 'Longitude'])  # Write header
+    layers = {name: np.full((len(NEIGHBOR_OFFSETS),) + shape, INF, dtype=np.float32)
+              for name in ('distance', 'speed', 'time', 'fuel', 'risk')}
 
-        for point in path:
-            i, j = point
-            lat, lon = index_to_latlon_inner(i, j, lat_min, lon_min, lat_res, lon_res, grid_size)
-            writer.writerow([lat, lon])
+    for d, (dr, dc) in enumerate(NEIGHBOR_OFFSETS):
+        src, dst = _shift_slices(dr, dc, shape)
+        water = binary_map[dst] == 0
+        if region is not None:
+            water &= region[src]
 
-    print(f"Latitude and longitude data saved to {csv_file}")
+        # Edge length only depends on the source row for a given direction
+        row_lats = lats[src[0]]
+        distance = haversine(row_lats, lons[0], row_lats - dr * lat_res, lons[0] + dc * lon_res)[:, None]
+        distance = np.broadcast_to(distance, water.shape)[water]
 
-# ---------------------- Simulate Travel Function ---------------------- #
+        # Only the moves that are allowed are priced
+        F = wind_speed_map[dst][water]
+        wind_dir = wind_angle_map_rad[dst][water]
+        h = wave_height_map[dst][water]
+        usurf = usurf_map[dst][water]
+        vsurf = vsurf_map[dst][water]
+        theta_ship = math.atan2(dr, dc)
 
-def simulate_travel(path, wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map, pirate_risk_map, lat_min, lon_min, lat_res, lon_res, grid_size, ship_params, travel_time=3.0):
+        Va = _effective_speed(ship_speed, F, wind_dir, h, usurf, vsurf, theta_ship)
+        time_cost = distance / Va
+
+        fuel_cost = _fuel_per_km(ship_speed, F, wind_dir, h, usurf, vsurf, theta_ship) * distance
+
+        risk = _combined_risk(F, wind_dir, h, theta_ship, pirate_risk_map[dst][water])
+
+        for name, values in (('distance', distance), ('speed', Va),
+                             ('time', time_cost), ('fuel', fuel_cost), ('risk', risk)):
+            layers[name][d][src][water] = values
+
+    return layers
+
+def finite_max(layer, default=0.0):
     """
-    Simulate the ship traveling along the selected path for a specified amount of time (in hours).
-    
-    Parameters:
-    - path (list of tuples): List of grid coordinates (lat, lon) for the path.
-    - wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map: Environmental data.
-    - pirate_risk_map (2D array): Pirate risk at each grid cell.
-    - lat_min, lon_min, lat_res, lon_res (floats): Map parameters.
-    - grid_size (int): Size of the grid.
-    - ship_params (dict): Ship parameters for calculations.
-    - travel_time (float): Time to travel in hours (default is 3.0).
-    
-    Returns:
-    - new_position (tuple): New latitude and longitude after traveling.
+    Largest finite value in a cost layer.
     """
-    total_time = 0.0
-
-    for idx in range(len(path) - 1):
-        current = path[idx]
-        neighbor = path[idx + 1]
-
-        # Convert grid indices to latitude and longitude
-        lat1, lon1 = index_to_latlon(*current, lat_min, lon_min, lat_res, lon_res, grid_size)
-        lat2, lon2 = index_to_latlon(*neighbor, lat_min, lon_min, lat_res, lon_res, grid_size)
-
-        # Calculate Haversine distance in kilometers
-        distance_km = haversine(lat1, lon1, lat2, lon2)
-
-        # Retrieve environmental data for the neighbor cell
-        F = wind_speed_map[neighbor[0], neighbor[1]]
-        wind_dir = wind_angle_map_rad[neighbor[0], neighbor[1]]
-        h = wave_height_map[neighbor[0], neighbor[1]]
-        usurf = usurf_map[neighbor[0], neighbor[1]]
-        vsurf = vsurf_map[neighbor[0], neighbor[1]]
-        pirate_risk = pirate_risk_map[neighbor[0], neighbor[1]]
-
-        # Calculate wave direction
-        wave_dir = math.atan2(vsurf, usurf) if usurf != 0 or vsurf != 0 else 0.0
-
-        # Compute ship's heading direction from current to neighbor
-        dx = neighbor[1] - current[1]
-        dy = neighbor[0] - current[0]
-        theta_ship = math.atan2(dy, dx)
-
-        # Calculate relative angles
-        q = angle_difference(theta_ship, wave_dir)
-        alpha = angle_difference(theta_ship, wind_dir)
-
-        # Calculate actual speed Va
-        Va = calculate_actual_speed(
-            V0=ship_params.get('ship_speed', 40),  # Assuming ship_speed is provided
-            h=h,
-            q=q,
-            alpha=alpha,
-            F=F,
-            wind_dir_rad=wind_dir,
-            usurf=usurf,
-            vsurf=vsurf,
-            theta_ship=theta_ship
-        )
+    finite = layer[np.isfinite(layer)]
+    return float(finite.max()) if finite.size else default
 
-        # Calculate time for this segment (hours)
-        time_hours = distance_km / Va if Va > 0 else float('inf')
-
-        if total_time + time_hours >= travel_time:
-            # Calculate the remaining time fraction
-            remaining_time = travel_time - total_time
-            fraction = remaining_time / time_hours
-            # Calculate new latitude and longitude based on the fraction
-            new_lat = lat1 + (lat2 - lat1) * fraction
-            new_lon = lon1 + (lon2 - lon1) * fraction
-            return (new_lat, new_lon)
-        else:
-            total_time += time_hours
+# ---------------------- Array-Backed Search Core ---------------------- #
 
-    # If the entire path is traversed within travel_time, return the goal position
-    return index_to_latlon(*path[-1], lat_min, lon_min, lat_res, lon_res, grid_size)
+# Optional callback(expansions, f) the grid searches report to every SEARCH_PROGRESS_INTERVAL
+# expansions, with the f-score of the cell being expanded (see routing_workers)
+SEARCH_PROGRESS_INTERVAL = 10000
+search_progress = None
 
-# ---------------------- Main Execution ---------------------- #
+# Direction index for a (row offset, col offset) move, looked up as [dr + 1, dc + 1]
+DIRECTION_INDEX = np.full((3, 3), -1, dtype=np.int8)
+for _d, (_dr, _dc) in enumerate(NEIGHBOR_OFFSETS):
+    DIRECTION_INDEX[_dr + 1, _dc + 1] = _d
 
-def calculate_path_metrics(
-    path,
-    wind_speed_map,
-    wind_angle_map_rad,
-    wave_height_map,
-    usurf_map,
-    vsurf_map,
-    pirate_risk_map,
-    lat_min,
-    lon_min,
-    lat_res,
-    lon_res,
-    grid_size,
-    ship_params
-):
+def flat_neighbor_offsets(ncols):
     """
-    Calculate total time, fuel, and risk for a given path based on environmental and ship parameters.
-    
+    Flat-index step for each of the 8 directions on a grid with ncols columns.
+    """
+    return [dr * ncols + dc for dr, dc in NEIGHBOR_OFFSETS]
+
+def reconstruct_path(parent_dir, start_idx, goal_idx, ncols):
+    """
+    Walk parent directions back from goal_idx to start_idx and return the (row, col) path.
+    """
+    offsets = flat_neighbor_offsets(ncols)
+    path = []
+    idx = goal_idx
+    while idx != start_idx:
+        path.append(divmod(idx, ncols))
+        idx -= offsets[parent_dir[idx]]
+    path.append(divmod(start_idx, ncols))
+    path.reverse()
+    return path
+
+def a_star_search(start, goal, edge_costs, heuristic=None, allowed=None, stats=None):
+    """
+    A* over the 8-connected grid with move costs taken from an (8, rows, cols) edge-cost layer.
+
+    Search state lives in preallocated flat arrays indexed by row * ncols + col:
+    float64 g-costs, the int8 direction each cell was reached through and a closed map.
+    Cells are expanded at most once; stale heap entries are skipped when popped.
+
     Parameters:
-    path (list of tuples): List of grid coordinates (lat, lon) for the path.
-    wind_speed_map (2D array): Wind speed at each grid cell.
-    wind_angle_map_rad (2D array): Wind angle (in radians) at each grid cell.
-    wave_height_map (2D array): Wave height at each grid cell.
-    usurf_map (2D array): East-west water current component.
-    vsurf_map (2D array): North-south water current component.
-    pirate_risk_map (2D array): Pirate risk at each grid cell.
-    lat_min (float): Minimum latitude of the grid.
-    lon_min (float): Minimum longitude of the grid.
-    lat_res (float): Latitude resolution of the grid.
-    lon_res (float): Longitude resolution of the grid.
-    grid_size (int): Size of the grid (assumed square).
-    ship_params (dict): Ship parameters for risk and fuel calculations.
-    
+    - start, goal: (row, col) grid indices
+    - edge_costs: (8, rows, cols) layer, inf for moves that are not allowed
+    - heuristic: optional (rows, cols) field of lower bounds on the cost to the goal
+    - allowed: optional (rows, cols) bool mask confining the search to a corridor
+    - stats: optional dict that receives the number of cells expanded under 'expansions'
+
     Returns:
-    total_time (float): Total time in hours for the entire path.
-    total_fuel (float): Total fuel consumption in gallons for the entire path.
-    total_risk (float): Total cumulative risk for the path.
+    - path: list of (row, col) from start to goal, or None if the goal is unreachable
+    - cost: total cost of the path (inf if unreachable)
     """
-    total_time = 0.0
-    total_fuel = 0.0
-    total_risk = 0.0  # Assuming cumulative risk along the path
-
-    # Unpack ship parameters
-    D = ship_params.get('D', 1000)    # Ship displacement (tons)
-    Cp = ship_params.get('Cp', 0.5)   # Wind pressure coefficient
-    Af = ship_params.get('Af', 50)    # Wind area (m^2)
-    Z = ship_params.get('Z', 10)      # Height from center of wind area (m)
-    TE = ship_params.get('TE', 10)    # Encounter period (seconds)
-    n_h = ship_params.get('n_h', 0.7) # Hull efficiency factor
-    n_s = ship_params.get('n_s', 0.75) # Shaft efficiency factor
-    n_e = ship_params.get('n_e', 0.85) # Engine efficiency factor
-    csfoc = ship_params.get('csfoc', 180) # Fuel consumption factor (g/kWh)
-    a1 = ship_params.get('a1', 1/3)   # Risk weighting factor for wind
-    a2 = ship_params.get('a2', 1/3)   # Risk weighting factor for waves
-    pirate_risk_factor = 0.3          # Risk factor for piracy
-
-    # Precompute u10max (assuming constant across the map; adjust if variable)
-    u10max = calculate_u10max(Cp, Af, Z)
+    _, rows, cols = edge_costs.shape
+    n_cells = rows * cols
+    costs = edge_costs.reshape(len(NEIGHBOR_OFFSETS), n_cells)
+    h = heuristic.ravel() if heuristic is not None else np.zeros(n_cells)
+    offsets = flat_neighbor_offsets(cols)
+
+    g_cost = np.full(n_cells, INF)
+    parent_dir = np.full(n_cells, -1, dtype=np.int8)
+    # Cells outside the corridor start out closed, so they are never entered
+    closed = np.zeros(n_cells, dtype=bool) if allowed is None else ~allowed.ravel()
+
+    start_idx = start[0] * cols + start[1]
+    goal_idx = goal[0] * cols + goal[1]
+    closed[start_idx] = False
+    g_cost[start_idx] = 0.0
+    open_list = [(float(h[start_idx]), start_idx)]
+    expansions = 0
 
-    # Iterate through each segment of the path
-    for idx in range(len(path) - 1):
-        current = path[idx]
-        neighbor = path[idx + 1]
-
-        # Convert grid indices to latitude and longitude
-        lat1, lon1 = index_to_latlon(*current, lat_min, lon_min, lat_res, lon_res, grid_size)
-        lat2, lon2 = index_to_latlon(*neighbor, lat_min, lon_min, lat_res, lon_res, grid_size)
-
-        # Calculate Haversine distance in kilometers
-        distance_km = haversine(lat1, lon1, lat2, lon2)
-
-        # Convert distance to meters for consistency (optional)
-        distance_m = distance_km * 1000
-
-        # Retrieve environmental data for the neighbor cell
-        F = wind_speed_map[neighbor[0], neighbor[1]]
-        wind_dir = wind_angle_map_rad[neighbor[0], neighbor[1]]
-        h = wave_height_map[neighbor[0], neighbor[1]]
-        usurf = usurf_map[neighbor[0], neighbor[1]]
-        vsurf = vsurf_map[neighbor[0], neighbor[1]]
-        pirate_risk = pirate_risk_map[neighbor[0], neighbor[1]]
-
-        # Calculate wave direction
-        wave_dir = math.atan2(vsurf, usurf) if usurf != 0 or vsurf != 0 else 0.0
-
-        # Compute ship's heading direction from current to neighbor
-        dx = neighbor[1] - current[1]
-        dy = neighbor[0] - current[0]
-        theta_ship = math.atan2(dy, dx)
-
-        # Calculate relative angles
-        q = angle_difference(theta_ship, wave_dir)
-        alpha = angle_difference(theta_ship, wind_dir)
-
-        # Calculate actual speed Va
-        Va = calculate_actual_speed(
-            V0=ship_params.get('ship_speed', 40),  # Assuming ship_speed is provided
-            h=h,
-            q=q,
-            alpha=alpha,
-            F=F,
-            wind_dir_rad=wind_dir,
-            usurf=usurf,
-            vsurf=vsurf,
-            theta_ship=theta_ship
-        )
+    while open_list:
+        f, idx = heapq.heappop(open_list)
+        if closed[idx]:
+            continue  # Stale entry for a cell already expanded at a lower cost
+        closed[idx] = True
+        expansions += 1
+        if search_progress is not None and expansions % SEARCH_PROGRESS_INTERVAL == 0:
+            search_progress(expansions, f)
+
+        if idx == goal_idx:
+            if stats is not None:
+                stats['expansions'] = expansions
+            return reconstruct_path(parent_dir, start_idx, goal_idx, cols), float(g_cost[goal_idx])
+
+        g_current = g_cost[idx]
+        for d, cost in enumerate(costs[:, idx].tolist()):
+            if cost == INF:
+                continue
+            neighbor = idx + offsets[d]
+            if closed[neighbor]:
+                continue
+            tentative_g = g_current + cost
+            if tentative_g < g_cost[neighbor]:
+                g_cost[neighbor] = tentative_g
+                parent_dir[neighbor] = d
+                heapq.heappush(open_list, (tentative_g + h[neighbor], neighbor))
 
-        # Calculate time for this segment (hours)
-        time_hours = distance_km / Va if Va > 0 else float('inf')
-        total_time += time_hours
-
-        # Resistance Calculations
-        R_t = holtrop_mennen(R=0, V=Va, D=D)
-        R_aw = calculate_added_resistance_waves(h)
-        R_aa = calculate_added_resistance_wind(F, Cp=Cp, Af=Af)
-        R_tot = R_t + R_aw + R_aa
-        R_tot = max(R_tot, 1e-3)  # Prevent division by zero
-
-        # Fuel Consumption Calculations
-        p_b = (R_tot * Va) / (n_e * n_h * n_s)
-        p_b = max(p_b, 1e-3)  # Prevent division by zero
-        fuel_consumption = p_b * csfoc  # Units: g/kWh * (kWh) = grams
-        fuel_cost = fuel_consumption * (distance_km / Va)  # Adjust units as needed
-        total_fuel += fuel_cost
-
-        # Risk Calculations
-        ucross = F * math.sin(alpha)
-        risk_wind = calculate_risk_wind(ucross, u10max)
-        T_theta = math.sqrt(h / 9.81) if h > 0 else 0.0
-        risk_wave = calculate_risk_wave(T_theta, TE)
-        risk_i = calculate_risk(risk_wind, risk_wave, a1, a2)
-        combined_risk = min(risk_i + pirate_risk_factor * pirate_risk, 1.0)
-        total_risk += combined_risk  # Cumulative risk along the path
-
-    return total_time, ((total_fuel)/850)*0.264172, (((total_risk)/len(path))*100)
-
-# ---------------------- Simulate Travel Function ---------------------- #
+    if stats is not None:
+        stats['expansions'] = expansions
+    return None, INF
 
-def simulate_travel(path, wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map, pirate_risk_map, lat_min, lon_min, lat_res, lon_res, grid_size, ship_params, travel_time=3.0):
+def path_edge_values(path, layer):
     """
-    Simulate the ship traveling along the selected path for a specified amount of time (in hours).
-    
-    Parameters:
-    - path (list of tuples): List of grid coordinates (lat, lon) for the path.
-    - wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map: Environmental data.
-    - pirate_risk_map (2D array): Pirate risk at each grid cell.
-    - lat_min, lon_min, lat_res, lon_res (floats): Map parameters.
-    - grid_size (int): Size of the grid.
-    - ship_params (dict): Ship parameters for calculations.
-    - travel_time (float): Time to travel in hours (default is 3.0).
-    
-    Returns:
-    - new_position (tuple): New latitude and longitude after traveling.
+    Values of an (8, rows, cols) layer for each consecutive move along an 8-connected path.
     """
-    total_time = 0.0
-
-    for idx in range(len(path) - 1):
-        current = path[idx]
-        neighbor = path[idx + 1]
-
-        # Convert grid indices to latitude and longitude
-        lat1, lon1 = index_to_latlon(*current, lat_min, lon_min, lat_res, lon_res, grid_size)
-        lat2, lon2 = index_to_latlon(*neighbor, lat_min, lon_min, lat_res, lon_res, grid_size)
-
-        # Calculate Haversine distance in kilometers
-        distance_km = haversine(lat1, lon1, lat2, lon2)
-
-        # Retrieve environmental data for the neighbor cell
-        F = wind_speed_map[neighbor[0], neighbor[1]]
-        wind_dir = wind_angle_map_rad[neighbor[0], neighbor[1]]
-        h = wave_height_map[neighbor[0], neighbor[1]]
-        usurf = usurf_map[neighbor[0], neighbor[1]]
-        vsurf = vsurf_map[neighbor[0], neighbor[1]]
-        pirate_risk = pirate_risk_map[neighbor[0], neighbor[1]]
-
-        # Calculate wave direction
-        wave_dir = math.atan2(vsurf, usurf) if usurf != 0 or vsurf != 0 else 0.0
-
-        # Compute ship's heading direction from current to neighbor
-        dx = neighbor[1] - current[1]
-        dy = neighbor[0] - current[0]
-        theta_ship = math.atan2(dy, dx)
-
-        # Calculate relative angles
-        q = angle_difference(theta_ship, wave_dir)
-        alpha = angle_difference(theta_ship, wind_dir)
-
-        # Calculate actual speed Va
-        Va = calculate_actual_speed(
-            V0=ship_params.get('ship_speed', 40),  # Assuming ship_speed is provided
-            h=h,
-            q=q,
-            alpha=alpha,
-            F=F,
-            wind_dir_rad=wind_dir,
-            usurf=usurf,
-            vsurf=vsurf,
-            theta_ship=theta_ship
-        )
+    cells = np.asarray(path)
+    steps = np.diff(cells, axis=0)
+    directions = DIRECTION_INDEX[steps[:, 0] + 1, steps[:, 1] + 1]
+    return layer[directions, cells[:-1, 0], cells[:-1, 1]].astype(np.float64)
 
-        # Calculate time for this segment (hours)
-        time_hours = distance_km / Va if Va > 0 else float('inf')
-
-        if total_time + time_hours >= travel_time:
-            # Calculate the remaining time fraction
-            remaining_time = travel_time - total_time
-            fraction = remaining_time / time_hours
-            # Calculate new latitude and longitude based on the fraction
-            new_lat = lat1 + (lat2 - lat1) * fraction
-            new_lon = lon1 + (lon2 - lon1) * fraction
-            return (new_lat, new_lon)
-        else:
-            total_time += time_hours
+# ---------------------- Bidirectional Search ---------------------- #
 
-    # If the entire path is traversed within travel_time, return the goal position
-    return index_to_latlon(*path[-1], lat_min, lon_min, lat_res, lon_res, grid_size)
+def incoming_edge_costs(edge_costs):
+    """
+    Re-index an (8, rows, cols) edge-cost layer by destination cell.
 
-# ---------------------- Main Function ---------------------- #
+    Entry [d, i, j] is the cost of the move into (i, j) from (i, j) - NEIGHBOR_OFFSETS[d].
+    Moves keep the price of their own heading, so a search running backwards from the goal
+    pays what the ship would pay sailing forwards, not the cost of the opposite heading.
+    """
+    incoming = np.full_like(edge_costs, INF)
+    for d, (dr, dc) in enumerate(NEIGHBOR_OFFSETS):
+        src, dst = _shift_slices(dr, dc, edge_costs.shape[1:])
+        incoming[d][dst] = edge_costs[d][src]
+    return incoming
 
-def main(start_lat, start_lon, goal_lat, goal_lon, ship_speed, ship_dis, area_front, ship_reso, hull_eff, prop_eff, engine_eff, c_sfoc, user_weight_shortest = 0.25, user_weight_safest = 0.375, user_weight_fuel = 0.375):
-    # Load data
-    global D, Cp, Af, Z, TE, n_h, n_s, n_e, a1, a2, pirate_risk_factor, ship_speed_global, csfoc
+def bidirectional_search(start, goal, edge_costs, heuristic=None, start_heuristic=None, incoming_costs=None):
+    """
+    Bidirectional A* over the 8-connected grid: one search grows from the start along
+    outgoing edges and one from the goal along incoming edges, and they meet in the middle.
+
+    Both searches use the average potential p = (heuristic - start_heuristic) / 2 (forward)
+    and -p (backward), which keeps both consistent when the two fields are. The best meeting
+    cost mu is updated whenever either side improves a cell the other side has reached, and
+    the search stops once the smallest forward and backward keys add up to mu or more: no
+    path through an unexpanded cell can then be cheaper. Without heuristics this is
+    bidirectional Dijkstra.
+
+    Parameters:
+    - start, goal: (row, col) grid indices
+    - edge_costs: (8, rows, cols) layer, inf for moves that are not allowed
+    - heuristic: optional (rows, cols) field of lower bounds on the cost to the goal
+    - start_heuristic: optional (rows, cols) field of lower bounds on the cost from the start
+    - incoming_costs: incoming_edge_costs(edge_costs), built here if not given
+
+    Returns:
+    - path: list of (row, col) from start to goal, or None if the goal is unreachable
+    - cost: total cost of the path (inf if unreachable)
+    """
+    _, rows, cols = edge_costs.shape
+    n_cells = rows * cols
+    if incoming_costs is None:
+        incoming_costs = incoming_edge_costs(edge_costs)
+    out_costs = edge_costs.reshape(len(NEIGHBOR_OFFSETS), n_cells)
+    in_costs = incoming_costs.reshape(len(NEIGHBOR_OFFSETS), n_cells)
+    offsets = flat_neighbor_offsets(cols)
+    if heuristic is not None and start_heuristic is not None:
+        # Cells out of reach of both ends get nan here, but neither search ever labels them
+        with np.errstate(invalid='ignore'):
+            potential = (heuristic.ravel() - start_heuristic.ravel()) / 2
+    else:
+        potential = np.zeros(n_cells)
+
+    start_idx = start[0] * cols + start[1]
+    goal_idx = goal[0] * cols + goal[1]
+    if start_idx == goal_idx:
+        return [start], 0.0
+
+    # Per direction: g-costs, the move each cell was reached through and the closed map.
+    # Forward cells record the move from their predecessor, backward cells the move to their successor.
+    g_cost = (np.full(n_cells, INF), np.full(n_cells, INF))
+    via = (np.full(n_cells, -1, dtype=np.int8), np.full(n_cells, -1, dtype=np.int8))
+    closed = (np.zeros(n_cells, dtype=bool), np.zeros(n_cells, dtype=bool))
+    g_cost[0][start_idx] = 0.0
+    g_cost[1][goal_idx] = 0.0
+    open_lists = ([(float(potential[start_idx]), start_idx)], [(float(-potential[goal_idx]), goal_idx)])
+    sides = ((out_costs, 1, potential), (in_costs, -1, -potential))
+
+    best_cost, meeting_idx = INF, -1
+    while open_lists[0] and open_lists[1]:
+        if open_lists[0][0][0] + open_lists[1][0][0] >= best_cost:
+            break
+
+        # Expand the side with the smaller key
+        side = 0 if open_lists[0][0][0] <= open_lists[1][0][0] else 1
+        _, idx = heapq.heappop(open_lists[side])
+        if closed[side][idx]:
+            continue
+        closed[side][idx] = True
+
+        costs, sign, side_potential = sides[side]
+        g, other_g = g_cost[side], g_cost[1 - side]
+        g_current = g[idx]
+        for d, cost in enumerate(costs[:, idx].tolist()):
+            if cost == INF:
+                continue
+            neighbor = idx + sign * offsets[d]
+            if closed[side][neighbor]:
+                continue
+            tentative_g = g_current + cost
+            if tentative_g < g[neighbor]:
+                g[neighbor] = tentative_g
+                via[side][neighbor] = d
+                heapq.heappush(open_lists[side], (tentative_g + side_potential[neighbor], neighbor))
+                if tentative_g + other_g[neighbor] < best_cost:
+                    best_cost, meeting_idx = tentative_g + other_g[neighbor], neighbor
+
+    if meeting_idx < 0:
+        return None, INF
+
+    path = reconstruct_path(via[0], start_idx, meeting_idx, cols)
+    idx = meeting_idx
+    while idx != goal_idx:
+        idx += offsets[via[1][idx]]
+        path.append(divmod(idx, cols))
+    return path, float(best_cost)
+
+# ---------------------- Any-Angle (Line-of-Sight) Search ---------------------- #
+
+def make_segment_cost(binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map,
+                      ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size, objective='time'):
+    """
+    Memoized cost of travelling in straight lines from one cell to a batch of cells, all given
+    as flat indices: segment_costs(a, targets) returns one cost per target.
+
+    Blocked lines (any land cell on the Bresenham walk) cost inf. Otherwise the cost is the
+    segment's Haversine length times the mean per-km rate over the cells it crosses, priced
+    for the segment's own heading: hours per km for objective='time', fuel per km for 'fuel'.
+    All uncached segments of a call are walked and priced together.
+    """
+    if objective == 'time':
+        rate_per_km = lambda *args: 1.0 / _effective_speed(*args)
+    elif objective == 'fuel':
+        rate_per_km = _fuel_per_km
+    else:
+        raise ValueError(f"Unsupported any-angle objective: {objective}")
+    cols = binary_map.shape[1]
+    memo = {}
+
+    def segment_costs(a, targets):
+        missing = [b for b in targets if (a, b) not in memo]
+        if missing:
+            start = divmod(a, cols)
+            ends = np.array([divmod(b, cols) for b in missing])
+            xs, ys, counts = ray_cells(start, ends)
+
+            # A single diagonal grid move is priced at its destination cell only, like the
+            # 8-connected edges, so drop the corner cell its walk passes through
+            first = np.cumsum(counts) - counts
+            diagonal = counts == 2
+            diagonal &= (ends[:, 0] != start[0]) & (ends[:, 1] != start[1])
+            if diagonal.any():
+                keep = np.ones(len(xs), dtype=bool)
+                keep[first[diagonal]] = False
+                xs, ys = xs[keep], ys[keep]
+                counts = counts - diagonal
+                first = np.cumsum(counts) - counts
+
+            blocked = np.logical_or.reduceat(binary_map[xs, ys] != 0, first)
+            theta_ship = np.repeat(np.arctan2(ends[:, 0] - start[0], ends[:, 1] - start[1]), counts)
+            rate = rate_per_km(ship_speed, wind_speed_map[xs, ys], wind_angle_map_rad[xs, ys],
+                               wave_height_map[xs, ys], usurf_map[xs, ys], vsurf_map[xs, ys], theta_ship)
+            mean_rate = np.add.reduceat(rate, first) / counts
+
+            lat1, lon1 = index_to_latlon(*start, lat_min, lon_min, lat_res, lon_res, grid_size)
+            lat2, lon2 = index_to_latlon(ends[:, 0], ends[:, 1], lat_min, lon_min, lat_res, lon_res, grid_size)
+            costs = np.where(blocked, INF, haversine(lat1, lon1, lat2, lon2) * mean_rate)
+            memo.update(zip([(a, b) for b in missing], costs.tolist()))
+        return [memo[(a, b)] for b in targets]
+
+    return segment_costs
+
+def theta_star_any_angle_search(start, goal, edge_costs, segment_costs, heuristic=None):
+    """
+    Any-angle Theta* on the same flat-array state as a_star_search.
+
+    Each neighbor is reached either from the expanded cell over the 8-connected edge or,
+    when the line is clear, straight from the expanded cell's parent via segment_costs;
+    the cheaper of the two wins. Paths come back as the sparse list of turning points.
+
+    Returns:
+    - path: list of (row, col) waypoints from start to goal, or None if the goal is unreachable
+    - cost: total cost of the path (inf if unreachable)
+    """
+    _, rows, cols = edge_costs.shape
+    n_cells = rows * cols
+    costs = edge_costs.reshape(len(NEIGHBOR_OFFSETS), n_cells)
+    h = heuristic.ravel() if heuristic is not None else np.zeros(n_cells)
+    offsets = flat_neighbor_offsets(cols)
+
+    g_cost = np.full(n_cells, INF)
+    parent = np.full(n_cells, -1, dtype=np.int64)
+    closed = np.zeros(n_cells, dtype=bool)
+
+    start_idx = start[0] * cols + start[1]
+    goal_idx = goal[0] * cols + goal[1]
+    g_cost[start_idx] = 0.0
+    parent[start_idx] = start_idx
+    open_list = [(float(h[start_idx]), start_idx)]
+
+    while open_list:
+        _, idx = heapq.heappop(open_list)
+        if closed[idx]:
+            continue
+        closed[idx] = True
+
+        if idx == goal_idx:
+            path = [divmod(idx, cols)]
+            while idx != start_idx:
+                idx = int(parent[idx])
+                path.append(divmod(idx, cols))
+            path.reverse()
+            return path, float(g_cost[goal_idx])
+
+        g_current = g_cost[idx]
+        moves = [(idx + offsets[d], g_current + cost) for d, cost in enumerate(costs[:, idx].tolist())
+                 if cost != INF and not closed[idx + offsets[d]]]
+        if not moves:
+            continue
+
+        # Price the straight lines from the parent to every open neighbor in one batch
+        grandparent = int(parent[idx])
+        if grandparent != idx:
+            g_parent = g_cost[grandparent]
+            shortcuts = segment_costs(grandparent, [neighbor for neighbor, _ in moves])
+        else:
+            shortcuts = [INF] * len(moves)
+
+        for (neighbor, tentative_g), shortcut in zip(moves, shortcuts):
+            new_parent = idx
+            if grandparent != idx and g_parent + shortcut <= tentative_g:
+                tentative_g, new_parent = g_parent + shortcut, grandparent
+
+            if tentative_g < g_cost[neighbor]:
+                g_cost[neighbor] = tentative_g
+                parent[neighbor] = new_parent
+                heapq.heappush(open_list, (tentative_g + h[neighbor], neighbor))
+
+    return None, INF
+
+def path_segment_costs(path, segment_costs, ncols):
+    """
+    Cost of each straight segment of a waypoint path under a make_segment_cost function.
+    """
+    flat = [row * ncols + col for row, col in path]
+    return np.array([segment_costs(a, [b])[0] for a, b in zip(flat[:-1], flat[1:])])
+
+# ---------------------- Hierarchical (HPA*) Abstract Graph ---------------------- #
+
+# Side length in cells of the square clusters the grid is partitioned into
+HPA_CLUSTER_SIZE = 30
+
+# Crossable runs along a cluster border at least this long get a transition at each end,
+# shorter runs a single transition in the middle
+HPA_ENTRANCE_SPLIT = 6
+
+# Clusters relaxed together when pricing intra-cluster edges (bounds peak memory)
+HPA_BATCH_CLUSTERS = 128
+
+# Abstract graphs kept in memory by this process, most recent last
+HPA_MEMO_SIZE = 4
+_abstract_graphs = {}
+
+def cluster_windows(edge_costs, cluster_size):
+    """
+    Split an (8, rows, cols) edge-cost layer into (clusters, 8, size, size) windows in row-major
+    cluster order; windows overhanging the grid edge are padded with inf.
+    """
+    _, rows, cols = edge_costs.shape
+    n_rows, n_cols = -(-rows // cluster_size), -(-cols // cluster_size)
+    padded = np.full((len(NEIGHBOR_OFFSETS), n_rows * cluster_size, n_cols * cluster_size), INF, dtype=np.float32)
+    padded[:, :rows, :cols] = edge_costs
+    windows = padded.reshape(len(NEIGHBOR_OFFSETS), n_rows, cluster_size, n_cols, cluster_size)
+    return windows.transpose(1, 3, 0, 2, 4).reshape(n_rows * n_cols, len(NEIGHBOR_OFFSETS), cluster_size, cluster_size)
+
+def window_distances(window_costs, sources):
+    """
+    Shortest-path costs inside grid windows from several source cells per window.
+
+    Uses fast sweeping: each round sweeps the windows row by row downwards and upwards, then
+    column by column rightwards and leftwards, relaxing every move that advances with the
+    sweep. A path that keeps its general heading settles within one round; rounds repeat
+    until nothing improves, so the costs are exact. All windows and sources sweep together.
+
+    Parameters:
+    - window_costs: (windows, 8, rows, cols) edge costs; moves leaving a window are ignored
+    - sources: (windows, n) in-window flat indices of the source cells, -1 for padding
+
+    Returns:
+    - (windows, n, rows, cols) costs from each source, inf where unreachable
+    """
+    n_windows, n_sources = sources.shape
+    shape = window_costs.shape[-2:]
+    dist = np.full((n_windows, n_sources, shape[0] * shape[1]), INF)
+    window, source = np.nonzero(sources >= 0)
+    dist[window, source, sources[window, source]] = 0.0
+    dist = dist.reshape(n_windows, n_sources, *shape)
+    costs = window_costs[:, None]
+
+    # Per sweep: the axis it advances along, its step, and the moves that advance with it
+    sweeps = []
+    for axis, step in ((0, 1), (0, -1), (1, 1), (1, -1)):
+        length, width = shape[axis], shape[1 - axis]
+        moves = [(d, slice(max(0, -offset[1 - axis]), width - max(0, offset[1 - axis])),
+                  slice(max(0, offset[1 - axis]), width - max(0, -offset[1 - axis])))
+                 for d, offset in enumerate(NEIGHBOR_OFFSETS) if offset[axis] == step]
+        sweeps.append((axis, step, range(1, length) if step == 1 else range(length - 2, -1, -1), moves))
+
+    improved = True
+    while improved:
+        improved = False
+        for axis, step, lines, moves in sweeps:
+            for line in lines:
+                previous = line - step
+                for d, src, dst in moves:
+                    if axis == 0:
+                        candidate = dist[..., previous, src] + costs[:, :, d, previous, src]
+                        target = dist[..., line, dst]
+                    else:
+                        candidate = dist[..., src, previous] + costs[:, :, d, src, previous]
+                        target = dist[..., dst, line]
+                    if (candidate < target).any():
+                        np.minimum(target, candidate, out=target)
+                        improved = True
+    return dist
+
+def _border_transitions(crossable, cluster_size):
+    """
+    Positions along one cluster border that get a transition: the middle of each crossable
+    run (runs are cut at cluster corners), or both ends of runs of HPA_ENTRANCE_SPLIT or more.
+    """
+    positions = []
+    for first in range(0, len(crossable), cluster_size):
+        changes = np.diff(np.concatenate(([0], crossable[first:first + cluster_size].astype(np.int8), [0])))
+        for run_start, run_end in zip(np.flatnonzero(changes == 1), np.flatnonzero(changes == -1)):
+            if run_end - run_start >= HPA_ENTRANCE_SPLIT:
+                positions += [first + run_start, first + run_end - 1]
+            else:
+                positions.append(first + (run_start + run_end - 1) // 2)
+    return positions
+
+def build_abstract_graph(edge_costs, cluster_size=HPA_CLUSTER_SIZE):
+    """
+    Build the HPA* abstract graph of an (8, rows, cols) edge-cost layer.
+
+    The grid is cut into square clusters. Each transition on a border between side-by-side
+    clusters contributes its two cells as abstract nodes, joined by the moves across the
+    border. Nodes of the same cluster are joined by their shortest in-cluster path costs.
+
+    Returns:
+    - dict of arrays: 'node_cells' (flat cell index of each node), the directed abstract
+      edges 'edge_from', 'edge_to' and 'edge_cost', and 'cluster_size'
+    """
+    _, rows, cols = edge_costs.shape
+    n_cluster_cols = -(-cols // cluster_size)
+    direction = {offset: d for d, offset in enumerate(NEIGHBOR_OFFSETS)}
+    nodes = {}
+    edge_from, edge_to, edge_cost = [], [], []
+
+    def add_crossing(a, b):
+        # Join cells a and b (adjacent, in different clusters) in both directions
+        for (r1, c1), (r2, c2) in ((a, b), (b, a)):
+            cost = edge_costs[direction[(r2 - r1, c2 - c1)], r1, c1]
+            if cost != INF:
+                edge_from.append(nodes.setdefault(r1 * cols + c1, len(nodes)))
+                edge_to.append(nodes.setdefault(r2 * cols + c2, len(nodes)))
+                edge_cost.append(float(cost))
+
+    east, west, south, north = (direction[offset] for offset in ((0, 1), (0, -1), (1, 0), (-1, 0)))
+    for c in range(cluster_size - 1, cols - 1, cluster_size):
+        crossable = np.isfinite(edge_costs[east, :, c]) | np.isfinite(edge_costs[west, :, c + 1])
+        for r in _border_transitions(crossable, cluster_size):
+            add_crossing((r, c), (r, c + 1))
+    for r in range(cluster_size - 1, rows - 1, cluster_size):
+        crossable = np.isfinite(edge_costs[south, r, :]) | np.isfinite(edge_costs[north, r + 1, :])
+        for c in _border_transitions(crossable, cluster_size):
+            add_crossing((r, c), (r + 1, c))
+
+    # Intra-cluster edges, relaxing clusters with similar node counts together
+    node_cells = np.fromiter(nodes, dtype=np.int64, count=len(nodes))
+    node_rows, node_cols = np.divmod(node_cells, cols)
+    node_cluster = (node_rows // cluster_size) * n_cluster_cols + node_cols // cluster_size
+    node_local = (node_rows % cluster_size) * cluster_size + node_cols % cluster_size
+    order = np.argsort(node_cluster, kind='stable')
+    clusters, first, counts = np.unique(node_cluster[order], return_index=True, return_counts=True)
+    windows = cluster_windows(edge_costs, cluster_size)
+    intra = [(np.array(edge_from, dtype=np.int64), np.array(edge_to, dtype=np.int64), np.array(edge_cost))]
+    by_count = np.argsort(counts, kind='stable')
+    for batch_start in range(0, len(by_count), HPA_BATCH_CLUSTERS):
+        batch = by_count[batch_start:batch_start + HPA_BATCH_CLUSTERS]
+        members = np.full((len(batch), counts[batch].max()), -1, dtype=np.int64)
+        for i, j in enumerate(batch):
+            members[i, :counts[j]] = order[first[j]:first[j] + counts[j]]
+        present = members >= 0
+        dist = window_distances(windows[clusters[batch]], np.where(present, node_local[members], -1))
+        dist = dist.reshape(len(batch), members.shape[1], -1)
+
+        window, a, b = np.nonzero(present[:, :, None] & present[:, None, :])
+        keep = a != b
+        window, a, b = window[keep], a[keep], b[keep]
+        cost = dist[window, a, node_local[members[window, b]]]
+        finite = np.isfinite(cost)
+        intra.append((members[window, a][finite], members[window, b][finite], cost[finite]))
+
+    return {
+        'node_cells': node_cells,
+        'edge_from': np.concatenate([edges[0] for edges in intra]),
+        'edge_to': np.concatenate([edges[1] for edges in intra]),
+        'edge_cost': np.concatenate([edges[2] for edges in intra]),
+        'cluster_size': np.array(cluster_size),
+    }
+
+def abstract_graph(edge_costs, cluster_size=HPA_CLUSTER_SIZE):
+    """
+    The HPA* abstract graph of an edge-cost layer, taken from this process's memory, the
+    artifact cache or a fresh build, in that order. Graphs are keyed on the layer's contents,
+    so a new environment pack or ship profile gets its own graph; the layer is hashed once
+    per layer object, not on every query.
+    """
+    key = artifact_cache.key_digest(artifact_cache.frozen_array_digest(edge_costs), cluster_size)
+    if key in _abstract_graphs:
+        graph = _abstract_graphs.pop(key)
+    else:
+        path = artifact_cache.cache_path('hpa_graph', key, '.npz')
+        graph = artifact_cache.load_arrays(path)
+        if graph is None:
+            graph = build_abstract_graph(edge_costs, cluster_size)
+            artifact_cache.save_arrays(path, **graph)
+
+        adjacency = [[] for _ in range(len(graph['node_cells']))]
+        for a, b, cost in zip(graph['edge_from'].tolist(), graph['edge_to'].tolist(), graph['edge_cost'].tolist()):
+            adjacency[a].append((b, cost))
+        graph['adjacency'] = adjacency
+        if len(_abstract_graphs) >= HPA_MEMO_SIZE:
+            del _abstract_graphs[next(iter(_abstract_graphs))]
+    _abstract_graphs[key] = graph
+    return graph
+
+def hierarchical_search(start, goal, edge_costs, heuristic=None, graph=None):
+    """
+    HPA* search: plan on the abstract graph, then refine inside the clusters it passes through.
+
+    The start and goal are joined to the nodes of their own clusters by in-cluster searches,
+    the abstract graph is searched with A*, and the grid path is found by a_star_search
+    confined to the clusters of the abstract route. If the abstract graph does not connect
+    the two ends the full grid is searched instead.
+
+    Parameters:
+    - start, goal, edge_costs, heuristic: as for a_star_search
+    - graph: abstract_graph(edge_costs), looked up here if not given
+
+    Returns:
+    - path: list of (row, col) from start to goal, or None if the goal is unreachable
+    - cost: total cost of the path (inf if unreachable)
+    """
+    if graph is None:
+        graph = abstract_graph(edge_costs)
+    _, rows, cols = edge_costs.shape
+    cluster_size = int(graph['cluster_size'])
+    n_cluster_rows, n_cluster_cols = -(-rows // cluster_size), -(-cols // cluster_size)
+    node_cells = graph['node_cells']
+    node_rows, node_cols = np.divmod(node_cells, cols)
+    node_cluster = (node_rows // cluster_size) * n_cluster_cols + node_cols // cluster_size
+    node_local = (node_rows % cluster_size) * cluster_size + node_cols % cluster_size
+    h = heuristic.ravel() if heuristic is not None else np.zeros(rows * cols)
+
+    def cluster_window(cell):
+        r, c = cell
+        cluster = (r // cluster_size) * n_cluster_cols + c // cluster_size
+        r0, c0 = r - r % cluster_size, c - c % cluster_size
+        window = np.full((1, len(NEIGHBOR_OFFSETS), cluster_size, cluster_size), INF, dtype=np.float32)
+        block = edge_costs[:, r0:r0 + cluster_size, c0:c0 + cluster_size]
+        window[0, :, :block.shape[1], :block.shape[2]] = block
+        return cluster, window, (r % cluster_size) * cluster_size + c % cluster_size
+
+    # Join the start and goal to the transition nodes of their clusters
+    start_cluster, start_window, start_local = cluster_window(start)
+    goal_cluster, goal_window, goal_local = cluster_window(goal)
+    start_nodes = np.flatnonzero(node_cluster == start_cluster)
+    goal_nodes = np.flatnonzero(node_cluster == goal_cluster)
+    from_start = window_distances(start_window, np.array([[start_local]])).reshape(-1)
+    to_goal = window_distances(goal_window, node_local[goal_nodes][None]).reshape(len(goal_nodes), -1)[:, goal_local]
+
+    start_node, goal_node = len(node_cells), len(node_cells) + 1
+    start_edges = [(node, cost) for node, cost in zip(start_nodes.tolist(), from_start[node_local[start_nodes]].tolist())
+                   if cost != INF]
+    if start_cluster == goal_cluster and from_start[goal_local] != INF:
+        start_edges.append((goal_node, float(from_start[goal_local])))
+    goal_edges = {node: cost for node, cost in zip(goal_nodes.tolist(), to_goal.tolist()) if cost != INF}
+
+    # A* over the abstract graph
+    adjacency = graph['adjacency']
+    node_h = np.append(h[node_cells], [h[start[0] * cols + start[1]], 0.0])
+    g_cost = {start_node: 0.0}
+    parent = {start_node: None}
+    closed = set()
+    open_list = [(float(node_h[start_node]), start_node)]
+    while open_list:
+        _, node = heapq.heappop(open_list)
+        if node in closed:
+            continue
+        closed.add(node)
+        if node == goal_node:
+            break
+        edges = start_edges if node == start_node else adjacency[node]
+        if node in goal_edges:
+            edges = edges + [(goal_node, goal_edges[node])]
+        for neighbor, cost in edges:
+            tentative_g = g_cost[node] + cost
+            if neighbor not in closed and tentative_g < g_cost.get(neighbor, INF):
+                g_cost[neighbor] = tentative_g
+                parent[neighbor] = node
+                heapq.heappush(open_list, (tentative_g + node_h[neighbor], neighbor))
+    else:
+        return a_star_search(start, goal, edge_costs, heuristic)
+
+    # Refine on the grid, confined to the clusters the abstract route visits
+    corridor = np.zeros(n_cluster_rows * n_cluster_cols, dtype=bool)
+    corridor[[start_cluster, goal_cluster]] = True
+    node = parent[goal_node]
+    while node != start_node:
+        corridor[node_cluster[node]] = True
+        node = parent[node]
+    allowed = np.repeat(np.repeat(corridor.reshape(n_cluster_rows, n_cluster_cols), cluster_size, axis=0),
+                        cluster_size, axis=1)[:rows, :cols]
+    return a_star_search(start, goal, edge_costs, heuristic, allowed=allowed)
+
+# ---------------------- Landmark (ALT) Heuristics ---------------------- #
+
+# Number of sea landmarks whose cost fields give the ALT lower bounds
+ALT_LANDMARKS = 12
+
+# Direction index of the opposite move for each direction in NEIGHBOR_OFFSETS
+OPPOSITE_DIRECTION = [NEIGHBOR_OFFSETS.index((-dr, -dc)) for dr, dc in NEIGHBOR_OFFSETS]
+
+def reverse_edge_costs(edge_costs):
+    """
+    Edge costs of the reversed graph: entry [d, i, j] is the cost of the forward move from
+    (i, j) + NEIGHBOR_OFFSETS[d] into (i, j), priced at that move's own heading.
+    """
+    return incoming_edge_costs(edge_costs)[OPPOSITE_DIRECTION]
+
+def select_landmarks(edge_costs, count=ALT_LANDMARKS):
+    """
+    Spread landmarks over the sea reachable from the sea cell nearest the grid centre,
+    choosing each one farthest (in grid distance) from the centre and those already chosen.
+
+    Returns:
+    - int64 array of flat cell indices
+    """
+    _, rows, cols = edge_costs.shape
+    rr, cc = np.divmod(np.arange(rows * cols), cols)
+    sea = np.flatnonzero(np.isfinite(edge_costs).any(axis=0).ravel())
+    centre = sea[np.argmin((rr[sea] - rows / 2) ** 2 + (cc[sea] - cols / 2) ** 2)]
+    reachable = np.flatnonzero(np.isfinite(window_distances(edge_costs[None], np.array([[centre]]))).ravel())
+
+    landmarks = []
+    nearest = (rr[reachable] - rr[centre]) ** 2 + (cc[reachable] - cc[centre]) ** 2
+    for _ in range(min(count, len(reachable))):
+        landmark = reachable[np.argmax(nearest)]
+        landmarks.append(landmark)
+        nearest = np.minimum(nearest, (rr[reachable] - rr[landmark]) ** 2 + (cc[reachable] - cc[landmark]) ** 2)
+    return np.array(landmarks, dtype=np.int64)
+
+def landmark_fields(edge_costs, count=ALT_LANDMARKS):
+    """
+    Exact cost fields from and to each landmark over an (8, rows, cols) edge-cost layer.
+
+    Computed once per layer with window_distances over the whole grid and kept in the
+    artifact cache as float32, keyed on the layer's contents: they are only recomputed when
+    the environment pack (or the ship profile the layer was priced for) changes.
+
+    Returns:
+    - (2, landmarks, rows, cols) float32 array: [0] costs from each landmark, [1] costs to it
+    """
+    key = artifact_cache.key_digest(artifact_cache.frozen_array_digest(edge_costs), count)
+    path = artifact_cache.cache_path('alt_landmarks', key)
+    fields = artifact_cache.load_array(path, mmap_mode='r')
+    if fields is None:
+        landmarks = select_landmarks(edge_costs, count)[None]
+        fields = np.stack([window_distances(edge_costs[None], landmarks)[0],
+                           window_distances(reverse_edge_costs(edge_costs)[None], landmarks)[0]]).astype(np.float32)
+        artifact_cache.save_array(path, fields)
+    return fields
+
+def landmark_heuristic(fields, cell, towards=True):
+    """
+    Triangle-inequality lower bounds from landmark_fields for every cell of the grid.
+
+    With towards=True the field bounds the cost from each cell to `cell` (a heuristic for a
+    search ending at cell), otherwise the cost from `cell` to each cell:
+        d(v, t) >= d(L, t) - d(L, v)   and   d(v, t) >= d(v, L) - d(t, L)
+    maximised over the landmarks L. Bounds are exact-cost based, so the field is consistent.
+    """
+    r, c = cell
+    sign = 1 if towards else -1
+    h = np.zeros(fields.shape[2:])
+    with np.errstate(invalid='ignore'):
+        for from_landmark, to_landmark in zip(fields[0], fields[1]):
+            np.fmax(h, sign * (from_landmark[r, c] - from_landmark), out=h)
+            np.fmax(h, sign * (to_landmark - to_landmark[r, c]), out=h)
+    return h
+
+# ---------------------- Modified Theta* Algorithm Implementations (No line-of-sight shortcuts) ---------------------- #
+
+def objective_heuristic(edge_costs, cost_layers, goal, shape, lat_min, lon_min, lat_res, lon_res, grid_size):
+    """
+    Admissible, consistent heuristic field for a grid search over edge_costs: the distance to
+    the goal at the smallest cost per km of any move (see heuristics.py).
+    """
+    return heuristics.lower_bound_field(
+        heuristics.min_cost_per_km(edge_costs, cost_layers['distance']),
+        distance_to_goal_field(goal, shape, lat_min, lon_min, lat_res, lon_res, grid_size))
+
+# Safest-search edge costs kept in memory by this process, most recent last
+SAFEST_LAYERS_MEMO_SIZE = 4
+_safest_layers = {}
+
+def safest_edge_costs(cost_layers):
+    """
+    Per-edge cost of the safest search: travel time plus weighted risk, with edges whose
+    risk exceeds RISK_THRESHOLD removed (inf).
+
+    The layer is derived once per time and risk layer, so repeated queries get the same
+    (read-only) array and its abstract graph or landmark fields are found without rehashing.
+    """
+    time_layer = cost_layers['time']
+    risk_layer = cost_layers['risk']
+    key = (artifact_cache.frozen_array_digest(time_layer), artifact_cache.frozen_array_digest(risk_layer),
+           RISK_THRESHOLD, WEIGHTING_FACTOR)
+    if key in _safest_layers:
+        edge_costs = _safest_layers.pop(key)
+    else:
+        edge_costs = np.where(risk_layer > RISK_THRESHOLD, INF, time_layer + WEIGHTING_FACTOR * risk_layer)
+        edge_costs.flags.writeable = False
+        if len(_safest_layers) >= SAFEST_LAYERS_MEMO_SIZE:
+            del _safest_layers[next(iter(_safest_layers))]
+    _safest_layers[key] = edge_costs
+    return edge_costs
+
+def heuristic_expansion_report(start, goal, cost_layers, shape, lat_min, lon_min, lat_res, lon_res, grid_size):
+    """
+    Cells expanded by the shortest, safest and fuel-efficient grid searches with their
+    heuristic fields, against plain Dijkstra on the same query (see heuristics.expansion_report).
+    """
+    report = {}
+    for objective, edge_costs in (('shortest', cost_layers['time']), ('safest', safest_edge_costs(cost_layers)),
+                                  ('fuel', cost_layers['fuel'])):
+        heuristic = objective_heuristic(edge_costs, cost_layers, goal, shape, lat_min, lon_min, lat_res, lon_res, grid_size)
+        report[objective] = heuristics.expansion_report(a_star_search, start, goal, edge_costs, heuristic)
+    return report
+
+def theta_star_shortest_path(start, goal, binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
+                             usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size,
+                             cost_layers=None, any_angle=False, bidirectional=False, hierarchical=False,
+                             landmarks=False):
+    """
+    Theta* pathfinding algorithm to find the shortest path (minimum travel time) ignoring risks.
+    Modified to avoid line-of-sight shortcutting unless any_angle=True, in which case the path
+    may run straight between any two cells in line of sight (see theta_star_any_angle_search).
+    With bidirectional=True the grid search runs from both ends at once (see bidirectional_search),
+    with hierarchical=True it is planned on the cluster graph first (see hierarchical_search).
+    With landmarks=True grid searches are also guided by ALT lower bounds (see landmark_fields).
+    Edge costs are looked up in cost_layers (see build_cost_layers), built here if not given.
+
+    Returns:
+    - path: List of grid indices representing the path (None if unreachable).
+    - total_time: Travel time of the path in hours.
+    """
+    global MAXT_time
+    if cost_layers is None:
+        cost_layers = build_cost_layers(binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
+                                        usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size)
+    time_layer = cost_layers['time']
+    MAXT_time = max(MAXT_time, finite_max(time_layer))
+    distance_to_goal = distance_to_goal_field(goal, binary_map.shape, lat_min, lon_min, lat_res, lon_res, grid_size)
+
+    if any_angle:
+        # Straight segments may hold any heading (and landmark bounds are grid path costs, which
+        # they can undercut), so bound the remaining time by the top speed any heading allows
+        sea = binary_map == 0
+        max_speed = _max_effective_speed(ship_speed, wind_speed_map[sea], wave_height_map[sea],
+                                         usurf_map[sea], vsurf_map[sea]).max(initial=0.1)
+        heuristic = heuristics.lower_bound_field(1.0 / max_speed, distance_to_goal)
+        segment_costs = make_segment_cost(binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
+                                          usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res,
+                                          grid_size, objective='time')
+        return theta_star_any_angle_search(start, goal, time_layer, segment_costs, heuristic)
+
+    # Admissible heuristic: distance to the goal at the least time per km of any move
+    time_per_km = heuristics.min_cost_per_km(time_layer, cost_layers['distance'])
+    heuristic = heuristics.lower_bound_field(time_per_km, distance_to_goal)
+    if landmarks:
+        fields = landmark_fields(time_layer)
+        heuristic = np.maximum(heuristic, landmark_heuristic(fields, goal))
+    if bidirectional:
+        start_heuristic = heuristics.lower_bound_field(
+            time_per_km, distance_to_goal_field(start, binary_map.shape, lat_min, lon_min, lat_res, lon_res, grid_size))
+        if landmarks:
+            start_heuristic = np.maximum(start_heuristic, landmark_heuristic(fields, start, towards=False))
+        return bidirectional_search(start, goal, time_layer, heuristic, start_heuristic)
+    if hierarchical:
+        return hierarchical_search(start, goal, time_layer, heuristic)
+    return a_star_search(start, goal, time_layer, heuristic)
+
+def theta_star_weighted_path(
+    start, goal, binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
+    usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size,
+    pirate_risk_map,
+    weight_shortest=0.5, weight_safest=0.3, weight_fuel=0.2,
+    a=0.1, b=0.05,
+    eta_h=1.0, eta_s=1.0, eta_e=1.0, c_sfoc=180,
+    cost_layers=None
+):
+    """
+    Optimized Theta* pathfinding algorithm to find a path based on user-defined weights for
+    shortest path, safest path, and fuel consumption.
+    Edge time, fuel and risk are looked up in cost_layers (see build_cost_layers).
+
+    Returns:
+    - path: List of grid indices representing the path (None if unreachable).
+    - total_weighted_cost: Combined cost based on the weights.
+    - normalized_total_time: Total travel time for the path, normalized.
+    - normalized_total_fuel: Total fuel consumption for the path, normalized.
+    - normalized_total_risk: Maximum segment risk along the path, normalized.
+    """
+    if cost_layers is None:
+        cost_layers = build_cost_layers(binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
+                                        usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size,
+                                        pirate_risk_map=pirate_risk_map)
+    time_layer = cost_layers['time']
+    fuel_layer = cost_layers['fuel']
+    risk_layer = cost_layers['risk']
+    scales = weighted_scales(cost_layers)
+
+    # Normalized per-edge costs combined with the user weights (a zero weight leaves invalid
+    # moves inf rather than nan)
+    with np.errstate(invalid='ignore'):
+        weighted_costs = np.where(np.isfinite(time_layer),
+                                  (weight_shortest / scales['time']) * time_layer +
+                                  (weight_fuel / scales['fuel']) * fuel_layer +
+                                  (weight_safest / scales['risk']) * risk_layer, INF).astype(np.float32)
+
+    # The previous heuristic was the same constant for every node and left the expansion order
+    # unchanged; bound the weighted cost per km instead
+    heuristic = objective_heuristic(weighted_costs, cost_layers, goal, binary_map.shape,
+                                    lat_min, lon_min, lat_res, lon_res, grid_size)
+    path, total_weighted_cost = a_star_search(start, goal, weighted_costs, heuristic)
+    if path is None:
+        return None, INF, INF, INF, INF
+
+    # Normalize costs
+    normalized_total_time = path_edge_values(path, time_layer).sum() / MAXT_time
+    normalized_total_fuel = path_edge_values(path, fuel_layer).sum() / MAXT_fuel
+    normalized_total_risk = path_edge_values(path, risk_layer).max(initial=0.0) * WEIGHTING_FACTOR / MAXT_safe
+
+    return path, total_weighted_cost, normalized_total_time, normalized_total_fuel, normalized_total_risk
+
+def theta_star_safest_path(start, goal, binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
+                           usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size, pirate_risk_map,
+                           cost_layers=None, hierarchical=False):
+    """
+    Theta* pathfinding algorithm to find the safest path: minimum travel time plus weighted risk,
+    ensuring no segment exceeds RISK_THRESHOLD.
+    Modified to avoid line-of-sight shortcutting.
+    Edge time and risk are looked up in cost_layers (see build_cost_layers).
+    With hierarchical=True the route is planned on the cluster graph first (see hierarchical_search).
+
+    Returns:
+    - path: List of grid indices representing the path (None if unreachable).
+    - total_cost: Combined time and risk cost of the path.
+    - max_risk: Highest segment risk along the path.
+    """
+    global MAXT_safe
+    if cost_layers is None:
+        cost_layers = build_cost_layers(binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
+                                        usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size,
+                                        pirate_risk_map=pirate_risk_map)
+    edge_costs = safest_edge_costs(cost_layers)
+    MAXT_safe = max(MAXT_safe, finite_max(edge_costs))
+
+    # Admissible heuristic on the combined time and risk cost per km
+    heuristic = objective_heuristic(edge_costs, cost_layers, goal, binary_map.shape,
+                                    lat_min, lon_min, lat_res, lon_res, grid_size)
+
+    search = hierarchical_search if hierarchical else a_star_search
+    path, total_cost = search(start, goal, edge_costs, heuristic)
+    if path is None:
+        return None, INF, INF
+    max_risk = path_edge_values(path, cost_layers['risk']).max(initial=0.0)
+    return path, total_cost, max_risk
+
+def theta_star_min_fuel_path(
+    start, goal, binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
+    usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size,
+    pirate_risk_map,
+    a=0.1, b=0.05,
+    eta_h=n_h, eta_s=n_s, eta_e=n_e, c_sfoc=csfoc,
+    cost_layers=None, any_angle=False, hierarchical=False
+):
+    """
+    Theta* pathfinding algorithm to find the path with minimum fuel consumption.
+    Modified to avoid line-of-sight shortcutting unless any_angle=True.
+    With hierarchical=True the route is planned on the cluster graph first (see hierarchical_search).
+    Also returns the total time of the path.
+    Edge fuel and time are looked up in cost_layers (see build_cost_layers).
+    """
+    global MAXT_fuel
+    if cost_layers is None:
+        cost_layers = build_cost_layers(binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
+                                        usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size,
+                                        pirate_risk_map=pirate_risk_map)
+    fuel_layer = cost_layers['fuel']
+    MAXT_fuel = max(MAXT_fuel, finite_max(fuel_layer))
+
+    distance_to_goal = distance_to_goal_field(goal, binary_map.shape, lat_min, lon_min, lat_res, lon_res, grid_size)
+
+    if any_angle:
+        # Straight segments may hold any heading, so bound by the least fuel per km any heading burns
+        sea = binary_map == 0
+        fuel_per_km = _min_fuel_per_km(wind_speed_map[sea], wave_height_map[sea]).min(initial=INF)
+        heuristic = heuristics.lower_bound_field(fuel_per_km if fuel_per_km != INF else 0.0, distance_to_goal)
+        segment_args = (binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map,
+                        ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size)
+        path, total_fuel = theta_star_any_angle_search(
+            start, goal, fuel_layer, make_segment_cost(*segment_args, objective='fuel'), heuristic)
+        if path is None:
+            return None, INF, INF
+        total_time_taken = path_segment_costs(path, make_segment_cost(*segment_args, objective='time'),
+                                              binary_map.shape[1]).sum()
+        return path, total_fuel, total_time_taken
+
+    # Admissible heuristic: distance to the goal at the least fuel per km of any move
+    heuristic = heuristics.lower_bound_field(heuristics.min_cost_per_km(fuel_layer, cost_layers['distance']),
+                                             distance_to_goal)
+    search = hierarchical_search if hierarchical else a_star_search
+    path, total_fuel = search(start, goal, fuel_layer, heuristic)
+    if path is None:
+        return None, INF, INF
+    total_time_taken = path_edge_values(path, cost_layers['time']).sum()
+    return path, total_fuel, total_time_taken  # Return path, fuel score, and total time
+
+# ---------------------- Multi-Objective (Pareto) Search ---------------------- #
+#
+# Instead of one search per objective (and one more per weighting), a single label-setting
+# search keeps, for every cell, the partial routes to it that some weighting of time, fuel
+# and risk could still pick: a route is dropped only when, under every weighting, a route
+# already kept is at least as cheap. What reaches the goal is the convex part of the
+# non-dominated front, the routes weighted sums choose between (the full front holds a route
+# for every trade-off however small and is far too large to search). Alongside, the search
+# keeps the safest route: least time plus weighted risk with no move above RISK_THRESHOLD,
+# counted as a fourth objective, exposure.
+#
+# Even the convex part grows quickly with the grid, so routes within PARETO_EPSILON of one
+# another share a label (as in A*pex) and partial routes the goal's routes already come that
+# close to are dropped: every weighting's pick is then within a factor 1 + PARETO_EPSILON of
+# its optimum. The search still expands many labels per cell, far more than four A* searches
+# on the full grid; epsilon=0 gives the exact routes, which only small grids can afford.
+#
+# Label setting needs costs that never decrease along a route, and risk can dip below zero
+# (tailwind crosswinds), so the search lifts risk by a multiple of the travel time that leaves
+# every move at zero or more (see pareto_objective_layers). The bound above then holds for
+# every weighting whose time weight covers that lift, which with the usual risk values is all
+# of them.
+
+# Least margin, relative to a whole route's cost, by which a partial route must beat the others
+# at its cell under some weighting to be kept (below it costs differ by float32 rounding only)
+WEIGHTING_TOLERANCE = 1e-6
+# Relative margin within which the front may miss the optimum of a weighting: partial routes
+# whose lower bound comes that close to the routes at the goal under every weighting are dropped
+PARETO_EPSILON = 0.05
+# Objectives of the Pareto front, in cost-vector order
+PARETO_OBJECTIVES = ('time', 'fuel', 'risk', 'exposure')
+
+def weighting_dominated(costs, others, tolerance=WEIGHTING_TOLERANCE):
+    """
+    Whether no weighting of three objectives prices costs below every one of others by more
+    than tolerance, so no weighted sum could pick it (costs on comparable scales, weightings
+    summing to one).
+    """
+    # Weightings (w0, w1, 1 - w0 - w1) form a triangle; cut away, for each other cost vector,
+    # those under which costs is not cheaper, and see whether any area is left
+    if not others:
+        return False
+    c0, c1, c2 = costs
+    if any(r0 <= c0 + tolerance and r1 <= c1 + tolerance and r2 <= c2 + tolerance for r0, r1, r2 in others):
+        return True  # Beaten or matched on every objective by one of others alone
+    if any(value + tolerance < min(rivals) for value, rivals in zip(costs, zip(*others))):
+        return False  # Cheapest on some objective alone
+    polygon = [(0.0, 0.0), (1.0, 0.0), (0.0, 1.0)]
+    for r0, r1, r2 in others:
+        d0, d1, d2 = c0 - r0, c1 - r1, c2 - r2
+        a, b, c = d0 - d2, d1 - d2, d2 + tolerance
+        values = [a * x + b * y + c for x, y in polygon]
+        clipped = []
+        previous, v_previous = polygon[-1], values[-1]
+        for point, value in zip(polygon, values):
+            if (value < 0) != (v_previous < 0):
+                t = v_previous / (v_previous - value)
+                clipped.append((previous[0] + t * (point[0] - previous[0]), previous[1] + t * (point[1] - previous[1])))
+            if value < 0:
+                clipped.append(point)
+            previous, v_previous = point, value
+        if len(clipped) < 3:
+            return True
+        polygon = clipped
+    return False
+
+def pareto_search(start, goal, objective_costs, heuristics=None, epsilon=PARETO_EPSILON, allowed=None, stats=None):
+    """
+    Multi-objective label-setting search over the 8-connected grid for the routes that
+    minimize some weighting of the first three objectives, over all routes or over those that
+    add nothing to the fourth, each to within a factor 1 + epsilon.
+
+    Each label stands for a set of partial routes to one cell (as in A*pex): its apex is their
+    lowest cost on every objective, and its representative the one route it keeps, whose lower
+    bound (cost plus heuristic) is within 1 + epsilon of the apex's on every objective. A new
+    label merges into a waiting one at its cell when one representative covers both, and is
+    dropped when every weighting prices its apex at least as high as one of the apexes kept at
+    the cell (see weighting_dominated), or its lower bound, raised by 1 + epsilon, at least as
+    high as one of the routes at the goal. Both comparisons hold apexes, which never exceed
+    the routes they stand for, so the error does not add up along a route. Labels that can
+    still add nothing to the fourth objective are only ever dropped for one another.
+
+    Parameters:
+    - start, goal: (row, col) grid indices
+    - objective_costs: sequence of 4 non-negative (8, rows, cols) edge-cost layers, inf for
+      moves that are not allowed (in any of them)
+    - heuristics: optional sequence of 4 admissible, consistent (rows, cols) fields, one per
+      objective
+    - epsilon: relative error allowed, below 1
+    - allowed: optional (rows, cols) bool mask confining the search to a corridor
+    - stats: optional dict that receives the number of labels expanded under 'expansions'
+
+    Returns:
+    - list of (path, costs) routes, costs being a 4-tuple, ordered by the first objective
+      (empty if the goal is unreachable)
+    """
+    k = len(objective_costs)
+    _, rows, cols = objective_costs[0].shape
+    n_cells = rows * cols
+    costs = np.stack([layer.reshape(len(NEIGHBOR_OFFSETS), n_cells) for layer in objective_costs], axis=-1)
+    if heuristics is None:
+        h = np.zeros((n_cells, k))
+    else:
+        h = np.stack([np.asarray(field, dtype=np.float64).ravel() for field in heuristics], axis=-1)
+    blocked = None if allowed is None else ~allowed.ravel()
+    offsets = flat_neighbor_offsets(cols)
+    factor = 1.0 + epsilon
+
+    start_idx = start[0] * cols + start[1]
+    goal_idx = goal[0] * cols + goal[1]
+    # Objectives are weighed and labels ordered on one scale, each objective divided by its
+    # lower bound at the start; a label whose apex dominates another's never sorts after it
+    scale = [1.0 / value if 0 < value < INF else 1.0 for value in h[start_idx].tolist()]
+    s0, s1, s2 = scale[:3]
+
+    def rivals(labels, f, exclude=-1):
+        # Scaled apexes a label is weighed against: all of them, or for a label that can
+        # still add nothing to the fourth objective only those that can as well
+        if f[3] > 0:
+            return [label_s[other] for other in labels if other != exclude]
+        return [label_s[other] for other in labels if other != exclude and label_g[other][3] == 0]
+
+    # Label storage: apex, its scaled first three objectives and the representative's costs,
+    # cell, parent label of the representative, whether it is still live and whether it has
+    # been expanded
+    label_g = [(0.0,) * k]
+    label_s = [(0.0,) * 3]
+    label_rep = [(0.0,) * k]
+    label_cell = [start_idx]
+    label_parent = [-1]
+    label_alive = [True]
+    label_closed = [False]
+    cell_labels = {start_idx: [0]}
+    open_list = [(sum(map(operator.mul, h[start_idx].tolist(), scale)), 0)]
+    expansions = 0
+
+    def covered(f):
+        # The routes at the goal come within 1 + epsilon of the lower bound f under every weighting
+        routes = cell_labels.get(goal_idx, ())
+        bound = (f[0] * s0 * factor, f[1] * s1 * factor, f[2] * s2 * factor)
+        reps = [(label_rep[route][0] * s0, label_rep[route][1] * s1, label_rep[route][2] * s2)
+                for route in routes if f[3] > 0 or label_rep[route][3] == 0]
+        return weighting_dominated(bound, reps)
+
+    while open_list:
+        f, label = heapq.heappop(open_list)
+        if not label_alive[label]:
+            continue
+        idx = label_cell[label]
+        hv = h[idx].tolist()
+        if idx == goal_idx:
+            label_closed[label] = True
+            continue
+        if covered(list(map(operator.add, label_g[label], hv))):
+            label_alive[label] = False
+            continue  # Routes found since this label was queued are close enough
+        label_closed[label] = True
+        expansions += 1
+        if search_progress is not None and expansions % SEARCH_PROGRESS_INTERVAL == 0:
+            search_progress(expansions, f)
+
+        apex = label_g[label]
+        rep = label_rep[label]
+        for d, move in enumerate(costs[:, idx].tolist()):
+            if INF in move:
+                continue
+            neighbor = idx + offsets[d]
+            if blocked is not None and blocked[neighbor]:
+                continue
+            new_g = tuple(map(operator.add, apex, move))
+            labels = cell_labels.setdefault(neighbor, [])
+            if any(all(map(operator.le, label_g[other], new_g)) for other in labels):
+                continue
+            h_next = h[neighbor].tolist()
+            new_f = list(map(operator.add, new_g, h_next))
+            if INF in new_f:
+                continue  # The goal is out of reach
+            new_s = (new_g[0] * s0, new_g[1] * s1, new_g[2] * s2)
+            if weighting_dominated(new_s, rivals(labels, new_f)) or covered(new_f):
+                continue  # No weighting picks it over the routes kept here or at the goal
+            new_rep = tuple(map(operator.add, rep, move))
+            parent = label
+
+            # Merge into a waiting label at this cell when one representative covers both
+            for other in labels:
+                if label_closed[other]:
+                    continue
+                merged = tuple(map(min, label_g[other], new_g))
+                limit = [factor * (value + rest) for value, rest in zip(merged, h_next)]
+                for rep_g, rep_parent in ((label_rep[other], label_parent[other]), (new_rep, label)):
+                    if all(value + rest <= bound for value, rest, bound in zip(rep_g, h_next, limit)):
+                        break
+                else:
+                    continue
+                label_alive[other] = False
+                labels.remove(other)
+                new_g, new_rep, parent = merged, rep_g, rep_parent
+                new_f = list(map(operator.add, new_g, h_next))
+                new_s = (new_g[0] * s0, new_g[1] * s1, new_g[2] * s2)
+                break
+
+            new_label = len(label_g)
+            label_g.append(new_g)
+            label_s.append(new_s)
+            label_rep.append(new_rep)
+            label_cell.append(neighbor)
+            label_parent.append(parent)
+            label_alive.append(True)
+            label_closed.append(False)
+
+            # Retire the waiting labels at this cell whose apex the new one dominates, and any
+            # label that no weighting picks over the others any more
+            kept = [new_label]
+            for other in labels:
+                if not label_closed[other] and all(map(operator.le, new_g, label_g[other])):
+                    label_alive[other] = False
+                else:
+                    kept.append(other)
+            for other in kept[1:]:
+                # Only a label the new one beats on some objective can have lost its weightings
+                if any(map(operator.lt, new_s, label_s[other])) and weighting_dominated(
+                        label_s[other], rivals(kept, list(map(operator.add, label_g[other], h_next)), other)):
+                    label_alive[other] = False
+                    kept.remove(other)
+            cell_labels[neighbor] = kept
+            heapq.heappush(open_list, (sum(map(operator.mul, new_f, scale)), new_label))
+
+    if stats is not None:
+        stats['expansions'] = expansions
+
+    front = []
+    for solution in cell_labels.get(goal_idx, ()):
+        path = []
+        label = solution
+        while label != -1:
+            path.append(divmod(label_cell[label], cols))
+            label = label_parent[label]
+        path.reverse()
+        front.append((path, label_rep[solution]))
+    front.sort(key=lambda route: route[1])
+    return front
+
+def pareto_objective_layers(cost_layers):
+    """
+    Non-negative edge-cost layers of the PARETO_OBJECTIVES: travel time, fuel, risk lifted by
+    risk_offset times the travel time, and exposure (1 for a move whose risk exceeds
+    RISK_THRESHOLD, else 0).
+
+    Returns:
+    - layers: tuple of the four (8, rows, cols) layers
+    - risk_offset: risk added per hour of travel, the least that leaves no move below zero
+    """
+    time_layer = cost_layers['time']
+    risk = cost_layers['risk']
+    allowed = np.isfinite(time_layer)
+    risk_offset = max(float((-risk[allowed] / time_layer[allowed]).max(initial=0.0)), 0.0)
+    with np.errstate(invalid='ignore'):
+        lifted = np.where(allowed, np.maximum(risk + risk_offset * time_layer, 0.0), INF)
+    exposure = np.where(allowed, (risk > RISK_THRESHOLD).astype(np.float32), INF)
+    return (time_layer, cost_layers['fuel'], lifted, exposure), risk_offset
+
+def cost_to_go_fields(layers, goal):
+    """
+    Exact cost from every cell to the goal over each (8, rows, cols) layer, all swept at once
+    with window_distances; inf where the goal cannot be reached.
+    """
+    _, rows, cols = layers[0].shape
+    reverse = np.stack([reverse_edge_costs(layer) for layer in layers])
+    return window_distances(reverse, np.full((len(layers), 1), goal[0] * cols + goal[1]))[:, 0]
+
+def pareto_routes(start, goal, cost_layers, epsilon=PARETO_EPSILON, allowed=None, stats=None):
+    """
+    The (time, fuel, risk, exposure) routes between two cells that weighted sums of time, fuel
+    and risk choose between, and the safest route, from one multi-objective search (see
+    pareto_search) guided by the exact cost-to-go of each objective (see cost_to_go_fields,
+    one sweep for all four).
+
+    Returns:
+    - front: list of dicts with the route 'path' and its total 'time' (hours), 'fuel', 'risk'
+      and 'exposure' (moves above RISK_THRESHOLD), ordered by time
+    """
+    layers, _ = pareto_objective_layers(cost_layers)
+    fields = cost_to_go_fields(layers, goal)
+    if not np.isfinite(fields[:, start[0], start[1]]).all():
+        return []
+    front = pareto_search(start, goal, layers, fields, epsilon, allowed=allowed, stats=stats)
+    # Risk is summed again unlifted, from the same float32 layer as the other searches
+    return [{'path': path, 'time': time, 'fuel': fuel,
+             'risk': float(path_edge_values(path, cost_layers['risk']).sum()), 'exposure': int(round(exposure))}
+            for path, (time, fuel, _, exposure) in front]
+
+def weighted_scales(cost_layers):
+    """
+    Divisors putting time, fuel and risk on one scale for a weighted route, as
+    theta_star_weighted_path uses them: the largest per-edge time, fuel and safest cost seen so
+    far (the MAXT_ values, updated here from cost_layers), with fuel and risk counted ten times
+    over and risk by WEIGHTING_FACTOR as well.
+
+    Returns:
+    - dict of 'time', 'fuel' and 'risk' divisors
+    """
+    global MAXT_time, MAXT_fuel, MAXT_safe
+    MAXT_time = max(MAXT_time, finite_max(cost_layers['time']))
+    MAXT_fuel = max(MAXT_fuel, finite_max(cost_layers['fuel']))
+    MAXT_safe = max(MAXT_safe, finite_max(safest_edge_costs(cost_layers)))
+    return {'time': MAXT_time, 'fuel': MAXT_fuel / 10, 'risk': MAXT_safe / (10 * WEIGHTING_FACTOR)}
+
+def routes_from_front(front, weights, scales):
+    """
+    The ROUTE_OBJECTIVES routes of a Pareto front: its fastest entry, its safest (least time
+    plus weighted risk with no move above RISK_THRESHOLD, as in theta_star_safest_path), its
+    most fuel-efficient, then the pick_from_front choice for weights (None where there is none).
+    """
+    safe = [route for route in front if route['exposure'] == 0]
+    return [min(front, key=lambda route: route['time'], default=None),
+            min(safe, key=lambda route: route['time'] + WEIGHTING_FACTOR * route['risk'], default=None),
+            min(front, key=lambda route: route['fuel'], default=None),
+            pick_from_front(front, weights, scales)]
+
+def pick_from_front(front, weights, scales):
+    """
+    Route of a Pareto front (see pareto_routes) that minimizes a weighted sum of its objectives,
+    the one theta_star_weighted_path would find.
+
+    Parameters:
+    - weights: (weight_shortest, weight_safest, weight_fuel), as for theta_star_weighted_path
+    - scales: 'time', 'fuel' and 'risk' divisors putting the objectives on one scale (see
+      weighted_scales)
+
+    Returns:
+    - the chosen front entry (None for an empty front)
+    """
+    weight_shortest, weight_safest, weight_fuel = weights
+    return min(front, key=lambda route: weight_shortest * route['time'] / scales['time'] +
+                                        weight_fuel * route['fuel'] / scales['fuel'] +
+                                        weight_safest * route['risk'] / scales['risk'], default=None)
+
+# ---------------------- Placeholder Functions ---------------------- #
+
+def holtrop_mennen(R, V, D):
+    """
+    Placeholder for the Holtrop-Mennen method to calculate calm water resistance (R_t).
+    Implement the actual Holtrop-Mennen method or integrate with a hydrodynamic model.
+    """
+    # For demonstration, we'll use a simple empirical formula
+    # Replace with actual Holtrop-Mennen implementation
+    # R_t = a * V^2 + b * V + c
+    a = 0.02
+    b = 1.5
+    c = 100
+    return a * V**2 + b * V + c   
+
+def calculate_added_resistance_waves(h):
+    """
+    Calculate the added resistance due to waves (R_aw).
+    Implement based on relevant hydrodynamic formulas or standards.
+    """
+    # Placeholder formula; replace with actual calculation
+    return 50 * h  # Example: linear relation with wave height
+
+def calculate_added_resistance_wind(F, Cp, Af):
+    """
+    Calculate the added resistance due to wind (R_aa) based on ISO 15016:2015(E).
+    """
+    # ISO 15016:2015(E) formula implementation
+    # R_aa = 0.5 * rho * Cp * Af * F^2
+    return 0.5 * rho * Cp * Af * F**2
+
+# ---------------------- Data Loading and Preparation ---------------------- #
+
+def load_land_mask(binary_file, target_shape):
+    """
+    Land mask (1 = obstacle, 0 = water) resampled to target_shape.
+
+    The resampled mask is cached bit-packed, keyed on the GeoTIFF's content hash and the
+    target shape, so only the first run for a given file and resolution touches rasterio.
+    """
+    key = artifact_cache.key_digest(artifact_cache.file_digest(binary_file), list(target_shape))
+    cache_file = artifact_cache.cache_path('land_mask', key)
+    packed = artifact_cache.load_array(cache_file)
+    if packed is not None:
+        return np.unpackbits(packed, count=target_shape[0] * target_shape[1]).reshape(target_shape)
+
+    import rasterio
+    from rasterio.enums import Resampling
+
+    with rasterio.open(binary_file) as src:
+        # Resample using nearest neighbor to preserve binary values
+        binary_map = src.read(
+            1,
+            out_shape=target_shape,
+            resampling=Resampling.nearest
+        )
+    binary_map = (binary_map != 0).astype(np.uint8)
+    artifact_cache.save_array(cache_file, np.packbits(binary_map))
+    return binary_map
+
+# Environment pack built by envpack.py; the per-layer .npy files are read when it is absent
+ENVIRONMENT_PACK = "environment.pack"
+
+# Land mask GeoTIFF (1 = land), resampled to the routing grid
+LAND_MASK_FILE = "indian_ocean_binary.tif"
+
+def load_data(pack_file=ENVIRONMENT_PACK, target_shape=None):
+    """
+    Load and prepare all necessary data for pathfinding.
+
+    Environment layers come from the memory-mapped environment pack when it exists (float32,
+    wind direction already in radians, grid bounds from its header), otherwise from the
+    legacy .npy files on the default grid.
+
+    Parameters:
+    - pack_file: Environment pack to read
+    - target_shape: Routing grid shape; defaults to the data's own grid, otherwise the layers
+      are resampled (see resample_layer) and the land mask is read at this resolution
+
+    Returns:
+    - binary_map: 2D numpy array representing obstacles
+    - wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map: Environmental data
+    - lat_min, lon_min, lat_res, lon_res: Map parameters
+    - grid_size: Size of the grid (assumed square)
+    """
+    if os.path.exists(pack_file):
+        layers, header = envpack.open_pack(pack_file)
+        wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map = \
+            (layers[name] for name in envpack.PACK_LAYERS)
+        data_shape = tuple(header['shape'])
+        lat_min, lon_min = header['lat_min'], header['lon_min']
+        lat_res, lon_res = header['lat_res'], header['lon_res']
+    else:
+        # Shape of the .npy layers
+        data_shape = (900, 900)
+
+        # Define map bounds
+        lat_min, lat_max = -60, 30
+        lon_min, lon_max = 20, 120
+        lat_res = (lat_max - lat_min) / data_shape[0]
+        lon_res = (lon_max - lon_min) / data_shape[1]
+
+        # Load additional data
+        wind_speed_map = np.load('wind_speed_data.npy')       # Wind speed (F) in m/s
+        wind_angle_map_deg = np.load('wind_dir_data.npy')    # Wind direction in degrees
+        wave_height_map = np.load('wave_height_data.npy')    # Wave height (h) in meters
+        usurf_map = np.load('usurf_data.npy')                # Water current east-west component (m/s)
+        vsurf_map = np.load('vsurf_data.npy')                # Water current north-south component (m/s)
+
+        # Convert wind angles from degrees to radians
+        wind_angle_map_rad = np.radians(wind_angle_map_deg)
+
+    if target_shape is None or tuple(target_shape) == data_shape:
+        target_shape = data_shape
+    else:
+        target_shape = tuple(target_shape)
+        wind_speed_map, wave_height_map, usurf_map, vsurf_map = (
+            resample_layer(layer, target_shape) for layer in (wind_speed_map, wave_height_map, usurf_map, vsurf_map))
+        wind_angle_map_rad = resample_layer(wind_angle_map_rad, target_shape, reduce='angle')
+        lat_res *= data_shape[0] / target_shape[0]
+        lon_res *= data_shape[1] / target_shape[1]
+
+    grid_size = target_shape[0]  # Assuming square grid
+
+    # Load and resize binary map
+    binary_map = load_land_mask(LAND_MASK_FILE, target_shape)
     
-    # Assign values to global variables
+    # Ensure all loaded maps have the correct shape
+    assert wind_speed_map.shape == target_shape, "Wind speed map shape mismatch."
+    assert wind_angle_map_rad.shape == target_shape, "Wind angle map shape mismatch."
+    assert wave_height_map.shape == target_shape, "Wave height map shape mismatch."
+    assert usurf_map.shape == target_shape, "usurf map shape mismatch."
+    assert vsurf_map.shape == target_shape, "vsurf map shape mismatch."
+    
+    return binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map, lat_min, lon_min, lat_res, lon_res, grid_size
+
+# ---------------------- Pirate Attack Processing ---------------------- #
+#
+# Every incident raises the risk of the cells within buffer_degree of it. With the default box
+# kernel each incident adds 1 over the box of cells whose corners latlon_to_index gives for
+# (lat, lon) +/- buffer_degree; the boxes of all incidents are accumulated at once with a 2D
+# difference array (+1/-1 at the four corners, then a cumulative sum along both axes), so the
+# cost is O(grid + incidents) whatever the buffer. The distance-decayed kernels spread each
+# incident by distance in degrees instead: incidents are counted per cell and the counts are
+# convolved with the kernel through an FFT. Either way the map is normalized to 0-1.
+
+# Distance-decayed kernels: weight at a distance d (degrees) from an incident, zero beyond the buffer
+RISK_KERNELS = {
+    'linear': lambda d, buffer_degree: np.maximum(1 - d / buffer_degree, 0.0),
+    'gaussian': lambda d, buffer_degree: np.where(d <= buffer_degree, np.exp(-2 * (d / buffer_degree) ** 2), 0.0),
+}
+
+def read_incidents(csv_file):
+    """
+    Latitudes and longitudes of the incidents in a CSV file with 'latitude' and 'longitude' columns.
+    """
+    with open(csv_file, newline='') as f:
+        header = next(csv.reader(f))
+    columns = (header.index('latitude'), header.index('longitude'))
+    coordinates = np.loadtxt(csv_file, delimiter=',', skiprows=1, usecols=columns, ndmin=2)
+    return coordinates[:, 0], coordinates[:, 1]
+
+def _grid_indices(lats, lons, lat_min, lon_min, lat_res, lon_res, grid_size):
+    """
+    Vectorized latlon_to_index (truncating toward zero like int()); indices may be off the grid.
+    """
+    x = np.trunc((lats - lat_min) / lat_res).astype(np.int64)
+    y = np.trunc((lons - lon_min) / lon_res).astype(np.int64)
+    return grid_size - 1 - x, y
+
+def rasterize_incident_boxes(lats, lons, lat_min, lon_min, lat_res, lon_res, grid_size, buffer_degree=0.5):
+    """
+    Number of incidents whose buffer box covers each cell, accumulated with a 2D difference array.
+    """
+    # Northern edge is the smaller row
+    top, left = _grid_indices(lats + buffer_degree, lons - buffer_degree, lat_min, lon_min, lat_res, lon_res, grid_size)
+    bottom, right = _grid_indices(lats - buffer_degree, lons + buffer_degree, lat_min, lon_min, lat_res, lon_res,
+                                  grid_size)
+    top, left = np.maximum(top, 0), np.maximum(left, 0)
+    bottom, right = np.minimum(bottom, grid_size - 1), np.minimum(right, grid_size - 1)
+    inside = (top <= bottom) & (left <= right)
+    top, left, bottom, right = top[inside], left[inside], bottom[inside], right[inside]
+
+    width = grid_size + 1
+    corners = np.concatenate([top * width + left, top * width + right + 1,
+                              (bottom + 1) * width + left, (bottom + 1) * width + right + 1])
+    signs = np.repeat([1.0, -1.0, -1.0, 1.0], len(top))
+    difference = np.bincount(corners, weights=signs, minlength=width * width).reshape(width, width)
+    return difference.cumsum(axis=0).cumsum(axis=1)[:grid_size, :grid_size]
+
+def rasterize_incident_kernel(lats, lons, lat_min, lon_min, lat_res, lon_res, grid_size, buffer_degree=0.5,
+                              kernel='linear'):
+    """
+    Sum over incidents of a RISK_KERNELS weight of their distance from each cell, by FFT convolution.
+    """
+    # Kernel over the cell offsets within the buffer
+    radius_rows = int(buffer_degree / lat_res)
+    radius_cols = int(buffer_degree / lon_res)
+    d_lat = np.arange(-radius_rows, radius_rows + 1)[:, None] * lat_res
+    d_lon = np.arange(-radius_cols, radius_cols + 1)[None, :] * lon_res
+    weights = RISK_KERNELS[kernel](np.hypot(d_lat, d_lon), buffer_degree)
+
+    # Incidents counted per cell on the grid padded by the kernel radius, so those just off the grid still count
+    rows, cols = _grid_indices(lats, lons, lat_min, lon_min, lat_res, lon_res, grid_size)
+    rows, cols = rows + radius_rows, cols + radius_cols
+    padded = (grid_size + 2 * radius_rows, grid_size + 2 * radius_cols)
+    inside = (rows >= 0) & (rows < padded[0]) & (cols >= 0) & (cols < padded[1])
+    counts = np.bincount(rows[inside] * padded[1] + cols[inside], minlength=padded[0] * padded[1]).reshape(padded)
+
+    shape = (padded[0] + weights.shape[0] - 1, padded[1] + weights.shape[1] - 1)
+    spread = np.fft.irfft2(np.fft.rfft2(counts, shape) * np.fft.rfft2(weights, shape), shape)
+    spread = spread[2 * radius_rows:2 * radius_rows + grid_size, 2 * radius_cols:2 * radius_cols + grid_size]
+    # Round-off of the transform leaves tiny values where no incident reaches
+    return np.where(spread > 1e-9, spread, 0.0)
+
+def load_pirate_attacks(csv_file, lat_min, lon_min, lat_res, lon_res, grid_size, buffer_degree=0.5, kernel='box'):
+    """
+    Load pirate attack coordinates and mark buffer zones on the risk map.
+
+    The map is cached keyed on the CSV's content hash, the grid geometry, the buffer and the
+    kernel, so an unchanged incident file is only rasterized once.
+
+    Parameters:
+    - csv_file: Incident coordinates ('latitude' and 'longitude' columns)
+    - buffer_degree: Reach of each incident in degrees
+    - kernel: 'box' (count of incidents within the buffer box) or a RISK_KERNELS name
+
+    Returns:
+    - (grid_size, grid_size) risk map normalized to 0-1
+    """
+    key = artifact_cache.key_digest(artifact_cache.file_digest(csv_file), lat_min, lon_min, lat_res, lon_res,
+                                    grid_size, buffer_degree, kernel)
+    cache_file = artifact_cache.cache_path('pirate_risk', key)
+    pirate_risk_map = artifact_cache.load_array(cache_file)
+    if pirate_risk_map is not None:
+        return pirate_risk_map
+
+    lats, lons = read_incidents(csv_file)
+    geometry = (lat_min, lon_min, lat_res, lon_res, grid_size, buffer_degree)
+    if kernel == 'box':
+        pirate_risk_map = rasterize_incident_boxes(lats, lons, *geometry)
+    else:
+        pirate_risk_map = rasterize_incident_kernel(lats, lons, *geometry, kernel=kernel)
+
+    # Normalize pirate risk map to 0-1
+    if np.max(pirate_risk_map) > 0:
+        pirate_risk_map = pirate_risk_map / np.max(pirate_risk_map)
+
+    artifact_cache.save_array(cache_file, pirate_risk_map)
+    return pirate_risk_map
+
+# ---------------------- Visualization Functions ---------------------- #
+#
+# matplotlib is only imported when something is plotted, so routing without plots never pays
+# for it. Plots render with the non-interactive Agg backend unless INTERACTIVE_PLOTS is set
+# (as when this file is run as a script), which also makes plot_paths open a window.
+
+INTERACTIVE_PLOTS = False
+
+def _pyplot():
+    import matplotlib
+    if not INTERACTIVE_PLOTS:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def plot_paths(binary_map, path_shortest, path_safest, path_fuel, path_weighted, lat_min, lon_min, lat_res, lon_res, grid_size, new_position=None):
+    """
+    Plot the shortest, safest, fuel-efficient, and weighted paths on the map.
+    Optionally, plot the new ship position.
+    """
+    plt = _pyplot()
+    plt.figure(figsize=(12, 10))
+    plt.imshow(binary_map, cmap='gray', origin='upper')
+    
+    if path_shortest:
+        path_x_short, path_y_short = zip(*path_shortest)
+        plt.plot(path_y_short, path_x_short, color='red', linewidth=2, label='Route 1: Shortest Path')
+    
+    if path_safest:
+        path_x_saf, path_y_saf = zip(*path_safest)
+        plt.plot(path_y_saf, path_x_saf, color='blue', linewidth=2, label='Route 2: Safest Path')
+    
+    if path_fuel:
+        path_x_fuel, path_y_fuel = zip(*path_fuel)
+        plt.plot(path_y_fuel, path_x_fuel, color='green', linewidth=2, label='Route 3: Fuel-Efficient Path')
+    
+    if path_weighted:
+        path_x_weighted, path_y_weighted = zip(*path_weighted)
+        plt.plot(path_y_weighted, path_x_weighted, color='pink', linewidth=2, label='Route 4: Weighted Path')
+    
+    # Mark start and goal
+    if path_shortest:
+        plt.scatter([path_shortest[0][1], path_shortest[-1][1]],
+                    [path_shortest[0][0], path_shortest[-1][0]],
+                    c=['green', 'yellow'], marker='o', label='Start/Goal')
+    
+    # Plot new ship position if provided
+    if new_position:
+        new_lat, new_lon = new_position
+        new_x, new_y = latlon_to_index(new_lat, new_lon, lat_min, lon_min, lat_res, lon_res, grid_size)
+        plt.scatter(new_y, new_x, c='cyan', marker='x', s=100, label='New Position (After 3 Hours)')
+    
+    plt.legend()
+    plt.title("Theta* Pathfinding: Routes 1-4")
+    plt.xlabel("Longitude Index")
+    plt.ylabel("Latitude Index")
+    plt.grid(False)
+    if INTERACTIVE_PLOTS:
+        plt.show()
+    else:
+        plt.close()
+
+# Environment layers rendered alongside every route: (environment key, title, colorbar label, file name)
+ENVIRONMENT_PLOTS = (
+    ('wind_speed_map', "Wind Speed Map", "Wind Speed (m/s)", "wind_speed_map.svg"),
+    ('wave_height_map', "Wave Height Map", "Wave Height (m)", "wave_height_map.svg"),
+    ('usurf_map', "East-West Water Current (USurf) Map", "U Surface Current (m/s)", "usurf_map.svg"),
+    ('vsurf_map', "North-South Water Current (VSurf) Map", "V Surface Current (m/s)", "vsurf_map.svg"),
+)
+
+def save_plot(data, title, colorbar_label, filename, cmap='cool'):
+    """
+    Save a single environment layer as an SVG heat map (filename may also be a binary file object).
+    """
+    plt = _pyplot()
+    plt.figure(figsize=(10, 8))
+    plt.imshow(data, cmap=cmap, origin='upper')
+    plt.colorbar(label=colorbar_label)
+    plt.title(title)
+    plt.xlabel("Longitude Index")
+    plt.ylabel("Latitude Index")
+    plt.grid(False)
+    plt.savefig(filename, format='svg')
+    plt.close()
+
+def save_environment_plots(environment, prefix=''):
+    """
+    Save the wind speed, wave height and surface current maps as SVGs; returns the file names.
+    """
+    files = []
+    for key, title, colorbar_label, filename in ENVIRONMENT_PLOTS:
+        save_plot(environment[key], title, colorbar_label, prefix + filename)
+        files.append(prefix + filename)
+    return files
+
+def plot_path(digest):
+    """
+    Artifact cache file of a rendered environment plot, by content digest.
+    """
+    return artifact_cache.cache_path('plot', digest, '.svg')
+
+def environment_plot_digests(environment):
+    """
+    The environment plots of an environment version, rendered only the first time and stored
+    in the artifact cache under the digest of their contents (see plot_path).
+
+    Returns:
+    - dict mapping each ENVIRONMENT_PLOTS file name to its content digest
+    """
+    index_path = artifact_cache.cache_path('plot_index', environment['version'], '.json')
+    index = artifact_cache.load_bytes(index_path)
+    if index is not None:
+        digests = json.loads(index)
+        if all(os.path.exists(plot_path(digest)) for digest in digests.values()):
+            return digests
+
+    digests = {}
+    for key, title, colorbar_label, filename in ENVIRONMENT_PLOTS:
+        svg = io.BytesIO()
+        save_plot(environment[key], title, colorbar_label, svg)
+        content = svg.getvalue()
+        digests[filename] = hashlib.sha256(content).hexdigest()[:24]
+        artifact_cache.save_bytes(plot_path(digests[filename]), content)
+    artifact_cache.save_bytes(index_path, json.dumps(digests).encode('utf-8'))
+    return digests
+
+# ---------------------- CSV Saving Function ---------------------- #
+
+def path_latlon_csv(path, lat_min, lon_min, lat_res, lon_res, grid_size):
+    """
+    A path of grid indices as CSV text of latitudes and longitudes (as save_path_as_latlon_csv writes).
+    """
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(['Latitude', 'Longitude'])
+    for i, j in path:
+        writer.writerow(index_to_latlon(i, j, lat_min, lon_min, lat_res, lon_res, grid_size))
+    return text.getvalue()
+
+def save_path_as_latlon_csv(path, lat_min, lon_min, lat_res, lon_res, grid_size, csv_file):
+    """
+    Convert a path of grid indices to latitude and longitude and save it directly to a CSV file.
+    """
+    def index_to_latlon_inner(x, y, lat_min, lon_min, lat_res, lon_res, grid_size):
+        lat = lat_min + (grid_size - 1 - x) * lat_res
+        lon = lon_min + y * lon_res
+        return (lat, lon)
+
+    with open(csv_file, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['Latitude', 'Longitude'])  # Write header
+
+        for point in path:
+            i, j = point
+            lat, lon = index_to_latlon_inner(i, j, lat_min, lon_min, lat_res, lon_res, grid_size)
+            writer.writerow([lat, lon])
+
+    print(f"Latitude and longitude data saved to {csv_file}")
+
+# ---------------------- Route Evaluation ---------------------- #
+#
+# A found path is evaluated as whole arrays: the environment at every segment's destination
+# cell is gathered with one index, the speed, fuel and risk models are applied to all segments
+# together, and the cumulative voyage time locates the ship at any time with a binary search
+# (np.searchsorted), so positions at many times (a whole ETA timeline) take one call.
+
+def route_segments(path, wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map, pirate_risk_map,
+                   lat_min, lon_min, lat_res, lon_res, grid_size, ship_params):
+    """
+    Evaluate every segment of a path at once, each with the environment at its destination cell.
+
+    Parameters:
+    - path (list of tuples): Grid cells (row, col) of the path.
+    - wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map: Environmental data.
+    - pirate_risk_map (2D array): Pirate risk at each grid cell.
+    - lat_min, lon_min, lat_res, lon_res (floats), grid_size (int): Map parameters.
+    - ship_params (dict): Ship parameters for speed, fuel and risk (see configure_ship).
+
+    Returns:
+    - dict of arrays: 'lat' and 'lon' of every path point, 'elapsed' hours from departure to
+      every path point, and per segment 'distance' (km), 'speed' (km/h), 'time' (hours),
+      'fuel' (grams) and 'risk' (0-1)
+    """
+    cells = np.asarray(path, dtype=np.int64).reshape(-1, 2)
+    rows, cols = cells[:, 0], cells[:, 1]
+    lat = lat_min + (grid_size - 1 - rows) * lat_res
+    lon = lon_min + cols * lon_res
+    distance = haversine(lat[:-1], lon[:-1], lat[1:], lon[1:])
+
+    dest = (rows[1:], cols[1:])
+    F, wind_dir, h, usurf, vsurf, pirate_risk = (
+        np.asarray(layer[dest], dtype=np.float64)
+        for layer in (wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map, pirate_risk_map))
+
+    D = ship_params.get('D', 1000)
+    Cp = ship_params.get('Cp', 0.5)
+    Af = ship_params.get('Af', 50)
+    Z = ship_params.get('Z', 10)
+    TE = ship_params.get('TE', 10)
+    V0 = ship_params.get('ship_speed', 40)
+    drive_eff = ship_params.get('n_e', 0.85) * ship_params.get('n_h', 0.7) * ship_params.get('n_s', 0.75)
+
+    # Speed, as calculate_actual_speed
+    wave_dir = np.where((usurf != 0) | (vsurf != 0), np.arctan2(vsurf, usurf), 0.0)
+    theta_ship = np.arctan2(np.diff(rows), np.diff(cols))
+    q = _angle_difference(theta_ship - wave_dir)
+    alpha = _angle_difference(theta_ship - wind_dir)
+    Va = V0 - (1.08 * h - 0.126 * q * h + 2.77e-3 * F * np.cos(alpha)) * (1 - 2.33e-7 * D * V0)
+    speed = np.maximum(0.1, Va + usurf * np.cos(theta_ship) + vsurf * np.sin(theta_ship))
+    time_hours = distance / speed
+
+    # Fuel
+    R_tot = holtrop_mennen(R=0, V=speed, D=D) + calculate_added_resistance_waves(h) + \
+        calculate_added_resistance_wind(F, Cp=Cp, Af=Af)
+    p_b = np.maximum(np.maximum(R_tot, 1e-3) * speed / drive_eff, 1e-3)
+    fuel = p_b * ship_params.get('csfoc', 180) * time_hours
+
+    # Risk, as calculate_risk_values
+    u10max = calculate_u10max(Cp, Af, Z)
+    ucross = F * np.sin(alpha)
+    risk_wind = np.where(ucross < u10max, ucross / u10max, 1.0)
+    ratio = np.sqrt(np.where(h > 0, h, 0.0) / 9.81) / TE
+    risk_wave = np.where((ratio >= 0) & (ratio < 1), ratio, np.where((ratio >= 1) & (ratio < 2), 2 - ratio, 0.0))
+    risk_i = calculate_risk(risk_wind, risk_wave, ship_params.get('a1', 1/3), ship_params.get('a2', 1/3))
+    risk = np.minimum(risk_i + 0.3 * pirate_risk, 1.0)
+
+    return {
+        'lat': lat, 'lon': lon,
+        'elapsed': np.concatenate(([0.0], np.cumsum(time_hours))),
+        'distance': distance, 'speed': speed, 'time': time_hours, 'fuel': fuel, 'risk': risk,
+    }
+
+def path_totals(segments):
+    """
+    Total time (hours), fuel (gallons) and risk (% of the path's points) of an evaluated path.
+    """
+    return (float(segments['time'].sum()), float(segments['fuel'].sum()) / 850 * 0.264172,
+            float(segments['risk'].sum()) / len(segments['lat']) * 100)
+
+def position_at(segments, hours):
+    """
+    Position of the ship along an evaluated path after some hours of travel, interpolated
+    linearly between path points; times past arrival give the last point.
+
+    Parameters:
+    - segments: route_segments() of the path
+    - hours: one time or an array of times (hours after departure)
+
+    Returns:
+    - lat, lon: floats, or arrays shaped like hours
+    """
+    lat, lon, elapsed = segments['lat'], segments['lon'], segments['elapsed']
+    hours = np.asarray(hours, dtype=float)
+    if len(lat) < 2:
+        position = np.full(hours.shape, lat[-1]), np.full(hours.shape, lon[-1])
+    else:
+        # Segment during which each time falls: the first one ending at or after it
+        k = np.searchsorted(elapsed[1:], hours)
+        arrived = k >= len(lat) - 1
+        k = np.minimum(k, len(lat) - 2)
+        fraction = (hours - elapsed[k]) / segments['time'][k]
+        position = (np.where(arrived, lat[-1], lat[k] + (lat[k + 1] - lat[k]) * fraction),
+                    np.where(arrived, lon[-1], lon[k] + (lon[k + 1] - lon[k]) * fraction))
+    if hours.ndim == 0:
+        return float(position[0]), float(position[1])
+    return position
+
+def eta_timeline(segments, step=1.0):
+    """
+    Position of the ship every `step` hours from departure, and at arrival.
+
+    Returns:
+    - hours, lats, lons: arrays, the last entry being the arrival
+    """
+    arrival = segments['elapsed'][-1]
+    hours = np.append(np.arange(0.0, arrival, step), arrival)
+    lats, lons = position_at(segments, hours)
+    return hours, lats, lons
+
+def calculate_path_metrics(path, wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map,
+                           pirate_risk_map, lat_min, lon_min, lat_res, lon_res, grid_size, ship_params):
+    """
+    Calculate total time, fuel, and risk for a given path based on environmental and ship parameters.
+
+    Returns:
+    total_time (float): Total time in hours for the entire path.
+    total_fuel (float): Total fuel consumption in gallons for the entire path.
+    total_risk (float): Total cumulative risk for the path.
+    """
+    return path_totals(route_segments(path, wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map,
+                                      vsurf_map, pirate_risk_map, lat_min, lon_min, lat_res, lon_res, grid_size,
+                                      ship_params))
+
+def simulate_travel(path, wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map, pirate_risk_map, lat_min, lon_min, lat_res, lon_res, grid_size, ship_params, travel_time=3.0):
+    """
+    Simulate the ship traveling along the selected path for a specified amount of time (in hours).
+
+    Returns:
+    - new_position (tuple): New latitude and longitude after traveling.
+    """
+    return position_at(route_segments(path, wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map,
+                                      vsurf_map, pirate_risk_map, lat_min, lon_min, lat_res, lon_res, grid_size,
+                                      ship_params), travel_time)
+
+# ---------------------- Ship and Environment Setup ---------------------- #
+
+# Order of the values returned by load_data()
+ENVIRONMENT_KEYS = ('binary_map', 'wind_speed_map', 'wind_angle_map_rad', 'wave_height_map', 'usurf_map', 'vsurf_map',
+                    'lat_min', 'lon_min', 'lat_res', 'lon_res', 'grid_size')
+
+def configure_ship(ship_speed, ship_dis, area_front, ship_reso, hull_eff, prop_eff, engine_eff, c_sfoc):
+    """
+    Set the module-level ship parameters used by the cost model and mirror them into ship_params.
+    """
+    global D, Cp, Af, Z, TE, n_h, n_s, n_e, a1, a2, pirate_risk_factor, ship_speed_global, csfoc
+
     D = ship_dis                # Ship displacement (tonnes)
     Cp = 0.5                    # Wind pressure coefficient
     Af = area_front             # Frontal area of the ship (m²)
@@ -1195,48 +2278,904 @@ def main(start_lat, start_lon, goal_lat, goal_lon, ship_speed, ship_dis, area_fr
     n_h = hull_eff              # Hull efficiency
     n_s = prop_eff              # Propeller efficiency
     n_e = engine_eff            # Engine shaft efficiency
-    csfoc = c_sfoc               # Specific Fuel Oil Consumption (g/kWh)
+    csfoc = c_sfoc              # Specific Fuel Oil Consumption (g/kWh)
     a1 = 1 / 3                  # Weight for wind risk
     a2 = 1 / 3                  # Weight for wave risk
     pirate_risk_factor = 0.3    # Weight for pirate risk
     ship_speed_global = ship_speed  # Ship's hydrostatic speed in km/h
 
-    print("Global variables initialized:")
-    print(f"D = {D}, Cp = {Cp}, Af = {Af}, Z = {Z}, TE = {TE}, n_h = {n_h}, n_s = {n_s}, n_e = {n_e}, csfoc = {csfoc}")
-   
+    ship_params.update({
+        'D': D, 'Cp': Cp, 'Af': Af, 'Z': Z, 'TE': TE, 'n_h': n_h, 'n_s': n_s, 'n_e': n_e,
+        'csfoc': csfoc, 'a1': a1, 'a2': a2, 'pirate_risk_factor': pirate_risk_factor, 'ship_speed': ship_speed
+    })
+    return ship_params
 
-    binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map, lat_min, lon_min, lat_res, lon_res, grid_size = load_data()
-    
-    # Load and process pirate attacks
-    pirate_risk_map = load_pirate_attacks(
-        csv_file='filtered_coordinates.csv',
-        lat_min=lat_min,
-        lon_min=lon_min,
-        lat_res=lat_res,
-        lon_res=lon_res,
-        grid_size=grid_size,
+def load_environment(pirate_csv='filtered_coordinates.csv', resolutions=None):
+    """
+    Load the land mask, environment arrays and pirate risk map once.
+
+    Parameters:
+    - pirate_csv: Pirate attack coordinates
+    - resolutions: Optional grid sizes for coarse-to-fine routing, e.g. (225, 450, 900, 1800);
+      the environment is loaded at the largest and the others are pooled from it
+
+    Returns:
+    - dict with the load_data() values under ENVIRONMENT_KEYS plus 'pirate_risk_map', with
+      resolutions also 'pyramid': the coarser levels (same keys), coarsest first, and when the
+      environment pack holds several forecast slices also 'forecast_pack': its file name
+      (the maps are its first slice); 'version' identifies the source data and grid, for
+      keying caches of results computed against the environment
+    """
+    finest = max(resolutions) if resolutions else None
+    environment = dict(zip(ENVIRONMENT_KEYS, load_data(target_shape=(finest, finest) if finest else None)))
+    environment['pirate_risk_map'] = load_pirate_attacks(
+        csv_file=pirate_csv,
+        lat_min=environment['lat_min'],
+        lon_min=environment['lon_min'],
+        lat_res=environment['lat_res'],
+        lon_res=environment['lon_res'],
+        grid_size=environment['grid_size'],
         buffer_degree=0.5
     )
+    if resolutions:
+        environment['pyramid'] = build_pyramid(environment, resolutions)
+    if os.path.exists(ENVIRONMENT_PACK):
+        header = envpack.read_pack_header(ENVIRONMENT_PACK)
+        if len(header['times']) > 1:
+            environment['forecast_pack'] = ENVIRONMENT_PACK
+        data_version = envpack.pack_version(header)
+    else:
+        data_version = [artifact_cache.file_digest(filename) for filename in envpack.NPY_SOURCES.values()]
+    environment['version'] = artifact_cache.key_digest(
+        data_version, artifact_cache.file_digest(LAND_MASK_FILE), artifact_cache.file_digest(pirate_csv),
+        environment['grid_size'])
+    return environment
+
+# ---------------------- Multi-Resolution (Coarse-to-Fine) Routing ---------------------- #
+#
+# A route is first solved on a coarse copy of the grid, where a search touches a small fraction
+# of the cells, and each finer level then only prices and searches a corridor around the route
+# found one level up. Coarse cells are water if any of their cells is, so every fine route has
+# a coarse counterpart; when the corridor still turns out to be blocked at a finer level, that
+# level is searched in full.
+
+# Cells (at the finer level) added on every side of a coarse route to form the next corridor
+CORRIDOR_RADIUS = 4
+
+def resample_layer(layer, target_shape, reduce='mean'):
+    """
+    Resample a 2D layer to target_shape by whole-number factors.
 
+    Coarser shapes pool each block of cells: reduce='mean', 'min' or 'angle' (circular mean
+    of directions in radians). Finer shapes repeat each cell.
+    """
+    layer = np.asarray(layer)
+    rows, cols = layer.shape
+    out_rows, out_cols = target_shape
+    if out_rows >= rows and out_cols >= cols:
+        if out_rows % rows or out_cols % cols:
+            raise ValueError(f"Cannot resample a {layer.shape} layer to {target_shape}.")
+        return np.repeat(np.repeat(layer, out_rows // rows, axis=0), out_cols // cols, axis=1)
+    if out_rows > rows or out_cols > cols or rows % out_rows or cols % out_cols:
+        raise ValueError(f"Cannot resample a {layer.shape} layer to {target_shape}.")
+
+    blocks = layer.reshape(out_rows, rows // out_rows, out_cols, cols // out_cols)
+    if reduce == 'angle':
+        return np.arctan2(np.sin(blocks).mean(axis=(1, 3)), np.cos(blocks).mean(axis=(1, 3)))
+    if reduce == 'min':
+        return blocks.min(axis=(1, 3))
+    return blocks.mean(axis=(1, 3))
+
+def coarsen_environment(environment, grid_size):
+    """
+    Pool an environment (see load_environment) down to a grid_size x grid_size grid.
+    """
+    shape = (grid_size, grid_size)
+    factor = environment['grid_size'] / grid_size
+    level = {
+        # A coarse cell is land only if all of its cells are
+        'binary_map': resample_layer(environment['binary_map'], shape, reduce='min'),
+        'wind_angle_map_rad': resample_layer(environment['wind_angle_map_rad'], shape, reduce='angle'),
+        'lat_min': environment['lat_min'],
+        'lon_min': environment['lon_min'],
+        'lat_res': environment['lat_res'] * factor,
+        'lon_res': environment['lon_res'] * factor,
+        'grid_size': grid_size,
+    }
+    for key in ('wind_speed_map', 'wave_height_map', 'usurf_map', 'vsurf_map', 'pirate_risk_map'):
+        level[key] = resample_layer(environment[key], shape)
+    return level
+
+def build_pyramid(environment, resolutions):
+    """
+    Coarser copies of an environment for the given grid sizes (those below its own), coarsest first.
+    """
+    return [coarsen_environment(environment, grid_size)
+            for grid_size in sorted(set(resolutions)) if grid_size < environment['grid_size']]
 
-    def save_plot(data, title, colorbar_label, filename, cmap='cool'):
-        plt.figure(figsize=(10, 8))
-        plt.imshow(data, cmap=cmap, origin='upper')
-        plt.colorbar(label=colorbar_label)
-        plt.title(title)
-        plt.xlabel("Longitude Index")
-        plt.ylabel("Latitude Index")
-        plt.grid(False)
-        plt.savefig(filename, format='svg')
-        plt.close()
-    
-    save_plot(wind_speed_map, "Wind Speed Map", "Wind Speed (m/s)", "wind_speed_map.svg")
-    save_plot(wave_height_map, "Wave Height Map", "Wave Height (m)", "wave_height_map.svg")
-    save_plot(usurf_map, "East-West Water Current (USurf) Map", "U Surface Current (m/s)", "usurf_map.svg")
-    save_plot(vsurf_map, "North-South Water Current (VSurf) Map", "V Surface Current (m/s)", "vsurf_map.svg")
-    
+def dilate_mask(mask, radius):
+    """
+    Grow a 2D bool mask by radius cells in every direction (square neighbourhood).
+    """
+    grown = mask.copy()
+    for axis in (0, 1):
+        source = np.moveaxis(grown.copy(), axis, 0)
+        target = np.moveaxis(grown, axis, 0)
+        for step in range(1, radius + 1):
+            target[step:] |= source[:-step]
+            target[:-step] |= source[step:]
+    return grown
+
+def project_corridor(path, factor, shape, radius=CORRIDOR_RADIUS):
+    """
+    Cells of a grid `factor` times finer than the path's that lie within radius cells of it.
+    """
+    cells = np.asarray(path)
+    coarse = np.zeros((-(-shape[0] // factor), -(-shape[1] // factor)), dtype=bool)
+    coarse[cells[:, 0], cells[:, 1]] = True
+    fine = np.repeat(np.repeat(coarse, factor, axis=0), factor, axis=1)[:shape[0], :shape[1]]
+    return dilate_mask(fine, radius)
+
+def multiresolution_route(objective, environment, start, goal, ship_speed, weights=(0.25, 0.375, 0.375),
+                          radius=CORRIDOR_RADIUS):
+    """
+    Solve one route objective coarse-to-fine over environment['pyramid'] (see load_environment).
+
+    Parameters:
+    - objective: one of ROUTE_OBJECTIVES
+    - environment: the full-resolution environment, with its 'pyramid' of coarser levels
+    - start, goal: (row, col) cells on the full-resolution grid
+    - radius: corridor half-width in cells of each finer level
+
+    Returns:
+    - result: the result tuple of the objective's theta_star_* function on the full-resolution grid
+    - report: one dict per level, coarsest first, with its 'grid_size', the fraction of its
+      cells that were priced and searchable ('touched') and whether the corridor had to be
+      abandoned for a full search ('fallback')
+    """
+    levels = list(environment.get('pyramid', ())) + [environment]
+    no_options = {'any_angle': False, 'bidirectional': False, 'hierarchical': False, 'landmarks': False}
+    corridor = None
+    previous_size = None
+    report = []
+    result = None
+
+    for level in levels:
+        grid_size = level['grid_size']
+        factor = environment['grid_size'] // grid_size
+        level_start = (start[0] // factor, start[1] // factor)
+        level_goal = (goal[0] // factor, goal[1] // factor)
+        binary_map = level['binary_map']
+        if result is not None:
+            corridor = project_corridor(result[0], grid_size // previous_size, binary_map.shape, radius)
+
+        env_maps = tuple(level[key] for key in ENV_MAP_KEYS)
+        search_args = (level_start, level_goal, ship_speed, level['lat_min'], level['lon_min'],
+                       level['lat_res'], level['lon_res'], grid_size, weights, no_options)
+        fallback = False
+        while True:
+            cost_layers = build_cost_layers(binary_map, *env_maps, ship_speed, level['lat_min'], level['lon_min'],
+                                            level['lat_res'], level['lon_res'], grid_size,
+                                            pirate_risk_map=level['pirate_risk_map'], region=corridor)
+            result = _run_route_search(objective, binary_map, env_maps, cost_layers, search_args)
+            if result[0] is not None or corridor is None:
+                break
+            corridor = None
+            fallback = True
+
+        report.append({'grid_size': grid_size, 'touched': 1.0 if corridor is None else float(corridor.mean()),
+                       'fallback': fallback})
+        if result[0] is None:
+            break
+        previous_size = grid_size
+
+    return result, report
+
+# ---------------------- Time-Dependent (Forecast) Routing ---------------------- #
+#
+# With a forecast pack (several time slices, see envpack.py) every move is priced with the
+# conditions expected when the ship makes it: the costs of the two slices around the ship's
+# arrival time at the cell it leaves are interpolated linearly, and times outside the forecast
+# use the nearest slice. A slice is only read and priced (as in build_cost_layers) when the
+# search first reaches its time, and priced slices are kept in a small least-recently-used
+# memo, so a query only pays for the slices its voyage spans.
+
+# Route objectives searched on the forecast, and the cost layer each one minimizes
+TIME_DEPENDENT_OBJECTIVES = {'shortest': 'time', 'fuel': 'fuel'}
+
+# Priced forecast slices kept in memory by this process, most recent last
+# (each holds a time and a fuel (8, rows, cols) float32 layer)
+FORECAST_SLICE_MEMO_SIZE = 8
+_forecast_slices = {}
+
+def forecast_slice_layers(cube, header, index, binary_map, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size):
+    """
+    Time and fuel cost layers of one slice of a forecast cube (see envpack.open_cube), priced
+    on first use. Slices are keyed on the pack version and the ship (see configure_ship), so a
+    new pack or ship profile gets its own layers.
+    """
+    key = (envpack.pack_version(header), index, tuple(sorted(ship_params.items())), ship_speed,
+           lat_min, lon_min, lat_res, lon_res, grid_size)
+    if key in _forecast_slices:
+        layers = _forecast_slices.pop(key)
+    else:
+        env_maps = (cube[index, header['layers'].index(name)] for name in envpack.PACK_LAYERS)
+        layers = build_cost_layers(binary_map, *env_maps, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size)
+        layers = {name: layers[name] for name in ('time', 'fuel')}
+        if len(_forecast_slices) >= FORECAST_SLICE_MEMO_SIZE:
+            del _forecast_slices[next(iter(_forecast_slices))]
+    _forecast_slices[key] = layers
+    return layers
+
+def forecast_cost_per_km(cube, header, ship_speed):
+    """
+    Smallest time and fuel per km of any move at any time of a forecast pack, from the value
+    ranges in its header (see _max_effective_speed and _min_fuel_per_km). Version 1 packs carry
+    no ranges and are scanned instead.
+    """
+    ranges = header.get('ranges')
+    if ranges is None:
+        ranges = {name: [float(np.nanmin(cube[:, i])), float(np.nanmax(cube[:, i]))]
+                  for i, name in enumerate(header['layers'])}
+    F = max(abs(value) for value in ranges['wind_speed'])
+    h_min, h_max = ranges['wave_height']
+    h = np.array([h_min, h_max, min(max(0.0, h_min), h_max)])
+    usurf = max(abs(value) for value in ranges['usurf'])
+    vsurf = max(abs(value) for value in ranges['vsurf'])
+    max_speed = float(_max_effective_speed(ship_speed, F, h, usurf, vsurf).max())
+    min_fuel = float(_min_fuel_per_km(max(ranges['wind_speed'][0], 0.0), max(h_min, 0.0)))
+    return {'time': 1.0 / max_speed, 'fuel': min_fuel}
+
+def _slice_weights(hours, t):
+    """
+    Slice indices around time t and the interpolation weight of the later one.
+    """
+    upper = bisect.bisect_right(hours, t)
+    if upper == 0:
+        return 0, 0, 0.0
+    if upper == len(hours):
+        return upper - 1, upper - 1, 0.0
+    lower = upper - 1
+    return lower, upper, (t - hours[lower]) / (hours[upper] - hours[lower])
+
+def time_dependent_search(start, goal, slice_layers, hours, departure=0.0, objective='time', heuristic=None,
+                          stats=None):
+    """
+    A* over the 8-connected grid with move costs that depend on when the move is made.
+
+    Every cell carries the time the ship reaches it; the moves out of a cell are priced with
+    the slice layers around that time. For objective='time' the arrival time is the cost
+    itself, and as long as leaving later never means arriving earlier the route is optimal;
+    for 'fuel' each cell keeps the arrival time of the cheapest path found to it.
+
+    Parameters:
+    - start, goal: (row, col) grid indices
+    - slice_layers: function(index) returning the cost layers of a forecast slice, with 'time'
+      and the objective's layer (see forecast_slice_layers)
+    - hours: increasing validity time of each slice, in hours after the first
+    - departure: departure time in hours after the first slice
+    - objective: the cost layer to minimize ('time' or 'fuel')
+    - heuristic: optional (rows, cols) field of lower bounds on the cost to the goal at any time
+    - stats: optional dict that receives 'expansions' and the indices of the slices used ('slices')
+
+    Returns:
+    - path: list of (row, col) from start to goal, or None if the goal is unreachable
+    - cost: total cost of the path (inf if unreachable)
+    - arrival: arrival time at the goal in hours after the first slice (inf if unreachable)
+    """
+    _, rows, cols = slice_layers(_slice_weights(hours, departure)[0])[objective].shape
+    n_cells = rows * cols
+    h = heuristic.ravel() if heuristic is not None else np.zeros(n_cells)
+    offsets = flat_neighbor_offsets(cols)
+    used = set()
+
+    def move_costs(name, idx, t):
+        lower, upper, weight = _slice_weights(hours, t)
+        used.update((lower, upper))
+        before = slice_layers(lower)[name].reshape(len(NEIGHBOR_OFFSETS), n_cells)[:, idx].tolist()
+        if weight == 0.0:
+            return before
+        after = slice_layers(upper)[name].reshape(len(NEIGHBOR_OFFSETS), n_cells)[:, idx].tolist()
+        return [(1 - weight) * a + weight * b for a, b in zip(before, after)]
+
+    g_cost = np.full(n_cells, INF)
+    arrival = np.full(n_cells, INF)
+    parent_dir = np.full(n_cells, -1, dtype=np.int8)
+    closed = np.zeros(n_cells, dtype=bool)
+
+    start_idx = start[0] * cols + start[1]
+    goal_idx = goal[0] * cols + goal[1]
+    g_cost[start_idx] = 0.0
+    arrival[start_idx] = departure
+    open_list = [(float(h[start_idx]), start_idx)]
+    expansions = 0
+
+    while open_list:
+        f, idx = heapq.heappop(open_list)
+        if closed[idx]:
+            continue  # Stale entry for a cell already expanded at a lower cost
+        closed[idx] = True
+        expansions += 1
+        if search_progress is not None and expansions % SEARCH_PROGRESS_INTERVAL == 0:
+            search_progress(expansions, f)
+
+        if idx == goal_idx:
+            break
+
+        t = arrival[idx]
+        times = move_costs('time', idx, t)
+        costs = times if objective == 'time' else move_costs(objective, idx, t)
+        g_current = g_cost[idx]
+        for d, cost in enumerate(costs):
+            if cost == INF:
+                continue
+            neighbor = idx + offsets[d]
+            if closed[neighbor]:
+                continue
+            tentative_g = g_current + cost
+            if tentative_g < g_cost[neighbor]:
+                g_cost[neighbor] = tentative_g
+                arrival[neighbor] = t + times[d]
+                parent_dir[neighbor] = d
+                heapq.heappush(open_list, (tentative_g + h[neighbor], neighbor))
+
+    if stats is not None:
+        stats['expansions'] = expansions
+        stats['slices'] = sorted(used)
+    if not closed[goal_idx]:
+        return None, INF, INF
+    return reconstruct_path(parent_dir, start_idx, goal_idx, cols), float(g_cost[goal_idx]), float(arrival[goal_idx])
+
+def forecast_slice_index(hours, t):
+    """
+    Index of the forecast slice nearest to time t (hours after the first slice).
+    """
+    return min(range(len(hours)), key=lambda index: abs(hours[index] - t))
+
+def time_dependent_route(objective, environment, start, goal, ship_speed, departure=0.0, stats=None):
+    """
+    Solve one route objective on the forecast pack of an environment (see load_environment).
+
+    Parameters:
+    - objective: one of TIME_DEPENDENT_OBJECTIVES
+    - environment: environment holding the 'forecast_pack' it was loaded from
+    - start, goal: (row, col) grid indices
+    - departure: departure time in hours after the first forecast slice
+
+    Returns:
+    - path, cost and arrival time as returned by time_dependent_search
+    """
+    pack_file = environment.get('forecast_pack')
+    if pack_file is None:
+        raise ValueError("Time-dependent routing needs an environment loaded from a forecast pack.")
+    cube, header = envpack.open_cube(pack_file)
+    binary_map = environment['binary_map']
+    if tuple(header['shape']) != binary_map.shape:
+        raise ValueError("Time-dependent routing needs the environment on the forecast pack's own grid.")
+    grid = tuple(environment[key] for key in ('lat_min', 'lon_min', 'lat_res', 'lon_res', 'grid_size'))
+
+    def slice_layers(index):
+        return forecast_slice_layers(cube, header, index, binary_map, ship_speed, *grid)
+
+    layer = TIME_DEPENDENT_OBJECTIVES[objective]
+    heuristic = heuristics.lower_bound_field(forecast_cost_per_km(cube, header, ship_speed)[layer],
+                                             distance_to_goal_field(goal, binary_map.shape, *grid))
+    return time_dependent_search(start, goal, slice_layers, envpack.slice_hours(header), departure, layer,
+                                 heuristic, stats)
+
+# ---------------------- Destination Port Cost-to-Go Fields ---------------------- #
+#
+# Most routes end at a handful of ports. For each registered port the exact time and fuel cost
+# from every cell to the port (see cost_to_go_fields) is stored together with the direction of
+# the first move of an optimal route from each cell, so a route to the port is read off by
+# following those directions from the start: no search, just one step per cell of the path.
+# Fields are stored in the artifact cache per environment version and ship profile (float32
+# costs, uint8 directions) and memory-mapped when used.
+
+# Registered destination ports: name -> (lat, lon)
+DESTINATION_PORTS = {
+    'Mumbai': (18.94, 72.84),
+    'Kochi': (9.97, 76.24),
+    'Chennai': (13.09, 80.30),
+    'Colombo': (6.95, 79.84),
+    'Jebel Ali': (25.01, 55.06),
+    'Salalah': (16.94, 54.00),
+    'Mombasa': (-4.07, 39.67),
+    'Port Louis': (-20.16, 57.49),
+    'Durban': (-29.87, 31.03),
+    'Singapore': (1.26, 103.84),
+}
+
+# Route objectives read off the port fields, and the cost layer of each one's field
+PORT_FIELD_OBJECTIVES = {'shortest': 'time', 'fuel': 'fuel'}
+PORT_FIELD_LAYERS = tuple(PORT_FIELD_OBJECTIVES.values())
+
+# Successor entry of the port itself and of cells that cannot reach it
+NO_SUCCESSOR = 255
+
+# Snapped port cells per environment version
+_port_cells = {}
+
+def nearest_water_cell(binary_map, cell):
+    """
+    The water cell closest (in grid cells) to the given cell; the cell itself if it is water.
+    """
+    if binary_map[cell] == 0:
+        return cell
+    water = np.argwhere(binary_map == 0)
+    return tuple(int(i) for i in water[np.abs(water - cell).max(axis=1).argmin()])
+
+def port_cells(environment):
+    """
+    Grid cell of every registered destination port, moved to the nearest water cell.
+    """
+    key = environment.get('version')
+    if key not in _port_cells:
+        grid = tuple(environment[name] for name in ('lat_min', 'lon_min', 'lat_res', 'lon_res', 'grid_size'))
+        _port_cells[key] = {name: nearest_water_cell(environment['binary_map'], latlon_to_index(lat, lon, *grid))
+                            for name, (lat, lon) in DESTINATION_PORTS.items()}
+    return _port_cells[key]
+
+def successor_directions(edge_costs, field):
+    """
+    Direction of the first move of an optimal route from every cell, given the exact
+    cost-to-go field of an (8, rows, cols) layer; NO_SUCCESSOR at the goal and where it
+    cannot be reached.
+    """
+    shape = field.shape
+    best = np.full(shape, INF)
+    successor = np.full(shape, NO_SUCCESSOR, dtype=np.uint8)
+    for d, (dr, dc) in enumerate(NEIGHBOR_OFFSETS):
+        src, dst = _shift_slices(dr, dc, shape)
+        candidate = edge_costs[d][src] + field[dst]
+        better = candidate < best[src]
+        best[src][better] = candidate[better]
+        successor[src][better] = d
+    successor[field == 0] = NO_SUCCESSOR
+    return successor
+
+def destination_fields(environment, port, ship_speed, cost_layers=None):
+    """
+    Cost-to-go fields and successor directions of one registered port for the current ship
+    (see configure_ship), from the artifact cache or built and stored on first use.
+
+    Returns:
+    - dict mapping each of PORT_FIELD_LAYERS to (field, successor): read-only memory-mapped
+      float32 costs to the port and uint8 directions
+    """
+    cell = port_cells(environment)[port]
+    key = artifact_cache.key_digest(environment['version'], sorted(ship_params.items()), ship_speed, list(cell))
+    paths = {layer: (artifact_cache.cache_path('port_cost', f"{key}_{layer}"),
+                     artifact_cache.cache_path('port_successor', f"{key}_{layer}"))
+             for layer in PORT_FIELD_LAYERS}
+
+    if not all(os.path.exists(path) for pair in paths.values() for path in pair):
+        if cost_layers is None:
+            cost_layers = build_cost_layers(*(environment[name] for name in ENVIRONMENT_KEYS[:6]), ship_speed,
+                                            *(environment[name] for name in ENVIRONMENT_KEYS[6:]))
+        fields = cost_to_go_fields([cost_layers[layer] for layer in PORT_FIELD_LAYERS], cell)
+        for layer, field in zip(PORT_FIELD_LAYERS, fields):
+            field_path, successor_path = paths[layer]
+            artifact_cache.save_array(successor_path, successor_directions(cost_layers[layer], field))
+            artifact_cache.save_array(field_path, field.astype(np.float32))
+
+    return {layer: (artifact_cache.load_array(field_path, mmap_mode='r'),
+                    artifact_cache.load_array(successor_path, mmap_mode='r'))
+            for layer, (field_path, successor_path) in paths.items()}
+
+def precompute_port_fields(environment, ship_speed, ports=None):
+    """
+    Build the fields of every registered port (or the given ones) for the current ship,
+    pricing the grid once.
+    """
+    cost_layers = build_cost_layers(*(environment[name] for name in ENVIRONMENT_KEYS[:6]), ship_speed,
+                                    *(environment[name] for name in ENVIRONMENT_KEYS[6:]))
+    for port in ports or DESTINATION_PORTS:
+        destination_fields(environment, port, ship_speed, cost_layers)
+
+def follow_successors(start, field, successor):
+    """
+    Route from start to the port of a cost-to-go field by following successor directions.
+
+    Returns:
+    - path: list of (row, col) from start to the port, or None if the port cannot be reached
+    - cost: the field's cost at start (inf if unreachable)
+    """
+    cost = float(field[start])
+    if cost == INF:
+        return None, INF
+    path = [start]
+    row, col = start
+    direction = int(successor[row, col])
+    while direction != NO_SUCCESSOR:
+        dr, dc = NEIGHBOR_OFFSETS[direction]
+        row, col = row + dr, col + dc
+        path.append((row, col))
+        direction = int(successor[row, col])
+    return path, cost
+
+def destination_port(environment, cell):
+    """
+    Name of the registered port at a grid cell, or None.
+    """
+    for name, port_cell in port_cells(environment).items():
+        if port_cell == cell:
+            return name
+    return None
+
+# ---------------------- Route Search Orchestration ---------------------- #
+
+ROUTE_OBJECTIVES = ('shortest', 'safest', 'fuel', 'weighted')
+ROUTE_LABELS = ('shortest path (Route 1)', 'safest path (Route 2)', 'fuel-efficient path (Route 3)',
+                'weighted path based on user-defined weights (Route 4)')
+
+def find_routes(start, goal, binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
+                usurf_map, vsurf_map, pirate_risk_map, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size,
+                weights=(0.25, 0.375, 0.375), cost_layers=None, parallel=False, max_workers=None, any_angle=False,
+                bidirectional=False, hierarchical=False, landmarks=False):
+    """
+    Run the shortest, safest, fuel-efficient and weighted searches from one data load.
+
+    The grid is priced once with build_cost_layers and shared by all four searches. With
+    parallel=True the four objectives run at once in a process pool that maps the cost
+    layers and environment maps from shared memory instead of receiving copies.
+
+    Parameters:
+    - weights: (weight_shortest, weight_safest, weight_fuel) for the weighted route
+    - cost_layers: Precomputed layers from build_cost_layers (built here if not given)
+    - any_angle: Search the shortest and fuel-efficient routes with line-of-sight shortcuts
+    - bidirectional: Search the shortest route from both ends at once
+    - hierarchical: Plan the shortest, safest and fuel-efficient routes on the HPA* cluster graph
+    - landmarks: Guide the shortest-route search with ALT landmark lower bounds
+
+    Returns:
+    - (shortest, safest, fuel, weighted): each the result tuple of the matching theta_star_* function
+    """
+    if cost_layers is None:
+        cost_layers = build_cost_layers(
+            binary_map, wind_speed_map, wind_angle_map_rad,
+            wave_height_map, usurf_map, vsurf_map,
+            ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size,
+            pirate_risk_map=pirate_risk_map
+        )
+    env_maps = (wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map)
+    search_options = {'any_angle': any_angle, 'bidirectional': bidirectional, 'hierarchical': hierarchical,
+                      'landmarks': landmarks}
+    search_args = (start, goal, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size, weights, search_options)
+
+    if parallel:
+        return _find_routes_parallel(binary_map, env_maps, cost_layers, search_args, max_workers)
+
+    return tuple(_run_route_search(objective, binary_map, env_maps, cost_layers, search_args)
+                 for objective in ROUTE_OBJECTIVES)
+
+# Environment maps shared with pool workers, in theta_star_* argument order
+ENV_MAP_KEYS = ('wind_speed_map', 'wind_angle_map_rad', 'wave_height_map', 'usurf_map', 'vsurf_map')
+
+# Arrays a pool worker has mapped from the parent's shared memory
+_worker_shared = {}
+
+def _run_route_search(objective, binary_map, env_maps, cost_layers, search_args):
+    """
+    Run one route objective against precomputed cost layers.
+    """
+    start, goal, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size, weights, options = search_args
+    common = (start, goal, binary_map, *env_maps, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size)
+
+    if objective == 'shortest':
+        return theta_star_shortest_path(*common, cost_layers=cost_layers, **options)
+    if objective == 'safest':
+        return theta_star_safest_path(*common, pirate_risk_map=None, cost_layers=cost_layers,
+                                      hierarchical=options['hierarchical'])
+    if objective == 'fuel':
+        return theta_star_min_fuel_path(*common, pirate_risk_map=None, cost_layers=cost_layers,
+                                        any_angle=options['any_angle'], hierarchical=options['hierarchical'])
+    if objective == 'weighted':
+        weight_shortest, weight_safest, weight_fuel = weights
+        return theta_star_weighted_path(*common, pirate_risk_map=None,
+                                        weight_shortest=weight_shortest, weight_safest=weight_safest,
+                                        weight_fuel=weight_fuel, cost_layers=cost_layers)
+    raise ValueError(f"Unknown route objective: {objective}")
+
+def _share_array(array):
+    """
+    Copy an array into a new shared memory block; returns the block and its (name, shape, dtype) spec.
+    """
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+def _attach_shared_arrays(specs, ship):
+    """
+    Process pool initializer: map the parent's shared arrays into this worker without copying,
+    and configure the parent's ship (see configure_ship), which a spawned worker does not inherit.
+    """
+    from multiprocessing import shared_memory
+
+    configure_ship(ship['ship_speed'], ship['D'], ship['Af'], ship['Z'], ship['n_h'], ship['n_s'], ship['n_e'],
+                   ship['csfoc'])
+    for key, (name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _worker_shared[key] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+def _run_shared_route_search(objective, search_args):
+    """
+    Pool task: run one objective on the cost layers mapped by _attach_shared_arrays.
+    """
+    arrays = {key: array for key, (_, array) in _worker_shared.items()}
+    binary_map = arrays.pop('binary_map')
+    env_maps = tuple(arrays.pop(key) for key in ENV_MAP_KEYS)
+    return _run_route_search(objective, binary_map, env_maps, arrays, search_args)
+
+def _find_routes_parallel(binary_map, env_maps, cost_layers, search_args, max_workers=None):
+    """
+    Run the four route objectives concurrently in a process pool over shared memory.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    shared = {'binary_map': binary_map}
+    shared.update(zip(ENV_MAP_KEYS, env_maps))
+    shared.update({name: cost_layers[name] for name in ('distance', 'time', 'fuel', 'risk')})
+
+    blocks = []
+    specs = {}
+    try:
+        for key, array in shared.items():
+            shm, specs[key] = _share_array(np.ascontiguousarray(array))
+            blocks.append(shm)
+
+        with ProcessPoolExecutor(max_workers=max_workers or len(ROUTE_OBJECTIVES),
+                                 initializer=_attach_shared_arrays, initargs=(specs, dict(ship_params))) as pool:
+            futures = [pool.submit(_run_shared_route_search, objective, search_args)
+                       for objective in ROUTE_OBJECTIVES]
+            return tuple(future.result() for future in futures)
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+# CSV written for each route objective
+ROUTE_CSV_FILES = {
+    'shortest': 'path_short.csv',
+    'safest': 'path_safe.csv',
+    'fuel': 'path_fuel.csv',
+    'weighted': 'path_weighted.csv',
+}
+
+def compute_routes(environment, start_lat, start_lon, goal_lat, goal_lon, ship_speed, ship_dis, area_front, ship_reso,
+                   hull_eff, prop_eff, engine_eff, c_sfoc, weights=(0.25, 0.375, 0.375), parallel=False,
+                   any_angle=False, bidirectional=False, hierarchical=False, landmarks=False, multiresolution=False,
+                   pareto=False, time_dependent=False, departure=0.0, port_fields=False):
+    """
+    Compute all four routes and their metrics against an already-loaded environment (see load_environment).
+
+    With multiresolution=True each route is solved coarse-to-fine over the environment's
+    'pyramid' (see multiresolution_route); the other search options then do not apply.
+    With pareto=True one multi-objective search replaces the four: the fastest, safest and
+    most fuel-efficient routes are the extremes of its front and the weighted route is picked
+    from it (see pareto_routes and pick_from_front), each within a factor 1 + PARETO_EPSILON of
+    its optimum. The front is returned under 'front' and the
+    scales of its weighted pick under 'front_scales', so other weightings need no new search.
+    With time_dependent=True the shortest and fuel-efficient routes are searched on the
+    environment's forecast pack, leaving `departure` hours after its first slice (see
+    time_dependent_route), and the safest and weighted routes on the slice nearest departure.
+    With port_fields=True and a goal on a registered destination port, the shortest and
+    fuel-efficient routes are read off the port's stored cost-to-go fields (see destination_fields).
+
+    Returns:
+    - dict with the snapped 'start' and 'goal' cells and, under 'routes', one entry per objective
+      holding the grid 'path' (None if not found), 'total_time' (hours), 'total_fuel' (gallons)
+      and 'total_risk' (%); multi-resolution routes also carry the per-level 'touched' report
+      and time-dependent routes their forecast voyage time in hours ('eta_hours')
+    """
+    configure_ship(ship_speed, ship_dis, area_front, ship_reso, hull_eff, prop_eff, engine_eff, c_sfoc)
+    binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map, lat_min, lon_min, lat_res, lon_res, grid_size = \
+        (environment[key] for key in ENVIRONMENT_KEYS)
+    pirate_risk_map = environment['pirate_risk_map']
+
+    start = latlon_to_index(start_lat, start_lon, lat_min, lon_min, lat_res, lon_res, grid_size)
+    goal = latlon_to_index(goal_lat, goal_lon, lat_min, lon_min, lat_res, lon_res, grid_size)
+    if not valid_move(*start, binary_map):
+        raise ValueError("Start position is invalid or on an obstacle.")
+    if not valid_move(*goal, binary_map):
+        raise ValueError("Goal position is invalid or on an obstacle.")
+
+    reports = {}
+    etas = {}
+    front = None
+    port = destination_port(environment, goal) if port_fields else None
+    if pareto:
+        cost_layers = build_cost_layers(binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
+                                        usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res,
+                                        grid_size, pirate_risk_map=pirate_risk_map)
+        front = pareto_routes(start, goal, cost_layers)
+        front_scales = weighted_scales(cost_layers)
+        # Only the path of each result is used below
+        results = [(route['path'] if route else None,) for route in routes_from_front(front, weights, front_scales)]
+    elif time_dependent:
+        if 'forecast_pack' not in environment:
+            raise ValueError("Time-dependent routing needs an environment loaded from a forecast pack.")
+        cube, header = envpack.open_cube(environment['forecast_pack'])
+        index = forecast_slice_index(envpack.slice_hours(header), departure)
+        env_maps = tuple(cube[index, header['layers'].index(name)] for name in envpack.PACK_LAYERS)
+        cost_layers = None
+        search_args = (start, goal, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size, weights,
+                       {'any_angle': False, 'bidirectional': False, 'hierarchical': False, 'landmarks': False})
+        results = []
+        for objective in ROUTE_OBJECTIVES:
+            if objective in TIME_DEPENDENT_OBJECTIVES:
+                path, _, arrival = time_dependent_route(objective, environment, start, goal, ship_speed, departure)
+                etas[objective] = arrival - departure
+                results.append((path,))
+                continue
+            if cost_layers is None:
+                cost_layers = build_cost_layers(binary_map, *env_maps, ship_speed, lat_min, lon_min, lat_res, lon_res,
+                                                grid_size, pirate_risk_map=pirate_risk_map)
+            results.append(_run_route_search(objective, binary_map, env_maps, cost_layers, search_args))
+    elif port is not None:
+        cost_layers = build_cost_layers(binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map,
+                                        usurf_map, vsurf_map, ship_speed, lat_min, lon_min, lat_res, lon_res,
+                                        grid_size, pirate_risk_map=pirate_risk_map)
+        fields = destination_fields(environment, port, ship_speed, cost_layers)
+        env_maps = (wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map)
+        search_args = (start, goal, ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size, weights,
+                       {'any_angle': False, 'bidirectional': False, 'hierarchical': False, 'landmarks': False})
+        results = []
+        for objective in ROUTE_OBJECTIVES:
+            if objective in PORT_FIELD_OBJECTIVES:
+                results.append(follow_successors(start, *fields[PORT_FIELD_OBJECTIVES[objective]]))
+            else:
+                results.append(_run_route_search(objective, binary_map, env_maps, cost_layers, search_args))
+    elif multiresolution:
+        if 'pyramid' not in environment:
+            raise ValueError("Multi-resolution routing needs an environment loaded with resolutions.")
+        results = []
+        for objective in ROUTE_OBJECTIVES:
+            result, reports[objective] = multiresolution_route(objective, environment, start, goal, ship_speed, weights)
+            results.append(result)
+    else:
+        results = find_routes(
+            start, goal, binary_map,
+            wind_speed_map, wind_angle_map_rad,
+            wave_height_map, usurf_map, vsurf_map, pirate_risk_map,
+            ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size,
+            weights=weights, parallel=parallel, any_angle=any_angle, bidirectional=bidirectional,
+            hierarchical=hierarchical, landmarks=landmarks
+        )
+
+    routes = {}
+    for objective, result in zip(ROUTE_OBJECTIVES, results):
+        path = result[0]
+        route = route_summary(path, environment)
+        if objective in reports:
+            route['touched'] = reports[objective]
+        if objective in etas:
+            route['eta_hours'] = etas[objective] if path else None
+        routes[objective] = route
+
+    result = {'start': start, 'goal': goal, 'routes': routes}
+    if front is not None:
+        result['front'] = front
+        result['front_scales'] = front_scales
+    return result
+
+def route_summary(path, environment):
+    """
+    A route's grid 'path' with its 'total_time' (hours), 'total_fuel' (gallons) and 'total_risk' (%)
+    for the current ship (see configure_ship); the totals are None when no path was found.
+    """
+    route = {'path': path, 'total_time': None, 'total_fuel': None, 'total_risk': None}
+    if path:
+        route['total_time'], route['total_fuel'], route['total_risk'] = calculate_path_metrics(
+            path, *(environment[key] for key in ENV_MAP_KEYS), environment['pirate_risk_map'],
+            *(environment[key] for key in ('lat_min', 'lon_min', 'lat_res', 'lon_res', 'grid_size')), ship_params
+        )
+    return route
+
+def compute_route_group(environment, goal_lat, goal_lon, starts, ship_speed, ship_dis, area_front, ship_reso,
+                        hull_eff, prop_eff, engine_eff, c_sfoc, weights=(0.25, 0.375, 0.375), cost_layers=None):
+    """
+    Compute all four routes from several starts to one goal for one ship, sharing the work.
+
+    The grid is priced once, and with more than one start the shortest and fuel-efficient
+    routes are read off exact cost-to-go fields from the goal (see cost_to_go_fields and
+    follow_successors) instead of being searched once per start.
+
+    Parameters:
+    - starts: list of (start_lat, start_lon)
+    - cost_layers: the ship's layers from build_cost_layers, if already priced
+
+    Returns:
+    - list with one compute_routes()-style result per start, or {'error': message} for a
+      start (or goal) on an obstacle
+    """
+    configure_ship(ship_speed, ship_dis, area_front, ship_reso, hull_eff, prop_eff, engine_eff, c_sfoc)
+    binary_map = environment['binary_map']
+    grid = tuple(environment[key] for key in ('lat_min', 'lon_min', 'lat_res', 'lon_res', 'grid_size'))
+    goal = latlon_to_index(goal_lat, goal_lon, *grid)
+    if not valid_move(*goal, binary_map):
+        return [{'error': "Goal position is invalid or on an obstacle."} for _ in starts]
+
+    if cost_layers is None:
+        cost_layers = build_cost_layers(binary_map, *(environment[key] for key in ENV_MAP_KEYS), ship_speed, *grid,
+                                        pirate_risk_map=environment['pirate_risk_map'])
+    fields = {}
+    if len(starts) > 1:
+        layers = [cost_layers[layer] for layer in PORT_FIELD_OBJECTIVES.values()]
+        for objective, layer, field in zip(PORT_FIELD_OBJECTIVES, layers, cost_to_go_fields(layers, goal)):
+            fields[objective] = (field, successor_directions(layer, field))
+
+    env_maps = tuple(environment[key] for key in ENV_MAP_KEYS)
+    no_options = {'any_angle': False, 'bidirectional': False, 'hierarchical': False, 'landmarks': False}
+    results = []
+    for start_lat, start_lon in starts:
+        start = latlon_to_index(start_lat, start_lon, *grid)
+        if not valid_move(*start, binary_map):
+            results.append({'error': "Start position is invalid or on an obstacle."})
+            continue
+        search_args = (start, goal, ship_speed, *grid, weights, no_options)
+        routes = {}
+        for objective in ROUTE_OBJECTIVES:
+            if objective in fields:
+                path, _ = follow_successors(start, *fields[objective])
+            else:
+                path = _run_route_search(objective, binary_map, env_maps, cost_layers, search_args)[0]
+            routes[objective] = route_summary(path, environment)
+        results.append({'start': start, 'goal': goal, 'routes': routes})
+    return results
+
+def route_record(result, environment):
+    """
+    JSON-ready copy of a compute_routes() result with every path as [lat, lon] points
+    (as in the route CSVs).
+    """
+    grid = tuple(environment[key] for key in ('lat_min', 'lon_min', 'lat_res', 'lon_res', 'grid_size'))
+    record = {'start': list(result['start']), 'goal': list(result['goal']), 'routes': {}}
+    for objective, route in result['routes'].items():
+        route = dict(route)
+        if route['path']:
+            route['path'] = [list(index_to_latlon(i, j, *grid)) for i, j in route['path']]
+        record['routes'][objective] = {key: float(value) if isinstance(value, np.floating) else value
+                                       for key, value in route.items()}
+    return record
+
+def route_files(result, environment):
+    """
+    The route files of a compute_routes() result, built in memory: a lat/lon CSV for each found
+    route and the environment plots as SVGs (rendered once per environment version).
+
+    Returns:
+    - dict mapping file names (ROUTE_CSV_FILES and ENVIRONMENT_PLOTS names) to their bytes
+    """
+    grid = tuple(environment[key] for key in ('lat_min', 'lon_min', 'lat_res', 'lon_res', 'grid_size'))
+    files = {}
+    for objective, route in result['routes'].items():
+        if route['path']:
+            files[ROUTE_CSV_FILES[objective]] = path_latlon_csv(route['path'], *grid).encode('utf-8')
+    for filename, digest in environment_plot_digests(environment).items():
+        with open(plot_path(digest), 'rb') as f:
+            files[filename] = f.read()
+    return files
+
+# ---------------------- Main Function ---------------------- #
+
+def main(start_lat, start_lon, goal_lat, goal_lon, ship_speed, ship_dis, area_front, ship_reso, hull_eff, prop_eff, engine_eff, c_sfoc, user_weight_shortest = 0.25, user_weight_safest = 0.375, user_weight_fuel = 0.375, parallel=False):
+    # Assign values to global variables
+    configure_ship(ship_speed, ship_dis, area_front, ship_reso, hull_eff, prop_eff, engine_eff, c_sfoc)
+
+    print("Global variables initialized:")
+    print(f"D = {D}, Cp = {Cp}, Af = {Af}, Z = {Z}, TE = {TE}, n_h = {n_h}, n_s = {n_s}, n_e = {n_e}, csfoc = {csfoc}")
+
+    # Load data and process pirate attacks
+    environment = load_environment()
+    binary_map, wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map, lat_min, lon_min, lat_res, lon_res, grid_size = \
+        (environment[key] for key in ENVIRONMENT_KEYS)
+    pirate_risk_map = environment['pirate_risk_map']
+
+    save_environment_plots(environment)
 
-   
     start = latlon_to_index(start_lat, start_lon, lat_min, lon_min, lat_res, lon_res, grid_size)
     goal = latlon_to_index(goal_lat, goal_lon, lat_min, lon_min, lat_res, lon_res, grid_size)
     # goal = (450, 450)  # Overriding goal to center for example purposes
@@ -1247,56 +3186,26 @@ def main(start_lat, start_lon, goal_lat, goal_lon, ship_speed, ship_dis, area_fr
     if not valid_move(*goal, binary_map):
         raise ValueError("Goal position is invalid or on an obstacle.")
     
-    
-    # Run Theta* algorithm for shortest path
-    print("Calculating the shortest path (Route 1)...")
-    path_shortest, total_time_shortest = theta_star_shortest_path(
-        start, goal, binary_map,
-        wind_speed_map, wind_angle_map_rad,
-        wave_height_map, usurf_map, vsurf_map,
-        ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size
-    )
-    
-    # Run Theta* algorithm for safest path
-    print("Calculating the safest path (Route 2)...")
-    path_safest, total_time_safest, total_risk_safest = theta_star_safest_path(
-        start, goal, binary_map,
-        wind_speed_map, wind_angle_map_rad,
-        wave_height_map, usurf_map, vsurf_map,
-        ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size,
-        pirate_risk_map=pirate_risk_map
-    )
-    
-    # Run Theta* algorithm for fuel-efficient path
-    print("Calculating the fuel-efficient path (Route 3)...")
-    path_fuel, total_fuel, total_fuel_time = theta_star_min_fuel_path(
-        start, goal, binary_map,
-        wind_speed_map, wind_angle_map_rad,
-        wave_height_map, usurf_map, vsurf_map,
-        ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size,
-        pirate_risk_map=pirate_risk_map,
-        a=0.1, b=0.05,  # Example parameters; adjust as needed
-        eta_h=n_h, eta_s=n_s, eta_e=n_e, c_sfoc=csfoc
-    )
-    
-    # Run Theta* algorithm for weighted path
-    print("Calculating the weighted path based on user-defined weights (Route 4)...")
+    # Run Theta* for the shortest, safest, fuel-efficient and weighted routes (Routes 1-4)
     # Example weights: prioritize shortest path twice as much as safest and fuel
     user_weight_shortest = 0.25  # Adjusted to sum to 1 with other weights
     user_weight_safest = 0.375
     user_weight_fuel = 0.375
-    path_weighted, total_weighted_cost, normalized_total_time, normalized_total_fuel, normalized_total_risk = theta_star_weighted_path(
+    # The searches print nothing themselves (they also run in pool workers and behind route.py)
+    for label in ROUTE_LABELS:
+        print(f"Calculating the {label}...")
+    route_shortest, route_safest, route_fuel, route_weighted = find_routes(
         start, goal, binary_map,
         wind_speed_map, wind_angle_map_rad,
-        wave_height_map, usurf_map, vsurf_map,
+        wave_height_map, usurf_map, vsurf_map, pirate_risk_map,
         ship_speed, lat_min, lon_min, lat_res, lon_res, grid_size,
-        pirate_risk_map=pirate_risk_map,
-        weight_shortest=user_weight_shortest,
-        weight_safest=user_weight_safest,
-        weight_fuel=user_weight_fuel,
-        a=0.1, b=0.05,  # Example parameters; adjust as needed
-        eta_h=n_h, eta_s=n_s, eta_e=n_e, c_sfoc=csfoc
+        weights=(user_weight_shortest, user_weight_safest, user_weight_fuel),
+        parallel=parallel
     )
+    path_shortest, total_time_shortest = route_shortest
+    path_safest, total_time_safest, total_risk_safest = route_safest
+    path_fuel, total_fuel, total_fuel_time = route_fuel
+    path_weighted, total_weighted_cost, normalized_total_time, normalized_total_fuel, normalized_total_risk = route_weighted
     
     # Save paths to CSV
     csv_file_fuel = 'path_fuel.csv'
@@ -1352,23 +3261,15 @@ def main(start_lat, start_lon, goal_lat, goal_lon, ship_speed, ship_dis, area_fr
         print(f"{route_name} could not be found.")
         return
     
+    # Evaluate every found route once; the travel simulation and the report below share it
+    routes = [("Route 1: Shortest Path", path_shortest), ("Route 2: Safest Path", path_safest),
+              ("Route 3: Fuel-Efficient Path", path_fuel), ("Route 4: Weighted Path", path_weighted)]
+    segments = {name: route_segments(path, wind_speed_map, wind_angle_map_rad, wave_height_map, usurf_map, vsurf_map,
+                                     pirate_risk_map, lat_min, lon_min, lat_res, lon_res, grid_size, ship_params)
+                for name, path in routes if path}
+
     # Simulate travel for 3 hours
-    new_position = simulate_travel(
-        path=selected_path,
-        wind_speed_map=wind_speed_map,
-        wind_angle_map_rad=wind_angle_map_rad,
-        wave_height_map=wave_height_map,
-        usurf_map=usurf_map,
-        vsurf_map=vsurf_map,
-        pirate_risk_map=pirate_risk_map,
-        lat_min=lat_min,
-        lon_min=lon_min,
-        lat_res=lat_res,
-        lon_res=lon_res,
-        grid_size=grid_size,
-        ship_params=ship_params,
-        travel_time=48.0  # hours
-    )
+    new_position = position_at(segments[route_name], 48.0)  # hours
     
     # Save the new position to a CSV
     save_path_as_latlon_csv([new_position], lat_min, lon_min, lat_res, lon_res, grid_size, 'new_position.csv')
@@ -1380,89 +3281,13 @@ def main(start_lat, start_lon, goal_lat, goal_lon, ship_speed, ship_dis, area_fr
     plot_paths(binary_map, path_shortest, path_safest, path_fuel, path_weighted, lat_min, lon_min, lat_res, lon_res, grid_size, new_position=new_position)
     
     # Output results for all paths
-    if path_shortest:
-        total_time, total_fuel, total_risk = calculate_path_metrics(
-            path_shortest,
-            wind_speed_map,
-            wind_angle_map_rad,
-            wave_height_map,
-            usurf_map,
-            vsurf_map,
-            pirate_risk_map,
-            lat_min,
-            lon_min,
-            lat_res,
-            lon_res,
-            grid_size,
-            ship_params
-        )
-        print("----- Route 1: Shortest Path -----")
-        print(f"Total travel time : {total_time:.2f} hours")
-        print(f"Total cumulative risk: {total_risk:.2f}")
-        print(f"Total fuel consumption: {total_fuel:.2f} gallons")
-    
-    if path_safest:
-        print("\n----- Route 2: Safest Path -----")
-        total_time, total_fuel, total_risk = calculate_path_metrics(
-            path_safest,
-            wind_speed_map,
-            wind_angle_map_rad,
-            wave_height_map,
-            usurf_map,
-            vsurf_map,
-            pirate_risk_map,
-            lat_min,
-            lon_min,
-            lat_res,
-            lon_res,
-            grid_size,
-            ship_params
-        )
-        print(f"Total travel time : {total_time:.2f} hours")
-        print(f"Total cumulative risk: {total_risk:.2f}")
-        print(f"Total fuel consumption: {total_fuel:.2f} gallons")
-    
-    if path_fuel:
-        print("\n----- Route 3: Fuel-Efficient Path -----")
-        total_time, total_fuel, total_risk = calculate_path_metrics(
-            path_fuel,
-            wind_speed_map,
-            wind_angle_map_rad,
-            wave_height_map,
-            usurf_map,
-            vsurf_map,
-            pirate_risk_map,
-            lat_min,
-            lon_min,
-            lat_res,
-            lon_res,
-            grid_size,
-            ship_params
-        )
-        print(f"Total travel time : {total_time:.2f} hours")
-        print(f"Total cumulative risk: {total_risk:.2f}")
-        print(f"Total fuel consumption: {total_fuel:.2f} gallons")
-    
-    if path_weighted:
-        print("\n----- Route 4: Weighted Path -----")
-        total_time, total_fuel, total_risk = calculate_path_metrics(
-            path_weighted,
-            wind_speed_map,
-            wind_angle_map_rad,
-            wave_height_map,
-            usurf_map,
-            vsurf_map,
-            pirate_risk_map,
-            lat_min,
-            lon_min,
-            lat_res,
-            lon_res,
-            grid_size,
-            ship_params
-        )
-        print(f"Total travel time : {total_time:.2f} hours")
-        print(f"Total cumulative risk: {total_risk:.2f}")
-        print(f"Total fuel consumption: {total_fuel:.2f} gallons")
+    for name, _ in routes:
+        if name in segments:
+            total_time, total_fuel, total_risk = path_totals(segments[name])
+            print(f"\n----- {name} -----")
+            print(f"Total travel time : {total_time:.2f} hours")
+            print(f"Total cumulative risk: {total_risk:.2f}")
+            print(f"Total fuel consumption: {total_fuel:.2f} gallons")
     
     if not path_shortest and not path_safest and not path_fuel and not path_weighted:
         print("No path could be found.")
@@ -1501,6 +3326,7 @@ def calculate_added_resistance_wind(F, Cp, Af):
 # ---------------------- Execute Main Function ---------------------- #
 
 if __name__ == "__main__":
+    INTERACTIVE_PLOTS = True
     try:
         main(
             start_lat=18.5, start_lon=72.5,
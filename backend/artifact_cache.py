@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import weakref
+
+import numpy as np
+
+# ---------------------- Derived Artifact Cache ---------------------- #
+#
+# Files derived from source data (resampled masks, rasterized risk maps, ...) are stored
+# under CACHE_DIR with names built from a digest of everything they depend on, so a
+# changed input simply misses the cache and stale entries are never read.
+
+CACHE_DIR = os.environ.get('SAMUDRAPATH_CACHE_DIR', 'cache')
+
+# Digests of live arrays (see frozen_array_digest), keyed on id() and dropped with the array
+_array_digests = {}
+
+def key_digest(*parts):
+    """
+    Stable short digest of JSON-serializable key parts.
+    """
+    encoded = json.dumps(parts, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:24]
+
+def cache_path(kind, key, suffix='.npy'):
+    """
+    Path of a cached artifact of the given kind (creates the cache directory).
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, f"{kind}_{key}{suffix}")
+
+def file_digest(path, chunk_size=1 << 20):
+    """
+    SHA-256 of a file's contents.
+
+    The digest is remembered on disk against the file's path, size and modification time,
+    so an unchanged source file is only read once.
+    """
+    stat = os.stat(path)
+    memo = cache_path('digest', key_digest(os.path.abspath(path), stat.st_size, stat.st_mtime_ns), '.txt')
+    if os.path.exists(memo):
+        with open(memo) as f:
+            return f.read().strip()
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+    _write_atomic(memo, digest.encode('utf-8'))
+    return digest
+
+def array_digest(array):
+    """
+    SHA-256 of an array's shape, dtype and contents.
+    """
+    array = np.ascontiguousarray(array)
+    sha = hashlib.sha256(f"{array.shape}{array.dtype.str}".encode('utf-8'))
+    sha.update(memoryview(array).cast('B'))
+    return sha.hexdigest()
+
+def frozen_array_digest(array):
+    """
+    array_digest of an array that is never modified once built (such as a priced cost layer).
+
+    The digest is remembered against the array object for as long as it lives, so looking up
+    artifacts derived from the same layer on every query hashes it only once.
+    """
+    key = id(array)
+    entry = _array_digests.get(key)
+    if entry is not None and entry[0]() is array:
+        return entry[1]
+    digest = array_digest(array)
+    _array_digests[key] = (weakref.ref(array, lambda _: _array_digests.pop(key, None)), digest)
+    return digest
+
+def load_array(path, mmap_mode=None):
+    """
+    Load a cached array, or None if it is not cached.
+    """
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode=mmap_mode)
+
+def save_array(path, array):
+    """
+    Save an array to the cache; concurrent writers never leave a partial file behind.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+def load_arrays(path):
+    """
+    Load a cached bundle of named arrays (see save_arrays), or None if it is not cached.
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as bundle:
+        return {name: bundle[name] for name in bundle.files}
+
+def save_arrays(path, **arrays):
+    """
+    Save named arrays to the cache as one .npz bundle, atomically like save_array.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+def load_bytes(path):
+    """
+    Load a cached blob of bytes, or None if it is not cached.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+def save_bytes(path, data):
+    """
+    Save a blob of bytes to the cache, atomically like save_array.
+    """
+    _write_atomic(path, data)
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,234 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+# ---------------------- Environment Pack Format ---------------------- #
+#
+# One file holding every environment layer on the routing grid:
+#
+#   8 bytes   magic b'SPENVPK\0'
+#   uint32    format version
+#   uint32    header length in bytes
+#   header    UTF-8 JSON (grid bounds, resolution, slice times, layer names and value ranges,
+#             dtype, shape, data offset)
+#   padding   up to a 64-byte boundary
+#   data      float32 array of shape (times, layers, rows, cols), C order
+#
+# A pack holds one or more forecast slices; version 1 packs hold a single (layers, rows, cols)
+# slice and are still read. The data block is memory-mapped on load, so opening a pack costs no
+# reads up front, a slice is only read when it is used, and every process that opens the same
+# pack shares its pages through the OS page cache.
+
+PACK_MAGIC = b'SPENVPK\0'
+PACK_VERSION = 2
+PACK_ALIGNMENT = 64
+_PREAMBLE = struct.Struct('<8sII')
+
+# Layers in pack order; wind direction is stored in radians
+PACK_LAYERS = ('wind_speed', 'wind_dir_rad', 'wave_height', 'usurf', 'vsurf')
+
+# Source .npy file for each layer (wind direction in degrees), as produced by the data notebooks
+NPY_SOURCES = {
+    'wind_speed': 'wind_speed_data.npy',
+    'wind_dir_rad': 'wind_dir_data.npy',
+    'wave_height': 'wave_height_data.npy',
+    'usurf': 'usurf_data.npy',
+    'vsurf': 'vsurf_data.npy',
+}
+
+def create_pack(path, shape, lat_min, lat_max, lon_min, lon_max, timestamp=None, times=None):
+    """
+    Start a pack whose slices are written in place, so that no more than one slice need be in memory.
+
+    Parameters:
+    - path: Output file; written to a temporary file first and moved into place by finish_pack
+    - shape: Grid (rows, cols)
+    - lat_min, lat_max, lon_min, lon_max: Grid bounds in degrees
+    - timestamp: ISO-8601 validity time of the data (defaults to the first slice time, or now, UTC)
+    - times: ISO-8601 validity time of each slice (defaults to the single slice at timestamp)
+
+    Returns:
+    - data: writable (times, layers, rows, cols) float32 memory map of the pack's data block
+    - header: the pack metadata, completed by finish_pack
+    """
+    if times is None:
+        if timestamp is None:
+            timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+        times = [timestamp]
+    rows, cols = shape
+    header = {
+        'layers': list(PACK_LAYERS),
+        'dtype': np.dtype(np.float32).str,
+        'shape': [rows, cols],
+        'lat_min': lat_min, 'lat_max': lat_max,
+        'lon_min': lon_min, 'lon_max': lon_max,
+        'lat_res': (lat_max - lat_min) / rows,
+        'lon_res': (lon_max - lon_min) / cols,
+        'timestamp': timestamp or times[0],
+        'times': list(times),
+        # Value range of each layer over every slice, for bounds that hold at any time
+        'ranges': {name: [-np.finfo(np.float64).max] * 2 for name in PACK_LAYERS},
+        'checksum': '0' * 64,
+    }
+    # The ranges and checksum are only known once the data is written, and the data offset is
+    # part of the header: size the header with the longest values they can take
+    header['data_offset'] = 0
+    header_size = len(json.dumps(header).encode('utf-8')) + 16
+    header['data_offset'] = -(-(_PREAMBLE.size + header_size) // PACK_ALIGNMENT) * PACK_ALIGNMENT
+
+    data_shape = (len(times), len(PACK_LAYERS), rows, cols)
+    with open(f"{path}.tmp", 'wb') as f:
+        f.truncate(header['data_offset'] + int(np.prod(data_shape)) * 4)
+    data = np.memmap(f"{path}.tmp", dtype=np.float32, mode='r+', offset=header['data_offset'], shape=data_shape)
+    return data, header
+
+def finish_pack(path, data, header):
+    """
+    Complete a pack started with create_pack once every slice is written: record the layer
+    ranges and checksum, read back one slice at a time, and move the pack into place.
+
+    Returns:
+    - header: the metadata written to the pack
+    """
+    data.flush()
+    checksum = hashlib.sha256()
+    ranges = np.empty(data.shape[:2] + (2,))
+    for index in range(len(data)):
+        for i in range(len(PACK_LAYERS)):
+            values = np.asarray(data[index, i])
+            checksum.update(values.tobytes())
+            ranges[index, i] = np.nanmin(values), np.nanmax(values)
+    header['ranges'] = {name: [float(np.nanmin(ranges[:, i, 0])), float(np.nanmax(ranges[:, i, 1]))]
+                        for i, name in enumerate(PACK_LAYERS)}
+    header['checksum'] = checksum.hexdigest()
+    header_bytes = json.dumps(header).encode('utf-8').ljust(header['data_offset'] - _PREAMBLE.size)
+    del data
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'r+b') as f:
+        f.write(_PREAMBLE.pack(PACK_MAGIC, PACK_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+    os.replace(tmp_path, path)
+    return header
+
+def write_pack(path, layers, lat_min, lat_max, lon_min, lon_max, timestamp=None, times=None):
+    """
+    Write environment layers to a pack file.
+
+    Parameters:
+    - path: Output file; written to a temporary file first and moved into place
+    - layers: dict keyed by PACK_LAYERS of 2D (rows, cols) arrays, or of 3D (times, rows, cols)
+      forecast cubes, all with the same shape
+    - lat_min, lat_max, lon_min, lon_max: Grid bounds in degrees
+    - timestamp: ISO-8601 validity time of the data (defaults to the first slice time, or now, UTC)
+    - times: ISO-8601 validity time of each slice (required for more than one slice)
+
+    Returns:
+    - header: the metadata written to the pack
+    """
+    layers = [np.asarray(layers[name], dtype=np.float32) for name in PACK_LAYERS]
+    slices = len(layers[0]) if layers[0].ndim == 3 else 1
+    if times is None and slices > 1:
+        raise ValueError("times are required for a pack with more than one slice.")
+    if times is not None and len(times) != slices:
+        raise ValueError(f"Got {len(times)} slice times for {slices} slices.")
+
+    data, header = create_pack(path, layers[0].shape[-2:], lat_min, lat_max, lon_min, lon_max, timestamp, times)
+    for i, values in enumerate(layers):
+        data[:, i] = values.reshape((-1,) + values.shape[-2:])
+    return finish_pack(path, data, header)
+
+def read_pack_header(path):
+    """
+    Read and validate the header of a pack file.
+    """
+    with open(path, 'rb') as f:
+        magic, version, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != PACK_MAGIC:
+            raise ValueError(f"{path} is not an environment pack.")
+        if not 1 <= version <= PACK_VERSION:
+            raise ValueError(f"Unsupported environment pack version {version} in {path}.")
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    header['version'] = version
+    header.setdefault('times', [header['timestamp']])
+    return header
+
+def open_cube(path):
+    """
+    Memory-map every forecast slice of an environment pack.
+
+    Returns:
+    - data: read-only (times, layers, rows, cols) float32 array, layers in header['layers'] order
+    - header: pack metadata (bounds, resolution, slice times, checksum, ...)
+    """
+    header = read_pack_header(path)
+    shape = (len(header['times']), len(header['layers']), *header['shape'])
+    data = np.memmap(path, dtype=np.dtype(header['dtype']), mode='r', offset=header['data_offset'], shape=shape)
+    return data, header
+
+def open_pack(path, index=0):
+    """
+    Memory-map one forecast slice of an environment pack (the first by default).
+
+    Returns:
+    - layers: dict of read-only (rows, cols) float32 arrays keyed by layer name
+    - header: pack metadata (bounds, resolution, slice times, checksum, ...)
+    """
+    data, header = open_cube(path)
+    layers = {name: data[index, i] for i, name in enumerate(header['layers'])}
+    return layers, header
+
+def slice_hours(header):
+    """
+    Validity time of each slice of a pack, in hours after the first.
+    """
+    times = [datetime.datetime.fromisoformat(time) for time in header['times']]
+    return [(time - times[0]).total_seconds() / 3600 for time in times]
+
+def pack_version(header):
+    """
+    Short identifier of a pack's contents, for keying caches of derived data.
+    """
+    return header['checksum'][:16]
+
+def build_pack_from_npy(path, directory='.', lat_min=-60, lat_max=30, lon_min=20, lon_max=120, timestamp=None):
+    """
+    Build a pack from the five per-layer .npy files, converting wind direction to radians.
+    """
+    layers = {name: np.load(os.path.join(directory, filename)) for name, filename in NPY_SOURCES.items()}
+    layers['wind_dir_rad'] = np.radians(layers['wind_dir_rad'])
+    return write_pack(path, layers, lat_min, lat_max, lon_min, lon_max, timestamp)
+
+# ---------------------- Command Line ---------------------- #
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect a SamudraPath environment pack.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Build a pack from the per-layer .npy files.")
+    build.add_argument('output', help="Pack file to write.")
+    build.add_argument('--directory', default='.', help="Directory holding the .npy files.")
+    build.add_argument('--lat-min', type=float, default=-60)
+    build.add_argument('--lat-max', type=float, default=30)
+    build.add_argument('--lon-min', type=float, default=20)
+    build.add_argument('--lon-max', type=float, default=120)
+    build.add_argument('--timestamp', help="ISO-8601 validity time of the data.")
+
+    info = subparsers.add_parser('info', help="Print a pack's metadata.")
+    info.add_argument('pack', help="Pack file to inspect.")
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        header = build_pack_from_npy(args.output, args.directory, args.lat_min, args.lat_max,
+                                     args.lon_min, args.lon_max, args.timestamp)
+        print(f"Environment pack saved to {args.output} (version {pack_version(header)})")
+    else:
+        print(json.dumps(read_pack_header(args.pack), indent=2))
+
+if __name__ == "__main__":
+    main()
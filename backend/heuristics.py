@@ -0,0 +1,61 @@
+import numpy as np
+
+# ---------------------- Admissible Heuristic Fields ---------------------- #
+#
+# A path costs at least (its length) x (the smallest cost per km of any move it could make),
+# and no path between two cells is shorter than the great-circle distance between them. So
+#
+#   h(v) = (smallest cost per km) x haversine(v, goal)
+#
+# never overestimates the remaining cost, and since every single move obeys the same bound
+# the field is also consistent: h(u) <= cost(u, v) + h(v). Each objective only has to supply
+# its smallest cost per km, which is taken from the priced edge layers themselves rather than
+# from a rule of thumb, so the bound stays valid whatever the resistance model becomes.
+
+def min_cost_per_km(edge_costs, edge_lengths):
+    """
+    Smallest cost per km over every allowed move of an (8, rows, cols) edge-cost layer.
+
+    Parameters:
+    - edge_costs: (8, rows, cols) layer, inf for moves that are not allowed
+    - edge_lengths: matching layer of move lengths in km (the 'distance' cost layer)
+
+    Returns:
+    - float, never negative: objectives whose moves can cost less than nothing get no bound
+    """
+    allowed = np.isfinite(edge_costs) & (edge_lengths > 0)
+    if not allowed.any():
+        return 0.0
+    return max(float((edge_costs[allowed] / edge_lengths[allowed]).min()), 0.0)
+
+def lower_bound_field(cost_per_km, distance_to_goal):
+    """
+    Admissible, consistent heuristic field: cost_per_km times the great-circle distance (km)
+    from every cell to the goal.
+    """
+    return cost_per_km * np.asarray(distance_to_goal, dtype=np.float64)
+
+def expansion_report(search, start, goal, edge_costs, heuristic):
+    """
+    Run one query with and without a heuristic and compare the work done.
+
+    Parameters:
+    - search: a_star_search-compatible function accepting a `stats` dict
+    - start, goal, edge_costs, heuristic: the query
+
+    Returns:
+    - dict with the expansions and path cost of plain Dijkstra and of the guided search,
+      the fraction of Dijkstra's expansions the heuristic saved, and whether both costs agree
+    """
+    dijkstra_stats, guided_stats = {}, {}
+    _, dijkstra_cost = search(start, goal, edge_costs, stats=dijkstra_stats)
+    _, cost = search(start, goal, edge_costs, heuristic, stats=guided_stats)
+    dijkstra_expansions = dijkstra_stats['expansions']
+    return {
+        'dijkstra_expansions': dijkstra_expansions,
+        'expansions': guided_stats['expansions'],
+        'saved': 1 - guided_stats['expansions'] / dijkstra_expansions if dijkstra_expansions else 0.0,
+        'dijkstra_cost': dijkstra_cost,
+        'cost': cost,
+        'optimal': bool(np.isclose(cost, dijkstra_cost, rtol=1e-9, atol=1e-9)),
+    }
@@ -0,0 +1,226 @@
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import artifact_cache
+import envpack
+
+# ---------------------- NetCDF Ingestion ---------------------- #
+#
+# Forecast NetCDF files (WAVEWATCH III waves and winds, ROMS surface currents) are interpolated
+# onto the routing grid and written as an environment pack. Linear interpolation on scattered
+# source points is a weighted sum of the three corners of the Delaunay triangle around each
+# target cell, so the triangulation and the barycentric weights are built once per source grid
+# (and cached on disk) and then applied to every variable and timestep with a gather. Data is
+# read one timestep of one variable at a time, never as a whole dataset.
+#
+# Needs xarray, scipy and a NetCDF backend for xarray; they are only imported here.
+
+# NetCDF variable for each pack layer, as named in the files the data notebooks read
+LAYER_VARIABLES = {
+    'wind_speed': 'WS',
+    'wind_dir_rad': 'WINDDIR',
+    'wave_height': 'SWH',
+    'usurf': 'USURF',
+    'vsurf': 'VSURF',
+}
+
+# Layers holding directions in degrees; they are interpolated as unit vectors and stored in radians
+DIRECTION_LAYERS = ('wind_dir_rad',)
+
+# Coordinate names tried in order
+LON_NAMES = ('LON', 'lon', 'longitude')
+LAT_NAMES = ('LAT', 'lat', 'latitude')
+TIME_NAMES = ('TIME', 'TAXIS', 'time')
+
+# Interpolation weights kept in memory by this process, keyed on source and target grid
+_weights = {}
+
+def target_points(shape, lat_min, lat_max, lon_min, lon_max):
+    """
+    (lon, lat) of every routing grid cell in row-major order, row 0 northernmost
+    (same convention as algorithm.grid_coordinates).
+    """
+    rows, cols = shape
+    lat_res = (lat_max - lat_min) / rows
+    lon_res = (lon_max - lon_min) / cols
+    lats = lat_min + (rows - 1 - np.arange(rows)) * lat_res
+    lons = lon_min + np.arange(cols) * lon_res
+    grid_lon, grid_lat = np.meshgrid(lons, lats)
+    return np.column_stack([grid_lon.ravel(), grid_lat.ravel()])
+
+def barycentric_weights(source_points, targets):
+    """
+    Delaunay triangulation of the source points and the linear interpolation weights of
+    every target point.
+
+    Returns:
+    - vertices: (targets, 3) int32 source point indices of the triangle around each target
+    - weights: (targets, 3) float32 barycentric weights, all zero outside the triangulation
+    """
+    from scipy.spatial import Delaunay
+
+    triangulation = Delaunay(source_points)
+    simplex = triangulation.find_simplex(targets)
+    inside = simplex >= 0
+    transform = triangulation.transform[simplex[inside]]
+    partial = np.einsum('ijk,ik->ij', transform[:, :2], targets[inside] - transform[:, 2])
+
+    vertices = np.zeros((len(targets), 3), dtype=np.int32)
+    weights = np.zeros((len(targets), 3), dtype=np.float32)
+    vertices[inside] = triangulation.simplices[simplex[inside]]
+    weights[inside] = np.column_stack([partial, 1 - partial.sum(axis=1)])
+    return vertices, weights
+
+def grid_weights(source_lon, source_lat, shape, lat_min, lat_max, lon_min, lon_max):
+    """
+    Interpolation weights from a source grid to the routing grid, taken from this process's
+    memory, the artifact cache or a fresh triangulation, in that order.
+    """
+    key = artifact_cache.key_digest(artifact_cache.array_digest(source_lon), artifact_cache.array_digest(source_lat),
+                                    list(shape), lat_min, lat_max, lon_min, lon_max)
+    if key not in _weights:
+        path = artifact_cache.cache_path('ingest_weights', key, '.npz')
+        cached = artifact_cache.load_arrays(path)
+        if cached is None:
+            source_points = np.column_stack([source_lon.ravel(), source_lat.ravel()]).astype(np.float64)
+            vertices, weights = barycentric_weights(source_points, target_points(shape, lat_min, lat_max,
+                                                                                lon_min, lon_max))
+            cached = {'vertices': vertices, 'weights': weights}
+            artifact_cache.save_arrays(path, **cached)
+        _weights[key] = (cached['vertices'], cached['weights'])
+    return _weights[key]
+
+def interpolate(values, vertices, weights, shape):
+    """
+    Apply interpolation weights to one source field; missing values (NaN) and cells outside
+    the source grid become 0, as in the notebooks.
+    """
+    values = np.asarray(values, dtype=np.float32).ravel()
+    field = np.einsum('ij,ij->i', values[vertices], weights)
+    field[~(weights.any(axis=1))] = np.nan
+    return np.nan_to_num(field, nan=0.0).reshape(shape)
+
+def interpolate_direction(degrees, vertices, weights, shape):
+    """
+    Interpolate a direction field (degrees) through its sine and cosine; returns radians.
+    """
+    radians = np.radians(np.asarray(degrees, dtype=np.float32))
+    return np.arctan2(interpolate(np.sin(radians), vertices, weights, shape),
+                      interpolate(np.cos(radians), vertices, weights, shape))
+
+def _coordinate(dataset, names):
+    for name in names:
+        if name in dataset.variables:
+            return name
+    raise ValueError(f"None of the coordinates {names} found in the dataset.")
+
+def open_sources(paths):
+    """
+    Open the NetCDF files lazily and find the dataset holding each pack layer.
+
+    Returns:
+    - dict mapping each layer to (dataset, variable name, time coordinate name)
+    """
+    import xarray as xr
+
+    datasets = [xr.open_dataset(path) for path in paths]
+    sources = {}
+    for layer, variable in LAYER_VARIABLES.items():
+        for dataset in datasets:
+            if variable in dataset.data_vars:
+                sources[layer] = (dataset, variable, _coordinate(dataset, TIME_NAMES))
+                break
+        else:
+            raise ValueError(f"Variable {variable} (layer {layer}) not found in {', '.join(paths)}.")
+    return sources
+
+def source_grid(dataset, variable, time_name):
+    """
+    Longitude and latitude of every point of one variable's horizontal grid, broadcast to
+    the shape of a single timestep.
+    """
+    import xarray as xr
+
+    field = dataset[variable].isel({time_name: 0}).squeeze(drop=True)
+    lon, lat = xr.broadcast(field[_coordinate(dataset, LON_NAMES)], field[_coordinate(dataset, LAT_NAMES)])
+    return lon.transpose(*field.dims).values, lat.transpose(*field.dims).values
+
+def nearest_steps(source_times, times):
+    """
+    Index of the source timestep nearest to each output time.
+    """
+    source_times = np.asarray(source_times, dtype='datetime64[s]')
+    times = np.asarray(times, dtype='datetime64[s]')
+    return np.abs(source_times[None, :] - times[:, None]).argmin(axis=1)
+
+def ingest(output, paths, grid_size=900, lat_min=-60, lat_max=30, lon_min=20, lon_max=120, workers=None):
+    """
+    Interpolate forecast NetCDF files onto the routing grid and write an environment pack.
+
+    Output slices follow the timesteps of the wave file (the dataset holding the first layer);
+    every other variable is taken at its nearest timestep. Each (variable, timestep) field is
+    read and interpolated as a separate task on a thread pool.
+
+    Parameters:
+    - output: Pack file to write
+    - paths: NetCDF files holding the LAYER_VARIABLES between them
+    - grid_size: Routing grid rows and columns
+    - lat_min, lat_max, lon_min, lon_max: Routing grid bounds in degrees
+    - workers: Interpolation threads (defaults to the CPU count)
+
+    Returns:
+    - header: the metadata written to the pack
+    """
+    shape = (grid_size, grid_size)
+    sources = open_sources(paths)
+    dataset, _, time_name = sources[envpack.PACK_LAYERS[0]]
+    times = dataset[time_name].values.astype('datetime64[s]')
+
+    tasks = []
+    for layer in envpack.PACK_LAYERS:
+        dataset, variable, time_name = sources[layer]
+        vertices, weights = grid_weights(*source_grid(dataset, variable, time_name), shape,
+                                         lat_min, lat_max, lon_min, lon_max)
+        for index, step in enumerate(nearest_steps(dataset[time_name].values, times)):
+            tasks.append((layer, index, dataset[variable], time_name, int(step), vertices, weights))
+
+    # Each slice is written straight into the memory-mapped pack, so the forecast cube is never
+    # held in memory
+    slice_times = [f"{np.datetime_as_string(time, unit='s')}+00:00" for time in times]
+    cube, header = envpack.create_pack(output, shape, lat_min, lat_max, lon_min, lon_max, times=slice_times)
+
+    def run(task):
+        layer, index, data, time_name, step, vertices, weights = task
+        values = data.isel({time_name: step}).squeeze(drop=True).values
+        fill = interpolate_direction if layer in DIRECTION_LAYERS else interpolate
+        cube[index, envpack.PACK_LAYERS.index(layer)] = fill(values, vertices, weights, shape)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        list(pool.map(run, tasks))
+
+    return envpack.finish_pack(output, cube, header)
+
+# ---------------------- Command Line ---------------------- #
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interpolate forecast NetCDF files into a SamudraPath environment pack.")
+    parser.add_argument('output', help="Pack file to write.")
+    parser.add_argument('sources', nargs='+', help="NetCDF files (e.g. the WAVEWATCH III and ROMS outputs).")
+    parser.add_argument('--grid-size', type=int, default=900)
+    parser.add_argument('--lat-min', type=float, default=-60)
+    parser.add_argument('--lat-max', type=float, default=30)
+    parser.add_argument('--lon-min', type=float, default=20)
+    parser.add_argument('--lon-max', type=float, default=120)
+    parser.add_argument('--workers', type=int, help="Interpolation threads (default: CPU count).")
+
+    args = parser.parse_args(argv)
+    header = ingest(args.output, args.sources, args.grid_size, args.lat_min, args.lat_max,
+                    args.lon_min, args.lon_max, args.workers)
+    print(f"Environment pack saved to {args.output} ({len(header['times'])} slices, "
+          f"version {envpack.pack_version(header)})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import json
+import sys
+import time
+
+# ---------------------- Headless Routing Entry Point ---------------------- #
+#
+# Computes the routes between two points from the command line and prints them as JSON (the
+# same record /calculate_route returns), with no plots, no windows and no server. Importing the
+# routing core loads NumPy and the search code only: matplotlib and rasterio are imported by
+# algorithm when first used (rasterio only to resample an uncached land mask), and matplotlib
+# never is here. --import-time reports what importing the core cost and exits; --timings
+# breaks a run down on stderr.
+
+# Modules the routing core must not load at import time
+DEFERRED_MODULES = ('matplotlib', 'pandas', 'rasterio', 'scipy', 'xarray')
+
+# Ship parameters and their defaults (those of algorithm.py's example run)
+SHIP_DEFAULTS = {
+    'ship_speed': 40,
+    'ship_dis': 1000,
+    'area_front': 50,
+    'ship_reso': 10,
+    'hull_eff': 0.7,
+    'prop_eff': 0.75,
+    'engine_eff': 0.85,
+    'c_sfoc': 150,
+}
+
+def import_core():
+    """
+    Import the routing core, timing it.
+
+    Returns:
+    - algorithm: the imported module
+    - seconds: wall-clock import time
+    - loaded: the DEFERRED_MODULES that the import loaded anyway (should be empty)
+    """
+    before = set(sys.modules)
+    start = time.perf_counter()
+    import algorithm
+    seconds = time.perf_counter() - start
+    loaded = [name for name in DEFERRED_MODULES if name in sys.modules and name not in before]
+    return algorithm, seconds, loaded
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute SamudraPath routes without plots and print them as JSON.")
+    parser.add_argument('coordinates', nargs='*', type=float, metavar='START_LAT START_LON GOAL_LAT GOAL_LON')
+    for name, default in SHIP_DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=default)
+    parser.add_argument('--weights', type=float, nargs=3, default=(0.25, 0.375, 0.375),
+                        metavar=('SHORTEST', 'SAFEST', 'FUEL'), help="Weights of the weighted route.")
+    parser.add_argument('--timings', action='store_true', help="Report import, load and routing times on stderr.")
+    parser.add_argument('--import-time', action='store_true',
+                        help="Only measure importing the routing core, then exit.")
+
+    args = parser.parse_args(argv)
+    if not args.import_time and len(args.coordinates) != 4:
+        parser.error("expected START_LAT START_LON GOAL_LAT GOAL_LON")
+
+    algorithm, import_seconds, loaded = import_core()
+    if args.import_time:
+        print(json.dumps({'import_seconds': import_seconds, 'deferred_modules_loaded': loaded}))
+        return
+
+    start = time.perf_counter()
+    environment = algorithm.load_environment()
+    loaded_at = time.perf_counter()
+    start_lat, start_lon, goal_lat, goal_lon = args.coordinates
+    try:
+        result = algorithm.compute_routes(environment, start_lat, start_lon, goal_lat, goal_lon,
+                                          **{name: getattr(args, name) for name in SHIP_DEFAULTS},
+                                          weights=tuple(args.weights))
+    except ValueError as e:
+        print(f"ValueError: {e}", file=sys.stderr)
+        sys.exit(1)
+    routed_at = time.perf_counter()
+
+    print(json.dumps(algorithm.route_record(result, environment)))
+    if args.timings:
+        print(f"import {import_seconds:.3f}s, load {loaded_at - start:.3f}s, "
+              f"routing {routed_at - loaded_at:.3f}s; loaded later: "
+              f"{', '.join(name for name in DEFERRED_MODULES if name in sys.modules) or 'none'}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import json
+import os
+
+import artifact_cache
+
+# ---------------------- Route Result Cache ---------------------- #
+#
+# Computed routes and their metrics (compute_routes results) keyed on what they depend on: the
+# snapped start and goal cells, the ship profile, the route weights and search options, and the
+# environment version (see load_environment). Results are held JSON-encoded, in memory up to
+# ROUTE_CACHE_BYTES with the least recently used evicted first, and on disk in the artifact
+# cache, so they survive restarts and are shared by every routing process.
+
+# Memory held by encoded results in this process (override with ROUTE_CACHE_BYTES)
+ROUTE_CACHE_BYTES = int(os.environ.get('ROUTE_CACHE_BYTES', 64 << 20))
+
+# Ship parameters of compute_routes that make up the ship profile
+SHIP_PARAMETERS = ('ship_speed', 'ship_dis', 'area_front', 'ship_reso', 'hull_eff', 'prop_eff', 'engine_eff', 'c_sfoc')
+
+# Encoded results in this process, most recent last
+_entries = {}
+_size = 0
+
+def ship_digest(params):
+    """
+    Digest of the ship profile in a compute_routes parameter dict.
+    """
+    return artifact_cache.key_digest({name: float(params[name]) for name in SHIP_PARAMETERS})
+
+def route_key(start, goal, params, weights, environment_version, options=None):
+    """
+    Cache key of one route request.
+
+    Parameters:
+    - start, goal: snapped (row, col) grid cells
+    - params: compute_routes parameters holding the SHIP_PARAMETERS
+    - weights: (weight_shortest, weight_safest, weight_fuel)
+    - environment_version: the environment's 'version' (see load_environment)
+    - options: other compute_routes keyword arguments that change the result
+    """
+    return artifact_cache.key_digest(list(start), list(goal), ship_digest(params), [float(w) for w in weights],
+                                     environment_version, options or {})
+
+def _decode(data):
+    result = json.loads(data)
+    result['start'], result['goal'] = tuple(result['start']), tuple(result['goal'])
+    for route in result['routes'].values():
+        if route['path']:
+            route['path'] = [tuple(cell) for cell in route['path']]
+    return result
+
+def _remember(key, data):
+    global _size
+    if key in _entries:
+        _size -= len(_entries.pop(key))
+    if len(data) > ROUTE_CACHE_BYTES:
+        return
+    while _entries and _size + len(data) > ROUTE_CACHE_BYTES:
+        _size -= len(_entries.pop(next(iter(_entries))))
+    _entries[key] = data
+    _size += len(data)
+
+def get(key):
+    """
+    Cached result for a key from memory or disk, or None if it was never stored.
+    """
+    data = _entries.get(key)
+    if data is None:
+        data = artifact_cache.load_bytes(artifact_cache.cache_path('route', key, '.json'))
+        if data is None:
+            return None
+    _remember(key, data)
+    return _decode(data)
+
+def put(key, result):
+    """
+    Store a compute_routes result in memory and on disk.
+    """
+    data = json.dumps(result, default=float).encode('utf-8')
+    artifact_cache.save_bytes(artifact_cache.cache_path('route', key, '.json'), data)
+    _remember(key, data)
+
+def clear_memory():
+    """
+    Drop the in-memory tier (the disk tier is kept).
+    """
+    global _size
+    _entries.clear()
+    _size = 0
@@ -0,0 +1,496 @@
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import algorithm
+import route_cache
+import tiles
+
+# ---------------------- Warm Routing Worker Pool ---------------------- #
+
+# Number of routing processes kept alive (override with ROUTING_WORKERS)
+DEFAULT_WORKERS = 2
+
+_pool = None
+
+# Environment loaded once per worker process by _load_worker_environment
+_environment = None
+
+# Cost layers priced by this worker for recent ship profiles, most recent last
+SHIP_LAYERS_MEMO_SIZE = 2
+_ship_layers = {}
+
+# Single process rendering the environment plots and map tiles, so renders never hold up routing
+_render_pool = None
+
+# Background renders (environment plots, map tiles) by render task, submitted when the pool starts
+_renders = {}
+
+# Search progress sent from the workers to the parent as (job id, expansions, f)
+_progress_queue = None
+
+# Job this worker is running, if any
+_job_id = None
+
+def _load_worker_environment(progress_queue=None):
+    """
+    Pool initializer: load the land mask, environment arrays and pirate risk map into this
+    worker (or the render process), and report search progress of jobs to the parent.
+    """
+    global _environment, _progress_queue
+    _environment = algorithm.load_environment()
+    _progress_queue = progress_queue
+    algorithm.search_progress = _report_progress
+
+def _report_progress(expansions, f):
+    if _job_id is not None and _progress_queue is not None:
+        _progress_queue.put((_job_id, expansions, f))
+
+def _environment_plots():
+    """
+    Render task: render the environment plots into the artifact cache (once per environment
+    version).
+    """
+    return algorithm.environment_plot_digests(_environment)
+
+def _environment_tiles():
+    """
+    Render task: write the map tile pyramid into the artifact cache (once per environment
+    version).
+    """
+    return tiles.environment_tiles(_environment)
+
+def _ping():
+    """
+    No-op task used to start every worker (and load its data) ahead of the first request.
+    """
+    return os.getpid()
+
+def _cache_key(params):
+    """
+    Route cache key of a compute_routes parameter dict against this worker's environment.
+    """
+    grid = tuple(_environment[key] for key in ('lat_min', 'lon_min', 'lat_res', 'lon_res', 'grid_size'))
+    start = algorithm.latlon_to_index(params['start_lat'], params['start_lon'], *grid)
+    goal = algorithm.latlon_to_index(params['goal_lat'], params['goal_lon'], *grid)
+    options = {name: value for name, value in params.items()
+               if name not in route_cache.SHIP_PARAMETERS and name != 'weights' and not name.endswith(('_lat', '_lon'))}
+    return route_cache.route_key(start, goal, params, params.get('weights', (0.25, 0.375, 0.375)),
+                                 _environment['version'], options)
+
+def _compute_routes(params):
+    """
+    compute_routes for one request against this worker's environment, through the route cache.
+    """
+    key = _cache_key(params)
+    result = route_cache.get(key)
+    if result is None:
+        result = algorithm.compute_routes(_environment, **params)
+        route_cache.put(key, result)
+    return result
+
+def _route_output(params, files):
+    """
+    Worker task: compute all routes for one request (or take them from the route cache).
+
+    Returns:
+    - the JSON-ready route record (see algorithm.route_record), or with files=True the route
+      CSVs and environment plots built in memory (see algorithm.route_files)
+    """
+    result = _compute_routes(params)
+    if files:
+        return algorithm.route_files(result, _environment)
+    return algorithm.route_record(result, _environment)
+
+def _route_job(job_id, params):
+    """
+    Worker task: compute all routes of a job, reporting search progress under its id.
+
+    Returns:
+    - the JSON-ready route record (see algorithm.route_record)
+    """
+    global _job_id
+    _job_id = job_id
+    _report_progress(0, None)
+    try:
+        return algorithm.route_record(_compute_routes(params), _environment)
+    finally:
+        _job_id = None
+
+def _priced_layers(ship):
+    """
+    Cost layers of this worker's environment for a ship profile, priced once per profile.
+    """
+    key = route_cache.ship_digest(ship)
+    if key in _ship_layers:
+        layers = _ship_layers.pop(key)
+    else:
+        algorithm.configure_ship(*(ship[name] for name in route_cache.SHIP_PARAMETERS))
+        grid = tuple(_environment[name] for name in ('lat_min', 'lon_min', 'lat_res', 'lon_res', 'grid_size'))
+        layers = algorithm.build_cost_layers(_environment['binary_map'],
+                                             *(_environment[name] for name in algorithm.ENV_MAP_KEYS),
+                                             ship['ship_speed'], *grid, pirate_risk_map=_environment['pirate_risk_map'])
+        if len(_ship_layers) >= SHIP_LAYERS_MEMO_SIZE:
+            del _ship_layers[next(iter(_ship_layers))]
+    _ship_layers[key] = layers
+    return layers
+
+def _route_group(group):
+    """
+    Worker task: compute the routes of a batch group (one goal and ship profile, many starts),
+    taking what it can from the route cache.
+
+    Returns:
+    - list of (request index, JSON-ready record) pairs
+    """
+    ship, goal, weights, items = group
+    records = {}
+    pending = []
+    for index, params in items:
+        key = _cache_key(params)
+        result = route_cache.get(key)
+        if result is None:
+            pending.append((index, params, key))
+        else:
+            records[index] = result
+
+    if pending:
+        results = algorithm.compute_route_group(
+            _environment, *goal, [(params['start_lat'], params['start_lon']) for _, params, _ in pending],
+            **ship, weights=weights, cost_layers=_priced_layers(ship))
+        for (index, _, key), result in zip(pending, results):
+            if 'error' not in result:
+                route_cache.put(key, result)
+            records[index] = result
+
+    return [(index, result if 'error' in result else algorithm.route_record(result, _environment))
+            for index, result in sorted(records.items())]
+
+def group_requests(requests):
+    """
+    Group batch route requests that share a goal, ship profile and weights.
+
+    Parameters:
+    - requests: list of compute_routes parameter dicts (coordinates, ship parameters and
+      optionally 'weights')
+
+    Returns:
+    - list of (ship, goal, weights, [(request index, params), ...]) groups, grouped by ship
+      profile so each worker tends to price a profile once
+    """
+    groups = {}
+    for index, params in enumerate(requests):
+        ship = {name: float(params[name]) for name in route_cache.SHIP_PARAMETERS}
+        goal = (float(params['goal_lat']), float(params['goal_lon']))
+        weights = tuple(params.get('weights', (0.25, 0.375, 0.375)))
+        key = (tuple(ship.values()), goal, weights)
+        groups.setdefault(key, (ship, goal, weights, []))[3].append((index, params))
+    return [groups[key] for key in sorted(groups, key=lambda key: key[0])]
+
+# ---------------------- Admission Control ---------------------- #
+#
+# Every route task handed to the worker pool (a single request, one group of a batch or a job)
+# holds one of MAX_PENDING_JOBS admission slots until it ends, so the pool's queue stays
+# bounded whichever way the work arrives. Work that finds no free slot is refused with
+# JobQueueFull; a batch that got its first group in submits the others as slots free up.
+
+# Route tasks queued or running at once (override with ROUTING_MAX_PENDING_JOBS)
+MAX_PENDING_JOBS = int(os.environ.get('ROUTING_MAX_PENDING_JOBS', 8))
+
+class JobQueueFull(RuntimeError):
+    """
+    Raised when route work is submitted while all MAX_PENDING_JOBS admission slots are taken.
+    """
+
+_admission = threading.Condition()
+_admitted = 0
+
+def _admit(block=False):
+    """
+    Take an admission slot, with block=True waiting for one to free up.
+
+    Raises:
+    - JobQueueFull if every slot is taken (and block is False)
+    """
+    global _admitted
+    with _admission:
+        while _admitted >= MAX_PENDING_JOBS:
+            if not block:
+                raise JobQueueFull(f"{MAX_PENDING_JOBS} routing tasks are already pending.")
+            _admission.wait()
+        _admitted += 1
+
+def _release(_future=None):
+    global _admitted
+    with _admission:
+        _admitted -= 1
+        _admission.notify()
+
+def _submit_admitted(pool, task, *args, block=False):
+    """
+    Submit a task to the pool under an admission slot, given back when the task ends (or is
+    cancelled).
+    """
+    _admit(block)
+    try:
+        future = pool.submit(task, *args)
+    except BaseException:
+        _release()
+        raise
+    future.add_done_callback(_release)
+    return future
+
+def run_route_batch(requests):
+    """
+    Compute many routes on the warm workers, one task per group (see group_requests). The
+    first group is admitted here, the others as admission slots free up.
+
+    Returns:
+    - iterator of (request index, record) as each group finishes: the JSON-ready route record
+      (see algorithm.route_record) or {'error': message}
+
+    Raises:
+    - JobQueueFull if no admission slot is free
+    """
+    pool = start_pool()
+    groups = group_requests(requests)
+    first = _submit_admitted(pool, _route_group, groups[0])
+    return _batch_results(pool, {first: groups[0]}, groups[1:])
+
+def _batch_results(pool, futures, waiting):
+    try:
+        while futures or waiting:
+            # Submit waiting groups while slots are free; with none in flight wait for a slot
+            while waiting:
+                try:
+                    future = _submit_admitted(pool, _route_group, waiting[0], block=not futures)
+                except JobQueueFull:
+                    break
+                futures[future] = waiting.pop(0)
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                group = futures.pop(future)
+                try:
+                    yield from future.result()
+                except BrokenProcessPool:
+                    shutdown_pool()
+                    raise
+                except Exception as e:
+                    for index, _ in group[3]:
+                        yield index, {'error': f"Algorithm execution failed: {str(e)}"}
+    finally:
+        for future in futures:
+            future.cancel()
+
+def start_pool(workers=None):
+    """
+    Start the worker pool (once) and wait until every worker has loaded its data.
+    """
+    global _pool, _progress_queue
+    if _pool is None:
+        workers = workers or int(os.environ.get('ROUTING_WORKERS', DEFAULT_WORKERS))
+        if _progress_queue is None:
+            _progress_queue = multiprocessing.Queue()
+            threading.Thread(target=_collect_progress, daemon=True).start()
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_load_worker_environment,
+                                    initargs=(_progress_queue,))
+        for future in [_pool.submit(_ping) for _ in range(workers)]:
+            future.result()
+    start_render_pool()
+    return _pool
+
+def start_render_pool():
+    """
+    Start the render process (once) with its own copy of the environment, and queue the
+    environment plots and map tiles on it.
+    """
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(max_workers=1, initializer=_load_worker_environment)
+        for task in (_environment_plots, _environment_tiles):
+            _renders[task] = _render_pool.submit(task)
+    return _render_pool
+
+def shutdown_pool():
+    """
+    Stop the worker pool.
+    """
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+def run_route(params, files=False):
+    """
+    Compute the routes for one request on a warm worker.
+
+    Parameters:
+    - params: keyword arguments for algorithm.compute_routes (coordinates and ship parameters)
+    - files: Return the route files instead of the route record
+
+    Returns:
+    - the route record (paths as lat/lon points and metrics), or with files=True a dict of
+      file names to their bytes; nothing is written to disk
+
+    Raises:
+    - JobQueueFull if no admission slot is free
+    """
+    try:
+        return _submit_admitted(start_pool(), _route_output, params, files).result()
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); replace the pool so later requests still run
+        shutdown_pool()
+        raise
+
+def _render_result(task):
+    """
+    Result of a background render, or None while it is still running. Never waits for the
+    render; a failed render is started again (on a new render process if the last one died).
+    """
+    global _render_pool
+    pool = start_render_pool()
+    future = _renders[task]
+    if future.done() and future.exception() is not None:
+        try:
+            future = _renders[task] = pool.submit(task)
+        except BrokenProcessPool:
+            # The render process died; a new one renders everything again
+            pool.shutdown(wait=False)
+            _render_pool = None
+            start_render_pool()
+            future = _renders[task]
+    return future.result() if future.done() else None
+
+def _is_digest(digest):
+    return len(digest) == 24 and all(c in '0123456789abcdef' for c in digest)
+
+def environment_plots():
+    """
+    Content digests of the environment plots, or None while they are still being rendered.
+
+    Returns:
+    - dict mapping each plot file name to its digest (see plot_file), or None
+    """
+    return _render_result(_environment_plots)
+
+def plot_file(digest):
+    """
+    Cached file of a rendered environment plot, or None if there is no plot with that digest.
+    """
+    if not _is_digest(digest):
+        return None
+    path = algorithm.plot_path(digest)
+    return path if os.path.exists(path) else None
+
+def tile_index():
+    """
+    The map tile pyramid index (see tiles.environment_tiles), or None while it is being written.
+    """
+    return _render_result(_environment_tiles)
+
+def tile_file(layer, z, x, y, tile_format):
+    """
+    Cached file and content digest of one map tile, or None if there is no such tile (or the
+    pyramid is still being written).
+    """
+    index = tile_index()
+    digest = index and index['tiles'].get(f"{layer}/{z}/{x}/{y}.{tile_format}")
+    if not digest:
+        return None
+    return tiles.tile_path(digest, tile_format), digest
+
+# ---------------------- Routing Jobs ---------------------- #
+#
+# A job runs one route request on the worker pool in the background: submitting returns a job
+# id at once, and the job's state, search progress and result are looked up by that id. A job
+# takes an admission slot like any other route work (see _admit) and is refused without one.
+
+# Finished jobs kept for their results, oldest dropped first
+MAX_FINISHED_JOBS = 256
+
+# Jobs by id, oldest first: {'future', 'started', 'progress'}
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def _collect_progress():
+    """
+    Parent thread: record the search progress the workers report for each job.
+    """
+    while True:
+        job_id, expansions, f = _progress_queue.get()
+        with _jobs_lock:
+            job = _jobs.get(job_id)
+            if job is None:
+                continue
+            job['started'] = True
+            if f is None:
+                continue  # Start of the job
+            progress = job['progress']
+            # Expansions restart at each of the request's searches
+            if expansions < progress['expansions']:
+                progress['searches_done'] += 1
+            progress['expansions'] = expansions
+            progress['best_f'] = f
+
+def submit_job(params):
+    """
+    Queue a route request (keyword arguments for algorithm.compute_routes) as a job.
+
+    Returns:
+    - the job id
+
+    Raises:
+    - JobQueueFull if no admission slot is free
+    """
+    pool = start_pool()
+    with _jobs_lock:
+        job_id = uuid.uuid4().hex
+        future = _submit_admitted(pool, _route_job, job_id, params)
+        finished = [old_id for old_id, job in _jobs.items() if job['future'].done()]
+        for old_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS + 1)]:
+            del _jobs[old_id]
+
+        _jobs[job_id] = {
+            'future': future,
+            'started': False,
+            'progress': {'expansions': 0, 'best_f': None, 'searches_done': 0},
+        }
+    return job_id
+
+def job_status(job_id):
+    """
+    State of a job: 'queued', 'running', 'done' or 'failed', its latest search progress and,
+    if it failed, the error message; None for an unknown job.
+    """
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        future = job['future']
+        status = {'job_id': job_id, 'progress': dict(job['progress'])}
+        started = job['started']
+    if not future.done():
+        status['state'] = 'running' if started else 'queued'
+    elif future.exception() is not None:
+        status['state'] = 'failed'
+        status['error'] = str(future.exception())
+    else:
+        status['state'] = 'done'
+    return status
+
+def job_result(job_id):
+    """
+    Route record of a job, waiting for it to finish (re-raises the job's error if it failed).
+
+    Raises:
+    - KeyError for an unknown job
+    """
+    with _jobs_lock:
+        future = _jobs[job_id]['future']
+    if isinstance(future.exception(), BrokenProcessPool):
+        shutdown_pool()
+    return future.result()
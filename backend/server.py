@@ -1,73 +1,213 @@
-from flask import Flask, request, jsonify, send_file
-import subprocess
-import os
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
+import gzip
+import io
+import json
 import zipfile
-import uuid
+
+import routing_workers
+import tiles
 
 app = Flask(__name__)
 
+# Parameters every route request must carry
+REQUIRED_PARAMS = [
+    "start_lat", "start_lon", "goal_lat", "goal_lon",
+    "ship_speed", "ship_dis", "area_front", "ship_reso",
+    "hull_eff", "prop_eff", "engine_eff", "c_sfoc"
+]
+
+# Rendered plots and tiles never change under a digest, so clients may keep them for a year
+PLOT_MAX_AGE = 365 * 24 * 3600
+
+def plot_urls(plots):
+    return {name: f"/plots/{digest}" for name, digest in plots.items()}
+
 @app.route('/calculate_route', methods=['POST'])
 def calculate_route():
+    # Routes and metrics as JSON; with ?format=zip the route CSVs and environment plots as a
+    # zip archive. Everything is built in memory, nothing is written to disk.
     try:
         data = request.json
-        required_params = [
-            "start_lat", "start_lon", "goal_lat", "goal_lon", 
-            "ship_speed", "ship_dis", "area_front", "ship_reso", 
-            "hull_eff", "prop_eff", "engine_eff", "c_sfoc"
-        ]
         
         # Validate required parameters
-        missing_params = [param for param in required_params if data.get(param) is None]
+        missing_params = [param for param in REQUIRED_PARAMS if data.get(param) is None]
         if missing_params:
             return jsonify({"error": f"Missing parameters: {', '.join(missing_params)}"}), 400
 
-        # Generate unique filenames
-        unique_id = uuid.uuid4()
-        output_files = [f"output_{unique_id}_{name}" for name in [
-            'path_fuel.csv', 'path_safe.csv', 'path_short.csv', 'path_weighted.csv', 
-            'wind_speed_map.svg', 'wave_height_map.svg', 'usurf_map.svg', 'vsurf_map.svg'
-        ]]
-        zip_file_name = f"route_files_{unique_id}.zip"
-
-        # Clean up old files
-        for file in output_files:
-            if os.path.exists(file):
-                os.remove(file)
-        if os.path.exists(zip_file_name):
-            os.remove(zip_file_name)
-
-        # Run the subprocess
-        python_exec = os.path.abspath('.venv/Scripts/python')
-        algorithm_script = os.path.abspath('algorithm.py')
-        command = [
-            python_exec, algorithm_script,
-            str(data['start_lat']), str(data['start_lon']), 
-            str(data['goal_lat']), str(data['goal_lon']),
-            str(data['ship_speed']), str(data['ship_dis']), 
-            str(data['area_front']), str(data['ship_reso']), 
-            str(data['hull_eff']), str(data['prop_eff']), 
-            str(data['engine_eff']), str(data['c_sfoc'])
-        ]
+        # Run the route calculation on a warm worker (data is already loaded there)
+        params = {param: float(data[param]) for param in REQUIRED_PARAMS}
+        as_zip = request.args.get("format") == "zip"
         
         try:
-            subprocess.run(command, check=True, capture_output=True, text=True)
-        except subprocess.CalledProcessError as e:
-            error_msg = e.stderr or e.stdout or str(e)
-            return jsonify({"error": f"Algorithm execution failed: {error_msg}"}), 500
+            output = routing_workers.run_route(params, files=as_zip)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except routing_workers.JobQueueFull as e:
+            return jsonify({"error": str(e)}), 429, {"Retry-After": "5"}
+        except Exception as e:
+            return jsonify({"error": f"Algorithm execution failed: {str(e)}"}), 500
 
-        # Verify output files
-        if not all(os.path.exists(file) for file in output_files):
-            return jsonify({"error": "Route calculation failed. One or more output files not found."}), 500
+        if not as_zip:
+            # Environment plots are served by reference once the background render is done
+            plots = routing_workers.environment_plots()
+            if plots is not None:
+                output["plots"] = plot_urls(plots)
+            return jsonify(output)
 
-        # Create zip file
-        with zipfile.ZipFile(zip_file_name, 'w') as zipf:
-            for file in output_files:
-                zipf.write(file)
+        # Create the zip archive in memory
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for name, content in output.items():
+                zipf.writestr(name, content)
+        archive.seek(0)
 
-        return send_file(zip_file_name, mimetype='application/zip', as_attachment=True, download_name=zip_file_name)
+        return send_file(archive, mimetype='application/zip', as_attachment=True, download_name="route_files.zip")
 
     except Exception as e:
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
+@app.route('/calculate_routes', methods=['POST'])
+def calculate_routes():
+    # Batch of routes: {"routes": [{...}, ...], "defaults": {...}}; each route holds the
+    # REQUIRED_PARAMS (missing ones are taken from "defaults", e.g. a shared ship profile),
+    # optionally "weights" and an "id" echoed back. Results stream back as newline-delimited
+    # JSON, one record per route in the order they finish, each with its "index" in the batch;
+    # 429 when the workers already have too much routing pending.
+    data = request.json or {}
+    routes = data.get("routes")
+    if not isinstance(routes, list) or not routes:
+        return jsonify({"error": "Expected a non-empty list of routes."}), 400
+    defaults = data.get("defaults") or {}
+
+    errors = []
+    requests = []
+    positions = []
+    for index, route in enumerate(routes):
+        route = {**defaults, **route}
+        missing_params = [param for param in REQUIRED_PARAMS if route.get(param) is None]
+        if missing_params:
+            errors.append((index, route.get("id"), f"Missing parameters: {', '.join(missing_params)}"))
+            continue
+        params = {param: float(route[param]) for param in REQUIRED_PARAMS}
+        if route.get("weights") is not None:
+            params["weights"] = [float(weight) for weight in route["weights"]]
+        requests.append(params)
+        positions.append((index, route.get("id")))
+
+    def record_line(index, route_id, record):
+        record = {"index": index, **record}
+        if route_id is not None:
+            record["id"] = route_id
+        return json.dumps(record) + "\n"
+
+    # Admission is decided before the response starts streaming
+    try:
+        results = routing_workers.run_route_batch(requests) if requests else ()
+    except routing_workers.JobQueueFull as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": "5"}
+
+    def generate():
+        for index, route_id, message in errors:
+            yield record_line(index, route_id, {"error": message})
+        for batch_index, record in results:
+            yield record_line(*positions[batch_index], record)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    # Queue one route request (same parameters as /calculate_route) and return its job id at
+    # once; 429 when too many jobs are already pending
+    data = request.json or {}
+    missing_params = [param for param in REQUIRED_PARAMS if data.get(param) is None]
+    if missing_params:
+        return jsonify({"error": f"Missing parameters: {', '.join(missing_params)}"}), 400
+    params = {param: float(data[param]) for param in REQUIRED_PARAMS}
+
+    try:
+        job_id = routing_workers.submit_job(params)
+    except routing_workers.JobQueueFull as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": "5"}
+    return jsonify({"job_id": job_id, "status_url": f"/jobs/{job_id}"}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    status = routing_workers.job_status(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown job."}), 404
+    return jsonify(status)
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    status = routing_workers.job_status(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown job."}), 404
+    if status["state"] in ("queued", "running"):
+        return jsonify(status), 409
+    try:
+        return jsonify(routing_workers.job_result(job_id))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Algorithm execution failed: {str(e)}"}), 500
+
+@app.route('/plots', methods=['GET'])
+def plots():
+    # Environment plot file names mapped to their URLs; 202 while they are being rendered
+    plots = routing_workers.environment_plots()
+    if plots is None:
+        return jsonify({"status": "rendering"}), 202, {"Retry-After": "5"}
+    return jsonify(plot_urls(plots))
+
+@app.route('/plots/<digest>', methods=['GET'])
+def plot(digest):
+    # One rendered environment plot, addressed by the digest of its contents
+    path = routing_workers.plot_file(digest)
+    if path is None:
+        return jsonify({"error": "Unknown plot."}), 404
+    response = send_file(path, mimetype='image/svg+xml', etag=digest, max_age=PLOT_MAX_AGE, conditional=True)
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/tiles', methods=['GET'])
+def tile_index():
+    # Tile pyramid layout (tile size, zoom levels, grid bounds, layer value ranges) and the
+    # tile URL template; 202 while the tiles are being written
+    index = routing_workers.tile_index()
+    if index is None:
+        return jsonify({"status": "rendering"}), 202, {"Retry-After": "5"}
+    layout = {key: value for key, value in index.items() if key != "tiles"}
+    layout["layers"] = [layer for layer, _, _ in tiles.TILE_LAYERS]
+    layout["formats"] = list(tiles.TILE_FORMATS)
+    layout["url"] = "/tiles/{layer}/{z}/{x}/{y}.{format}"
+    return jsonify(layout)
+
+@app.route('/tiles/<layer>/<int:z>/<int:x>/<int:y>.<tile_format>', methods=['GET'])
+def tile(layer, z, x, y, tile_format):
+    # One map tile: a PNG, or with .f32 gzipped float32 values (TILE_SIZE x TILE_SIZE)
+    if tile_format not in tiles.TILE_FORMATS:
+        return jsonify({"error": f"Unknown tile format {tile_format}."}), 404
+    found = routing_workers.tile_file(layer, z, x, y, tile_format)
+    if found is None:
+        return jsonify({"error": "Unknown tile."}), 404
+    path, digest = found
+    mimetype = tiles.TILE_FORMATS[tile_format][1]
+    gzipped = tile_format == "f32"
+    if gzipped and "gzip" not in request.accept_encodings:
+        # Value tiles are stored gzipped; decompress for the rare client that cannot take that
+        with open(path, 'rb') as f:
+            path = io.BytesIO(gzip.decompress(f.read()))
+        gzipped = False
+        digest += "-identity"
+    response = send_file(path, mimetype=mimetype, etag=digest, max_age=PLOT_MAX_AGE, conditional=True)
+    if gzipped:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    response.cache_control.immutable = True
+    return response
+
 if __name__ == '__main__':
-    app.run(debug=True)
+    # Load the routing data into the worker pool before accepting requests. The debug
+    # reloader would start a second server process with its own pool, so it stays off.
+    routing_workers.start_pool()
+    app.run(debug=True, use_reloader=False)
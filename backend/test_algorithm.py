@@ -0,0 +1,509 @@
+import heapq
+import math
+import multiprocessing
+
+import numpy as np
+import pytest
+
+import algorithm
+import artifact_cache
+import heuristics
+
+# ---------------------- Synthetic Environment ---------------------- #
+#
+# A small seeded grid with random weather, two islands between start and goal and a pirate
+# zone, so every objective pulls the routes a different way. The searches are checked against
+# one another on it rather than against stored answers.
+#
+# Wind alone never takes a move's risk past RISK_THRESHOLD with these ship parameters, so the
+# searches that honour it run with THRESHOLD, below the risk of the pirate zone.
+
+GRID_SIZE = 32
+START = (3, 3)
+GOAL = (27, 28)
+THRESHOLD = 0.2
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # Artifacts the code under test caches (landmark fields, risk maps) go to a fresh directory
+    monkeypatch.setattr(artifact_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+
+@pytest.fixture(scope='module')
+def environment():
+    rng = np.random.default_rng(7)
+    n = GRID_SIZE
+    rows, cols = np.mgrid[:n, :n]
+    binary_map = np.zeros((n, n), dtype=np.uint8)
+    binary_map[(rows - 12) ** 2 + (cols - 14) ** 2 < 20] = 1
+    binary_map[(rows - 20) ** 2 + (cols - 9) ** 2 < 12] = 1
+    pirate_risk_map = np.zeros((n, n))
+    pirate_risk_map[4:12, 9:17] = 0.8
+    algorithm.configure_ship(40, 1000, 50, 10, 0.7, 0.75, 0.85, 150)
+    return {
+        'binary_map': binary_map,
+        'wind_speed_map': rng.uniform(0, 15, (n, n)),
+        'wind_angle_map_rad': np.radians(rng.uniform(0, 360, (n, n))),
+        'wave_height_map': rng.uniform(0, 4, (n, n)),
+        'usurf_map': rng.uniform(-1, 1, (n, n)),
+        'vsurf_map': rng.uniform(-1, 1, (n, n)),
+        'pirate_risk_map': pirate_risk_map,
+        'lat_min': -10.0, 'lon_min': 60.0, 'lat_res': 0.25, 'lon_res': 0.25, 'grid_size': n,
+    }
+
+def grid_args(environment):
+    """
+    Positional arguments of the theta_star_* searches after start and goal.
+    """
+    return tuple(environment[key] for key in algorithm.ENVIRONMENT_KEYS[:6]) + (40,) + \
+        tuple(environment[key] for key in algorithm.ENVIRONMENT_KEYS[6:])
+
+@pytest.fixture(scope='module')
+def cost_layers(environment):
+    return algorithm.build_cost_layers(*grid_args(environment), pirate_risk_map=environment['pirate_risk_map'])
+
+# ---------------------- Edge Cost Layers ---------------------- #
+
+def scalar_move_costs(environment, cell, target, clamp_fuel=True):
+    """
+    Distance, speed, time, fuel and risk of one move, priced one edge at a time as the
+    original per-edge searches did (and, with clamp_fuel=False, as calculate_path_metrics did).
+    """
+    i, j = target
+    coords = [environment[key] for key in algorithm.ENVIRONMENT_KEYS[6:]]
+    lat1, lon1 = algorithm.index_to_latlon(*cell, *coords)
+    lat2, lon2 = algorithm.index_to_latlon(i, j, *coords)
+    distance = algorithm.haversine(lat1, lon1, lat2, lon2)
+    F, wind_dir, h, usurf, vsurf = (float(environment[key][i, j]) for key in algorithm.ENVIRONMENT_KEYS[1:6])
+    wave_dir = math.atan2(vsurf, usurf) if usurf != 0 or vsurf != 0 else 0.0
+    theta_ship = math.atan2(i - cell[0], j - cell[1])
+
+    def speed(F, h):
+        q = algorithm.angle_difference(theta_ship, wave_dir)
+        alpha = algorithm.angle_difference(theta_ship, wind_dir)
+        return algorithm.calculate_actual_speed(40, h, q, alpha, F, wind_dir, usurf, vsurf, theta_ship)
+
+    Va = speed(F, h)
+    # The fuel search clamps wind and waves away from zero
+    F_fuel, h_fuel = (max(F, 0.1), max(h, 0.1)) if clamp_fuel else (F, h)
+    Va_fuel = speed(F_fuel, h_fuel)
+    R_tot = max(algorithm.holtrop_mennen(R=0, V=Va_fuel, D=algorithm.D) +
+                algorithm.calculate_added_resistance_waves(h_fuel) +
+                algorithm.calculate_added_resistance_wind(F_fuel, algorithm.Cp, algorithm.Af), 1e-3)
+    p_b = max(R_tot * Va_fuel / (algorithm.n_e * algorithm.n_h * algorithm.n_s), 1e-3)
+    fuel = p_b * algorithm.csfoc * distance / Va_fuel
+    risk = algorithm.calculate_risk_values(F, wind_dir, h, usurf, vsurf, theta_ship,
+                                           environment['pirate_risk_map'][i, j])
+    return distance, Va, distance / Va, fuel, risk
+
+def test_cost_layers_match_scalar_model(environment):
+    # Currents and winds along the grid axes put some moves exactly half a turn off them
+    environment = dict(environment)
+    usurf, vsurf = environment['usurf_map'].copy(), environment['vsurf_map'].copy()
+    vsurf[::2] = 0.0
+    usurf[::4, ::3] = 0.0
+    wind_angle = environment['wind_angle_map_rad'].copy()
+    wind_angle[:, ::3] = 0.0
+    wind_angle[:, 1::3] = np.pi
+    environment.update(usurf_map=usurf, vsurf_map=vsurf, wind_angle_map_rad=wind_angle)
+    layers = algorithm.build_cost_layers(*grid_args(environment), pirate_risk_map=environment['pirate_risk_map'])
+
+    binary_map = environment['binary_map']
+    checked = set()
+    for d, offset in enumerate(algorithm.NEIGHBOR_OFFSETS):
+        for cell in np.ndindex(binary_map.shape):
+            target = (cell[0] + offset[0], cell[1] + offset[1])
+            if not algorithm.valid_move(*target, binary_map):
+                assert layers['time'][d][cell] == algorithm.INF
+                continue
+            expected = scalar_move_costs(environment, cell, target)
+            actual = [layers[name][d][cell] for name in ('distance', 'speed', 'time', 'fuel', 'risk')]
+            assert actual == pytest.approx(expected, rel=1e-5, abs=1e-6)
+            checked.add(d)
+    assert checked == set(range(len(algorithm.NEIGHBOR_OFFSETS)))
+
+# ---------------------- Grid Searches ---------------------- #
+
+QUERIES = [(START, GOAL), ((30, 2), (2, 30)), ((16, 1), (16, 30)), ((1, 20), (30, 12))]
+
+def dijkstra(edge_costs, source, reverse=False):
+    """
+    Plain Dijkstra over an (8, rows, cols) layer: cost from source to every cell, or with
+    reverse=True from every cell to source.
+    """
+    _, rows, cols = edge_costs.shape
+    dist = np.full((rows, cols), algorithm.INF)
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        cost, cell = heapq.heappop(heap)
+        if cost > dist[cell]:
+            continue
+        for d, (dr, dc) in enumerate(algorithm.NEIGHBOR_OFFSETS):
+            step = -1 if reverse else 1
+            neighbor = (cell[0] + step * dr, cell[1] + step * dc)
+            if not (0 <= neighbor[0] < rows and 0 <= neighbor[1] < cols):
+                continue
+            move = float(edge_costs[d][neighbor] if reverse else edge_costs[d][cell])
+            if cost + move < dist[neighbor]:
+                dist[neighbor] = cost + move
+                heapq.heappush(heap, (cost + move, neighbor))
+    return dist
+
+def assert_grid_path(path, cost, start, goal, edge_costs):
+    # An 8-connected path between the query's ends whose moves add up to its cost
+    assert path[0] == start and path[-1] == goal
+    assert all(max(abs(a[0] - b[0]), abs(a[1] - b[1])) == 1 for a, b in zip(path, path[1:]))
+    assert algorithm.path_edge_values(path, edge_costs).sum() == pytest.approx(cost, rel=1e-9)
+
+def objective_layers(cost_layers):
+    return {'time': cost_layers['time'], 'fuel': cost_layers['fuel'],
+            'safest': algorithm.safest_edge_costs(cost_layers)}
+
+def heuristic_field(environment, cost_layers, edge_costs, goal):
+    return algorithm.objective_heuristic(edge_costs, cost_layers, goal, environment['binary_map'].shape,
+                                         *(environment[key] for key in algorithm.ENVIRONMENT_KEYS[6:]))
+
+@pytest.mark.parametrize('objective', ['time', 'fuel', 'safest'])
+def test_a_star_matches_dijkstra(environment, cost_layers, objective):
+    edge_costs = objective_layers(cost_layers)[objective]
+    for start, goal in QUERIES:
+        expected = dijkstra(edge_costs, start)[goal]
+        for heuristic in (None, heuristic_field(environment, cost_layers, edge_costs, goal)):
+            path, cost = algorithm.a_star_search(start, goal, edge_costs, heuristic)
+            assert cost == pytest.approx(expected, rel=1e-9)
+            assert_grid_path(path, cost, start, goal, edge_costs)
+
+def test_a_star_reports_unreachable_goal(cost_layers):
+    # The centre of the first island
+    assert algorithm.a_star_search(START, (12, 14), cost_layers['time']) == (None, algorithm.INF)
+
+@pytest.mark.parametrize('objective', ['time', 'fuel', 'safest'])
+def test_heuristic_fields_are_admissible_and_consistent(environment, cost_layers, objective):
+    edge_costs = objective_layers(cost_layers)[objective]
+    h = heuristic_field(environment, cost_layers, edge_costs, GOAL)
+    exact = dijkstra(edge_costs, GOAL, reverse=True)
+    reachable = np.isfinite(exact)
+    assert (h[reachable] <= exact[reachable] * (1 + 1e-9)).all()
+    for d, (dr, dc) in enumerate(algorithm.NEIGHBOR_OFFSETS):
+        src, dst = algorithm._shift_slices(dr, dc, h.shape)
+        allowed = np.isfinite(edge_costs[d][src])
+        assert (h[src][allowed] <= (edge_costs[d][src] + h[dst])[allowed] + 1e-9).all()
+
+    # Guided searches find the same routes and never expand more cells than Dijkstra
+    report = heuristics.expansion_report(algorithm.a_star_search, START, GOAL, edge_costs, h)
+    assert report['optimal']
+    assert report['expansions'] <= report['dijkstra_expansions']
+
+def test_bidirectional_matches_a_star(environment, cost_layers):
+    time_layer = cost_layers['time']
+    for start, goal in QUERIES:
+        _, expected = algorithm.a_star_search(start, goal, time_layer)
+        heuristic = heuristic_field(environment, cost_layers, time_layer, goal)
+        start_heuristic = heuristic_field(environment, cost_layers, time_layer, start)
+        for fields in ((None, None), (heuristic, start_heuristic)):
+            path, cost = algorithm.bidirectional_search(start, goal, time_layer, *fields)
+            assert cost == pytest.approx(expected, rel=1e-9)
+            assert_grid_path(path, cost, start, goal, time_layer)
+
+def test_landmark_bounds_match_a_star(cost_layers):
+    time_layer = cost_layers['time']
+    fields = algorithm.landmark_fields(time_layer, count=6)
+    assert fields.dtype == np.float32
+    # A second call is read back from the artifact cache
+    assert np.array_equal(algorithm.landmark_fields(time_layer, count=6), fields)
+    for start, goal in QUERIES:
+        to_goal = algorithm.landmark_heuristic(fields, goal)
+        from_start = algorithm.landmark_heuristic(fields, start, towards=False)
+        for bound, exact in ((to_goal, dijkstra(time_layer, goal, reverse=True)),
+                             (from_start, dijkstra(time_layer, start))):
+            reachable = np.isfinite(exact)
+            # Bounds are differences of float32 costs, exact to their rounding only
+            assert (bound[reachable] <= exact[reachable] + 1e-6 * fields[np.isfinite(fields)].max()).all()
+
+        _, expected = algorithm.a_star_search(start, goal, time_layer)
+        path, cost = algorithm.a_star_search(start, goal, time_layer, to_goal)
+        assert cost == pytest.approx(expected, rel=1e-6)
+        assert_grid_path(path, cost, start, goal, time_layer)
+        path, cost = algorithm.bidirectional_search(start, goal, time_layer, to_goal, from_start)
+        assert cost == pytest.approx(expected, rel=1e-6)
+        assert_grid_path(path, cost, start, goal, time_layer)
+
+def test_cached_searches_hash_each_layer_once(cost_layers, monkeypatch):
+    # Fresh copies, so no earlier test has hashed them yet
+    layers = {name: cost_layers[name].copy() for name in ('time', 'risk')}
+    hashed = []
+    array_digest = artifact_cache.array_digest
+    monkeypatch.setattr(artifact_cache, 'array_digest', lambda array: hashed.append(array) or array_digest(array))
+    monkeypatch.setattr(algorithm, 'RISK_THRESHOLD', THRESHOLD)
+
+    for _ in range(3):
+        edge_costs = algorithm.safest_edge_costs(layers)
+        path, cost = algorithm.hierarchical_search(START, GOAL, edge_costs)
+        assert_grid_path(path, cost, START, GOAL, edge_costs)
+        algorithm.landmark_fields(layers['time'], count=2)
+    # The time and risk layers, and the safest layer derived from them, are hashed once each
+    assert len(hashed) == 3
+    assert algorithm.safest_edge_costs(layers) is edge_costs
+    assert artifact_cache.frozen_array_digest(edge_costs) == array_digest(edge_costs)
+
+# ---------------------- Any-Angle (Line-of-Sight) Search ---------------------- #
+
+def bresenham(start, end):
+    """
+    Cells the original line_of_sight loop checked, start included.
+    """
+    x0, y0 = start
+    x1, y1 = end
+    dx, dy = abs(x1 - x0), abs(y1 - y0)
+    x_inc = 1 if x1 > x0 else -1
+    y_inc = 1 if y1 > y0 else -1
+    error = dx - dy
+    cells = []
+    for _ in range(1 + dx + dy):
+        cells.append((x, y) if cells else (x0, y0))
+        x, y = cells[-1]
+        if error > 0:
+            x += x_inc
+            error -= 2 * dy
+        else:
+            y += y_inc
+            error += 2 * dx
+    return cells
+
+def test_ray_cells_match_bresenham():
+    rng = np.random.default_rng(3)
+    for _ in range(50):
+        start = tuple(rng.integers(0, 40, 2))
+        ends = rng.integers(0, 40, (rng.integers(1, 20), 2))
+        xs, ys, counts = algorithm.ray_cells(start, ends)
+        walks = np.split(np.stack([xs, ys], axis=1), np.cumsum(counts)[:-1])
+        for end, walk in zip(ends, walks):
+            assert [tuple(cell) for cell in walk.tolist()] == bresenham(start, tuple(end))[1:]
+
+def test_line_of_sight_matches_bresenham(environment):
+    binary_map = environment['binary_map']
+    rng = np.random.default_rng(4)
+    for _ in range(300):
+        start, end = (tuple(rng.integers(0, GRID_SIZE, 2)) for _ in range(2))
+        expected = not any(binary_map[cell] == 1 for cell in bresenham(start, end))
+        assert algorithm.line_of_sight(binary_map, start, end) == expected
+
+def test_any_angle_path_is_clear_and_sparse(environment, cost_layers):
+    binary_map = environment['binary_map']
+    time_layer = cost_layers['time']
+    segment_costs = algorithm.make_segment_cost(*grid_args(environment), objective='time')
+    for start, goal in QUERIES:
+        grid_path, _ = algorithm.a_star_search(start, goal, time_layer)
+        path, cost = algorithm.theta_star_any_angle_search(start, goal, time_layer, segment_costs)
+        assert path[0] == start and path[-1] == goal
+        assert len(path) < len(grid_path)
+        # Single grid moves are priced like the 8-connected edges and may cut a land corner
+        assert all(algorithm.line_of_sight(binary_map, a, b) or max(abs(a[0] - b[0]), abs(a[1] - b[1])) == 1
+                   for a, b in zip(path, path[1:]))
+        # Single moves were priced from the float32 edge layer
+        assert algorithm.path_segment_costs(path, segment_costs, GRID_SIZE).sum() == pytest.approx(cost, rel=1e-6)
+
+# ---------------------- Multi-Objective (Pareto) Search ---------------------- #
+
+def weighted_cost(route, weights, scales):
+    weight_shortest, weight_safest, weight_fuel = weights
+    return (weight_shortest * route['time'] / scales['time'] + weight_fuel * route['fuel'] / scales['fuel'] +
+            weight_safest * route['risk'] / scales['risk'])
+
+def weighted_optimum(environment, cost_layers, goal, weights):
+    weight_shortest, weight_safest, weight_fuel = weights
+    _, cost, *_ = algorithm.theta_star_weighted_path(
+        START, goal, *grid_args(environment), environment['pirate_risk_map'], weight_shortest=weight_shortest,
+        weight_safest=weight_safest, weight_fuel=weight_fuel, cost_layers=cost_layers)
+    return cost
+
+def objective_optima(environment, cost_layers, goal):
+    """
+    Least time, time plus weighted risk under RISK_THRESHOLD, and fuel, from single-objective A*.
+    """
+    _, fastest = algorithm.a_star_search(START, goal, cost_layers['time'])
+    _, safest, _ = algorithm.theta_star_safest_path(START, goal, *grid_args(environment),
+                                                    environment['pirate_risk_map'], cost_layers=cost_layers)
+    _, fuel = algorithm.a_star_search(START, goal, cost_layers['fuel'])
+    return fastest, safest, fuel
+
+# The exact front is only affordable to a nearer goal
+@pytest.mark.parametrize('epsilon, goal', [(0.0, (14, 20)), (algorithm.PARETO_EPSILON, GOAL)])
+def test_pareto_front_answers_every_weighting(environment, cost_layers, monkeypatch, epsilon, goal):
+    monkeypatch.setattr(algorithm, 'RISK_THRESHOLD', THRESHOLD)
+    # Risk on this grid never dips below zero, so the (1 + epsilon) bound holds for all weightings
+    assert algorithm.pareto_objective_layers(cost_layers)[1] == 0.0
+    front = algorithm.pareto_routes(START, goal, cost_layers, epsilon=epsilon)
+    assert any(route['exposure'] for route in front)
+    scales = algorithm.weighted_scales(cost_layers)
+    bound = (1 + epsilon) * (1 + 1e-5)
+
+    fastest, safest, fuel = algorithm.routes_from_front(front, (1, 0, 0), scales)[:3]
+    optima = objective_optima(environment, cost_layers, goal)
+    assert fastest['time'] <= bound * optima[0]
+    assert safest['exposure'] == 0
+    assert safest['time'] + algorithm.WEIGHTING_FACTOR * safest['risk'] <= bound * optima[1]
+    assert fuel['fuel'] <= bound * optima[2]
+
+    rng = np.random.default_rng(13)
+    for weights in [(1, 0, 0), (0, 1, 0), (0, 0, 1)] + [tuple(w) for w in rng.dirichlet((1, 1, 1), 20)]:
+        picked = algorithm.pick_from_front(front, weights, scales)
+        optimum = weighted_optimum(environment, cost_layers, goal, weights)
+        assert weighted_cost(picked, weights, scales) <= bound * optimum
+        if epsilon == 0:
+            assert weighted_cost(picked, weights, scales) == pytest.approx(optimum, rel=1e-5)
+
+def test_weighting_dominated_matches_sampled_weightings():
+    rng = np.random.default_rng(5)
+    weightings = rng.dirichlet((1, 1, 1), 20000)
+    for _ in range(200):
+        costs = rng.uniform(0, 1, 3)
+        others = [tuple(other) for other in rng.uniform(0, 1, (rng.integers(1, 5), 3))]
+        margin = (weightings @ np.array(others).T).min(axis=1) - weightings @ costs
+        dominated = algorithm.weighting_dominated(tuple(costs), others, tolerance=0.0)
+        # Sampling can miss a sliver of weightings, never report one that is not there
+        if dominated:
+            assert margin.max() <= 1e-9
+        elif margin.max() <= 0:
+            assert margin.max() > -1e-3
+
+# ---------------------- Parallel Route Searches ---------------------- #
+
+@pytest.fixture
+def spawn_start_method():
+    # Spawned workers inherit nothing from the parent, as on Windows and macOS
+    method = multiprocessing.get_start_method(allow_none=True)
+    multiprocessing.set_start_method('spawn', force=True)
+    yield
+    multiprocessing.set_start_method(method, force=True)
+
+def test_parallel_routes_match_serial_under_spawn(environment, cost_layers, spawn_start_method):
+    args = (START, GOAL, *grid_args(environment)[:6], environment['pirate_risk_map'], *grid_args(environment)[6:])
+    serial = algorithm.find_routes(*args, cost_layers=cost_layers, any_angle=True)
+    parallel = algorithm.find_routes(*args, cost_layers=cost_layers, any_angle=True, parallel=True, max_workers=2)
+    assert all(route[0] for route in serial)
+    for expected, route in zip(serial, parallel):
+        assert route[0] == expected[0]
+        assert route[1:] == pytest.approx(expected[1:], rel=1e-12)
+
+# ---------------------- Pirate Risk Rasterization ---------------------- #
+
+def incident_boxes_loop(lats, lons, environment, buffer_degree):
+    """
+    The original per-incident loop, with the buffer box's rows taken north to south.
+    """
+    coords = [environment[key] for key in algorithm.ENVIRONMENT_KEYS[6:]]
+    n = environment['grid_size']
+    risk = np.zeros((n, n))
+    for lat, lon in zip(lats, lons):
+        top, left = algorithm.latlon_to_index(lat + buffer_degree, lon - buffer_degree, *coords)
+        bottom, right = algorithm.latlon_to_index(lat - buffer_degree, lon + buffer_degree, *coords)
+        top, left, bottom, right = max(top, 0), max(left, 0), min(bottom, n - 1), min(right, n - 1)
+        if top <= bottom and left <= right:
+            risk[top:bottom + 1, left:right + 1] += 1
+    return risk
+
+def incident_kernel_loop(lats, lons, environment, buffer_degree, kernel):
+    coords = [environment[key] for key in algorithm.ENVIRONMENT_KEYS[6:]]
+    n, lat_res, lon_res = environment['grid_size'], environment['lat_res'], environment['lon_res']
+    reach_rows, reach_cols = int(buffer_degree / lat_res), int(buffer_degree / lon_res)
+    risk = np.zeros((n, n))
+    for lat, lon in zip(lats, lons):
+        row, col = algorithm.latlon_to_index(lat, lon, *coords)
+        for dr in range(-reach_rows, reach_rows + 1):
+            for dc in range(-reach_cols, reach_cols + 1):
+                if 0 <= row + dr < n and 0 <= col + dc < n:
+                    risk[row + dr, col + dc] += algorithm.RISK_KERNELS[kernel](
+                        math.hypot(dr * lat_res, dc * lon_res), buffer_degree)
+    return risk
+
+def random_incidents(environment, count=300):
+    # Incidents over the grid and a margin around it, so some boxes are cut by the edge
+    rng = np.random.default_rng(11)
+    span = environment['grid_size'] * environment['lat_res']
+    lats = environment['lat_min'] + rng.uniform(-1.5, span + 1.5, count)
+    lons = environment['lon_min'] + rng.uniform(-1.5, span + 1.5, count)
+    return lats, lons
+
+@pytest.mark.parametrize('buffer_degree', [0.5, 1.3])
+def test_incident_boxes_match_loop(environment, buffer_degree):
+    lats, lons = random_incidents(environment)
+    geometry = [environment[key] for key in algorithm.ENVIRONMENT_KEYS[6:]]
+    assert np.array_equal(algorithm.rasterize_incident_boxes(lats, lons, *geometry, buffer_degree=buffer_degree),
+                          incident_boxes_loop(lats, lons, environment, buffer_degree))
+
+@pytest.mark.parametrize('kernel', sorted(algorithm.RISK_KERNELS))
+def test_incident_kernel_matches_loop(environment, kernel):
+    # Incidents on the grid: truncating toward zero moves those just off its west and south edges
+    lats, lons = random_incidents(environment)
+    span = environment['grid_size'] * environment['lat_res']
+    inside = (lats >= environment['lat_min']) & (lats < environment['lat_min'] + span) & \
+        (lons >= environment['lon_min']) & (lons < environment['lon_min'] + span)
+    lats, lons = lats[inside], lons[inside]
+    geometry = [environment[key] for key in algorithm.ENVIRONMENT_KEYS[6:]]
+    np.testing.assert_allclose(
+        algorithm.rasterize_incident_kernel(lats, lons, *geometry, buffer_degree=1.0, kernel=kernel),
+        incident_kernel_loop(lats, lons, environment, 1.0, kernel), atol=1e-9)
+
+def test_pirate_attacks_are_normalized_and_cached(environment, tmp_path):
+    lats, lons = random_incidents(environment)
+    csv_file = tmp_path / 'incidents.csv'
+    np.savetxt(csv_file, np.stack([lats, lons], axis=1), delimiter=',', header='latitude,longitude', comments='')
+    geometry = [environment[key] for key in algorithm.ENVIRONMENT_KEYS[6:]]
+    risk = algorithm.load_pirate_attacks(str(csv_file), *geometry)
+    expected = incident_boxes_loop(lats, lons, environment, 0.5)
+    np.testing.assert_allclose(risk, expected / expected.max())
+    assert np.array_equal(algorithm.load_pirate_attacks(str(csv_file), *geometry), risk)
+
+# ---------------------- Route Evaluation ---------------------- #
+
+def test_route_segments_match_scalar_metrics(environment, cost_layers):
+    maps = [environment[key] for key in algorithm.ENVIRONMENT_KEYS[1:6]] + [environment['pirate_risk_map']]
+    coords = [environment[key] for key in algorithm.ENVIRONMENT_KEYS[6:]]
+    segment_costs = algorithm.make_segment_cost(*grid_args(environment), objective='time')
+    grid_path, _ = algorithm.a_star_search(START, GOAL, cost_layers['time'])
+    sparse_path, _ = algorithm.theta_star_any_angle_search(START, GOAL, cost_layers['time'], segment_costs)
+    for path in (grid_path, sparse_path):
+        segments = algorithm.route_segments(path, *maps, *coords, algorithm.ship_params)
+        expected = np.array([scalar_move_costs(environment, a, b, clamp_fuel=False) for a, b in zip(path, path[1:])])
+        for column, name in enumerate(('distance', 'speed', 'time', 'fuel', 'risk')):
+            np.testing.assert_allclose(segments[name], expected[:, column], rtol=1e-9)
+        np.testing.assert_allclose(segments['elapsed'][1:], np.cumsum(expected[:, 2]), rtol=1e-9)
+
+        total_time, total_fuel, total_risk = algorithm.calculate_path_metrics(path, *maps, *coords,
+                                                                              algorithm.ship_params)
+        assert total_time == pytest.approx(expected[:, 2].sum(), rel=1e-9)
+        assert total_fuel == pytest.approx(expected[:, 3].sum() / 850 * 0.264172, rel=1e-9)
+        assert total_risk == pytest.approx(expected[:, 4].sum() / len(path) * 100, rel=1e-9)
+
+def simulate_travel_loop(path, segment_times, travel_time, coords):
+    """
+    The original segment-by-segment walk of simulate_travel.
+    """
+    total_time = 0.0
+    for (a, b), time_hours in zip(zip(path, path[1:]), segment_times):
+        if total_time + time_hours >= travel_time:
+            lat1, lon1 = algorithm.index_to_latlon(*a, *coords)
+            lat2, lon2 = algorithm.index_to_latlon(*b, *coords)
+            fraction = (travel_time - total_time) / time_hours
+            return lat1 + (lat2 - lat1) * fraction, lon1 + (lon2 - lon1) * fraction
+        total_time += time_hours
+    return algorithm.index_to_latlon(*path[-1], *coords)
+
+def test_positions_match_segment_walk(environment, cost_layers):
+    maps = [environment[key] for key in algorithm.ENVIRONMENT_KEYS[1:6]] + [environment['pirate_risk_map']]
+    coords = [environment[key] for key in algorithm.ENVIRONMENT_KEYS[6:]]
+    path, _ = algorithm.a_star_search(START, GOAL, cost_layers['time'])
+    segments = algorithm.route_segments(path, *maps, *coords, algorithm.ship_params)
+    arrival = segments['elapsed'][-1]
+    hours = np.concatenate(([0.0, 3.0, arrival, arrival + 5], np.linspace(0, arrival, 37)[1:-1]))
+    lats, lons = algorithm.position_at(segments, hours)
+    for t, lat, lon in zip(hours, lats, lons):
+        assert (lat, lon) == pytest.approx(simulate_travel_loop(path, segments['time'], t, coords), rel=1e-12)
+    assert algorithm.simulate_travel(path, *maps, *coords, algorithm.ship_params) == \
+        pytest.approx(simulate_travel_loop(path, segments['time'], 3.0, coords), rel=1e-12)
+
+    timeline_hours, timeline_lats, timeline_lons = algorithm.eta_timeline(segments)
+    assert timeline_hours[-1] == arrival
+    assert np.all(np.diff(timeline_hours[:-1]) == 1.0)
+    assert (timeline_lats[-1], timeline_lons[-1]) == pytest.approx(algorithm.index_to_latlon(*GOAL, *coords))
@@ -0,0 +1,61 @@
+import queue
+from concurrent.futures import Future
+
+import pytest
+
+import algorithm
+import routing_workers
+
+# ---------------------- Jobs ---------------------- #
+#
+# Jobs run inline on a stub pool, so submit_job and the progress bookkeeping are checked
+# without starting worker processes or loading an environment.
+
+class InlinePool:
+    """
+    Stand-in for the worker pool that runs each task as it is submitted.
+    """
+    def submit(self, task, *args):
+        future = Future()
+        try:
+            future.set_result(task(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+class DrainedQueue(queue.Queue):
+    """
+    Progress queue that raises queue.Empty once drained, ending _collect_progress.
+    """
+    def get(self):
+        return super().get(block=False)
+
+@pytest.fixture
+def inline_jobs(monkeypatch):
+    progress_queue = DrainedQueue()
+    monkeypatch.setattr(routing_workers, 'start_pool', InlinePool)
+    monkeypatch.setattr(routing_workers, '_progress_queue', progress_queue)
+    monkeypatch.setattr(routing_workers, '_jobs', {})
+
+    def compute_routes(params):
+        routing_workers._report_progress(params['expansions'], 2.0)
+        return params
+    monkeypatch.setattr(routing_workers, '_compute_routes', compute_routes)
+    monkeypatch.setattr(algorithm, 'route_record', lambda result, environment: result)
+    return progress_queue
+
+def test_job_ids_survive_finished_job_pruning(inline_jobs):
+    count = routing_workers.MAX_FINISHED_JOBS + 44
+    job_ids = [routing_workers.submit_job({'expansions': index + 1}) for index in range(count)]
+    assert len(set(job_ids)) == count
+
+    with pytest.raises(queue.Empty):
+        routing_workers._collect_progress()
+    # Only the most recent finished jobs are kept, each under the id it was returned with
+    assert routing_workers.job_status(job_ids[0]) is None
+    kept = routing_workers.MAX_FINISHED_JOBS
+    for index, job_id in enumerate(job_ids[-kept:], count - kept):
+        status = routing_workers.job_status(job_id)
+        assert status['state'] == 'done'
+        assert status['progress'] == {'expansions': index + 1, 'best_f': 2.0, 'searches_done': 0}
+        assert routing_workers.job_result(job_id) == {'expansions': index + 1}
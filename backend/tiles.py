@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import io
+import json
+import math
+import os
+
+import numpy as np
+
+import artifact_cache
+
+# ---------------------- Raster Tile Pyramid ---------------------- #
+#
+# Map layers cut into TILE_SIZE x TILE_SIZE tiles so a map view only fetches what it shows.
+# Tiles follow the routing grid (plain lat/lon, row 0 northernmost): at the finest zoom one
+# tile pixel is one grid cell, and each coarser zoom averages 2x2 pixels of the next, ignoring
+# missing values, until the whole domain fits one tile at zoom 0. Tile x counts columns from
+# the west edge and y rows from the north edge; edge tiles are padded with missing values.
+#
+# Every tile is written once per environment version, as a PNG (layer colour map, missing
+# values transparent) and as raw little-endian float32 values (NaN where missing) gzipped,
+# both stored in the artifact cache under the digest of their contents.
+
+TILE_SIZE = 256
+
+# Tile formats: (file suffix, media type)
+TILE_FORMATS = {
+    'png': ('.png', 'image/png'),
+    'f32': ('.f32.gz', 'application/octet-stream'),
+}
+
+# Tiled layers: (layer name, environment key, colour map); value ranges span the whole layer
+TILE_LAYERS = (
+    ('wind_speed', 'wind_speed_map', 'cool'),
+    ('wave_height', 'wave_height_map', 'cool'),
+    ('usurf', 'usurf_map', 'coolwarm'),
+    ('vsurf', 'vsurf_map', 'coolwarm'),
+    ('pirate_risk', 'pirate_risk_map', 'Reds'),
+    ('land', 'binary_map', 'gray'),
+)
+
+def max_zoom(grid_size):
+    """
+    Finest zoom level of a grid, the one where a tile pixel is a single grid cell.
+    """
+    return max(math.ceil(math.log2(grid_size / TILE_SIZE)), 0)
+
+def pyramid_levels(data, zoom):
+    """
+    The layer at every zoom level from 0 to zoom, padded with missing values to whole tiles.
+
+    Returns:
+    - list of float32 arrays indexed by zoom level
+    """
+    size = TILE_SIZE << zoom
+    level = np.full((size, size), np.nan, dtype=np.float32)
+    level[:data.shape[0], :data.shape[1]] = data
+    levels = [level]
+    for _ in range(zoom):
+        blocks = level.reshape(level.shape[0] // 2, 2, level.shape[1] // 2, 2)
+        valid = np.isfinite(blocks)
+        counts = valid.sum(axis=(1, 3))
+        sums = np.where(valid, blocks, 0).sum(axis=(1, 3))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            level = np.where(counts > 0, sums / counts, np.nan).astype(np.float32)
+        levels.append(level)
+    return levels[::-1]
+
+def encode_png(tile, value_range, cmap):
+    """
+    A tile as an RGBA PNG through a matplotlib colour map; missing values are transparent.
+    """
+    from matplotlib import colormaps
+    from PIL import Image
+
+    low, high = value_range
+    scaled = (tile - low) / (high - low) if high > low else np.zeros_like(tile)
+    rgba = colormaps[cmap](np.nan_to_num(scaled, nan=0.0), bytes=True)
+    rgba[..., 3] = np.where(np.isfinite(tile), 255, 0)
+    png = io.BytesIO()
+    Image.fromarray(rgba, 'RGBA').save(png, format='PNG', optimize=True)
+    return png.getvalue()
+
+def encode_values(tile):
+    """
+    A tile as gzipped little-endian float32 values, TILE_SIZE rows of TILE_SIZE.
+    """
+    return gzip.compress(np.ascontiguousarray(tile, dtype='<f4').tobytes(), mtime=0)
+
+def tile_path(digest, tile_format):
+    """
+    Artifact cache file of a tile, by content digest.
+    """
+    return artifact_cache.cache_path('tile', digest, TILE_FORMATS[tile_format][0])
+
+def environment_tiles(environment):
+    """
+    The tile pyramid of every TILE_LAYERS layer of an environment version, written only the
+    first time and stored in the artifact cache (see tile_path).
+
+    Returns:
+    - dict with 'tile_size', 'max_zoom', the grid 'bounds' (lat_min, lat_max, lon_min,
+      lon_max), each layer's value 'ranges' and 'tiles': '{layer}/{z}/{x}/{y}.{format}'
+      mapped to the tile's content digest
+    """
+    index_path = artifact_cache.cache_path('tile_index', environment['version'], '.json')
+    cached = artifact_cache.load_bytes(index_path)
+    if cached is not None:
+        index = json.loads(cached)
+        if all(_tile_exists(name, digest) for name, digest in index['tiles'].items()):
+            return index
+
+    grid_size = environment['grid_size']
+    zoom = max_zoom(grid_size)
+    index = {
+        'tile_size': TILE_SIZE,
+        'max_zoom': zoom,
+        'bounds': [environment['lat_min'], environment['lat_min'] + grid_size * environment['lat_res'],
+                   environment['lon_min'], environment['lon_min'] + grid_size * environment['lon_res']],
+        'ranges': {},
+        'tiles': {},
+    }
+    for layer, key, cmap in TILE_LAYERS:
+        data = np.asarray(environment[key], dtype=np.float32)
+        finite = data[np.isfinite(data)]
+        value_range = [float(finite.min()), float(finite.max())] if finite.size else [0.0, 0.0]
+        index['ranges'][layer] = value_range
+        for z, level in enumerate(pyramid_levels(data, zoom)):
+            # Tiles entirely past the grid's edge are left out
+            count = -(-grid_size // (TILE_SIZE << (zoom - z)))
+            for y in range(count):
+                for x in range(count):
+                    tile = level[y * TILE_SIZE:(y + 1) * TILE_SIZE, x * TILE_SIZE:(x + 1) * TILE_SIZE]
+                    for tile_format, content in (('png', encode_png(tile, value_range, cmap)),
+                                                 ('f32', encode_values(tile))):
+                        digest = hashlib.sha256(content).hexdigest()[:24]
+                        artifact_cache.save_bytes(tile_path(digest, tile_format), content)
+                        index['tiles'][f"{layer}/{z}/{x}/{y}.{tile_format}"] = digest
+    artifact_cache.save_bytes(index_path, json.dumps(index).encode('utf-8'))
+    return index
+
+def _tile_exists(name, digest):
+    return os.path.exists(tile_path(digest, name.rsplit('.', 1)[1]))